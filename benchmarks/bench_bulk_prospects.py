@@ -0,0 +1,97 @@
+"""
+Compares prospect import throughput of the per-row create_prospect path with
+bulk_create_prospects.
+
+Usage:
+    python benchmarks/bench_bulk_prospects.py [--rows 3000] [--database-url sqlite:///bench.db]
+
+Each path writes into a freshly created prospects table. The default is a
+temporary SQLite file; pass a PostgreSQL URL to measure real round trips.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from models.prospect_model import Base, Prospect  # noqa: E402
+from schemas.prospect_schema import ProspectCreate  # noqa: E402
+from crud.prospect_crud import create_prospect, bulk_create_prospects  # noqa: E402
+
+
+def make_prospects(count, offset=0):
+    return [
+        ProspectCreate(
+            lead_serial_number=offset + i,
+            is_dropped=False,
+            is_won=i % 7 == 0,
+            date=datetime(2024, 1, 1),
+            organization_name=f"Company {i}",
+            contact_person=f"Person {i}",
+            primary_phone_number=f"+2547{i:08d}",
+            email=f"person{i}@example.com",
+            industry="Finance",
+            service_needed="Credit",
+            lead_source="Trade show",
+            city="Nairobi",
+            country="Kenya",
+            value_of_lead="1000",
+            milestone_level=1,
+            owner_id=i % 20,
+            points=10,
+            website=f"www.company{i}.com",
+        )
+        for i in range(count)
+    ]
+
+
+def run(label, fn, session_factory, engine, prospects):
+    Base.metadata.drop_all(bind=engine, tables=[Prospect.__table__])
+    Base.metadata.create_all(bind=engine, tables=[Prospect.__table__])
+    db = session_factory()
+    try:
+        started = time.perf_counter()
+        fn(db, prospects)
+        elapsed = time.perf_counter() - started
+        stored = db.query(Prospect).count()
+    finally:
+        db.close()
+    return {"path": label, "rows": len(prospects), "stored": stored, "seconds": round(elapsed, 3),
+            "rows_per_second": round(len(prospects) / elapsed, 1)}
+
+
+def per_row(db, prospects):
+    for prospect in prospects:
+        create_prospect(db, prospect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    engine = create_engine(url)
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    prospects = make_prospects(args.rows)
+
+    results = [
+        run("per_row", per_row, session_factory, engine, prospects),
+        run("bulk", bulk_create_prospects, session_factory, engine, prospects),
+    ]
+    print(json.dumps({
+        "database": engine.url.get_backend_name(),
+        "results": results,
+        "speedup": round(results[1]["rows_per_second"] / results[0]["rows_per_second"], 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Verifies the precompiled field engine in fields.py against the golden corpus
+recorded from the original per-function regexes, and compares their CPU cost.
+
+Usage:
+    python benchmarks/check_golden_fields.py [--repeat N]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fields import extract_fields  # noqa: E402
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "golden_fields.json")
+
+
+def legacy_extract(text):
+    """
+    The original extract.py regex extractors, kept here as the reference the
+    engine is benchmarked against (patterns compiled from strings on each call,
+    phone context searched once per candidate).
+    """
+    emails = re.findall(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', text)
+    phones = []
+    for match in re.findall(
+        r'(\+?\d{1,4}[-.\s]?\(?\d{1,3}\)?[-.\s]?\d{3,4}[-.\s]?\d{4,5}'
+        r'|\bn?\d{10}\b|\b0\d{9}\b(?:/\d{10})?)', text
+    ):
+        if len(match) >= 7:
+            context_match = re.search(r'\b(Tel|Mobile|Phone|Contact|Cell)\b', text, re.IGNORECASE)
+            if context_match or match.startswith(('+', 'n', '0')):
+                phones.append(match)
+    websites = re.findall(r'(https?://[^\s]+|www\.[^\s]+)', text)
+    fb = re.findall(r'(facebook\.com/[^\s]+|FB:[^\s]+|facebook.com|FB/|fb.com)', text, re.IGNORECASE)
+    ig = re.findall(r'(instagram\.com/[^\s]+|IG:[^\s]+|instagram.com|IG/|ig.com)', text, re.IGNORECASE)
+    tw = re.findall(r'(twitter\.com/[^\s]+|Twitter:[^\s]+|twitter.com|Twitter/|t.co)', text, re.IGNORECASE)
+    addresses = re.findall(
+        r'((?:\d{1,5}\s)?'
+        r'(?:[A-Za-z\s]+(?:Square|Building|Tower|Floor|Block|Avenue|St|Street|'
+        r'Rd|Road|Lane|Ln|Drive|Dr|Boulevard|Blvd|Place|Pl)[,.\s]*)+'
+        r'(?:,\s*\w+)*'
+        r',\s*\w+\s*\d{0,6}'
+        r'|\bP\.O\.\sBox\s\d+\b)', text, re.IGNORECASE | re.MULTILINE
+    )
+    return emails, phones, websites, fb, ig, tw, addresses
+
+
+def engine_extract(text):
+    fields = extract_fields(text)
+    return {
+        "emails": sorted(fields["email"]),
+        "phones": sorted(fields["phone"]),
+        "websites": sorted(fields["website"]),
+        "social_media": {network: (fields[network] or [None])[0] for network in ("facebook", "instagram", "twitter")},
+        "addresses": sorted(fields["address"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus for timing")
+    args = parser.parse_args()
+
+    with open(GOLDEN_PATH, encoding="utf-8") as f:
+        cards = json.load(f)["cards"]
+
+    mismatches = 0
+    for index, card in enumerate(cards):
+        actual = engine_extract(card["text"])
+        if actual != card["expected"]:
+            mismatches += 1
+            print(f"card {index}: expected {card['expected']}, got {actual}")
+
+    texts = [card["text"] for card in cards]
+    timings = {}
+    for name, fn in (("legacy", legacy_extract), ("engine", extract_fields)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in texts:
+                fn(text)
+        timings[name] = time.perf_counter() - started
+
+    print(json.dumps({
+        "cards": len(cards),
+        "mismatches": mismatches,
+        "legacy_us_per_card": round(timings["legacy"] / (args.repeat * len(texts)) * 1e6, 2),
+        "engine_us_per_card": round(timings["engine"] / (args.repeat * len(texts)) * 1e6, 2),
+        "speedup": round(timings["legacy"] / timings["engine"], 2),
+    }, indent=2))
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Compares two run_benchmarks.py result files and flags regressions.
+
+Usage:
+    python benchmarks/compare_results.py base.json new.json [--threshold 0.1]
+
+For every suite (and api concurrency level) present in both files, prints
+cards/sec and p50/p95 latency side by side. Exits with status 1 if throughput
+dropped or latency rose by more than the threshold (a fraction).
+"""
+import sys
+import json
+import argparse
+
+
+def _flatten(suites):
+    """
+    Map 'suite' or 'api@N' to its result block.
+    """
+    blocks = {}
+    for suite, result in suites.items():
+        if "concurrency" in result:
+            for level, block in result["concurrency"].items():
+                blocks[f"{suite}@{level}"] = block
+        elif "cards_per_sec" in result:
+            blocks[suite] = result
+    return blocks
+
+
+def compare(base, new, threshold):
+    """
+    Return rows of (name, metric, base, new, change, regressed).
+    """
+    rows = []
+    base_blocks, new_blocks = _flatten(base["suites"]), _flatten(new["suites"])
+    for name in sorted(set(base_blocks) & set(new_blocks)):
+        old_block, new_block = base_blocks[name], new_blocks[name]
+        metrics = [("cards_per_sec", old_block["cards_per_sec"], new_block["cards_per_sec"], True)]
+        for p in ("p50", "p95"):
+            old_value = old_block.get("latency_ms", {}).get(p)
+            new_value = new_block.get("latency_ms", {}).get(p)
+            if old_value is not None and new_value is not None:
+                metrics.append((f"latency_{p}_ms", old_value, new_value, False))
+        for metric, old_value, new_value, higher_is_better in metrics:
+            change = (new_value - old_value) / old_value if old_value else 0.0
+            regressed = -change > threshold if higher_is_better else change > threshold
+            rows.append((name, metric, old_value, new_value, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base {base['meta'].get('commit')}  new {new['meta'].get('commit')}")
+    rows = compare(base, new, args.threshold)
+    for name, metric, old_value, new_value, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<12} {metric:<18} {old_value:>12} {new_value:>12} {change:>+8.1%}{flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
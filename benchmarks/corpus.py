@@ -0,0 +1,170 @@
+"""
+Deterministic generator of synthetic business cards for benchmarking: card
+text covering many countries, phone formats and layouts, and the same card
+rendered as an image.
+
+Usage:
+    python benchmarks/corpus.py [--count 200] [--seed 7] [--out benchmarks/data/synthetic]
+
+Writes one PNG per card plus manifest.json holding each card's text and the
+fields it was generated from. The same seed always yields the same corpus, so
+benchmark runs on different commits see identical input.
+"""
+import io
+import os
+import json
+import random
+import argparse
+from PIL import Image, ImageDraw, ImageFont
+
+FIRST_NAMES = ["Neha", "James", "Amina", "Wei", "Carlos", "Fatima", "Olusegun", "Hannah", "Yuki", "Pierre",
+               "Grace", "Rahul", "Sofia", "Kwame", "Anna", "Mohammed", "Liam", "Chloe", "Tomasz", "Aisha"]
+LAST_NAMES = ["Patel", "Smith", "Otieno", "Zhang", "Garcia", "Hassan", "Adeyemi", "Muller", "Tanaka", "Dubois",
+              "Mwangi", "Sharma", "Rossi", "Mensah", "Kowalski", "Ali", "Murphy", "Martin", "Nowak", "Bello"]
+COMPANY_WORDS = ["Credit", "Horizon", "Summit", "Blue River", "Apex", "Savanna", "Northwind", "Golden Gate",
+                 "Evergreen", "Pinnacle", "Lakeside", "Crescent", "Meridian", "Atlas", "Sunrise"]
+COMPANY_KINDS = ["Limited", "Ltd", "Inc", "LLC", "GmbH", "Consulting", "Holdings", "Group", "Partners", "PLC"]
+TITLES = ["Managing Director", "Sales Manager", "Chief Executive Officer", "Account Executive",
+          "Head of Partnerships", "Business Development Lead", "Operations Director", "Consultant"]
+STREETS = ["Eden Square", "Riverside Drive", "Main Street", "Park Avenue", "Harbour Road", "Kings Lane",
+           "Central Boulevard", "Market Place", "Trade Tower", "Unity Building"]
+
+# (country, cities, phone number formats); '#' is replaced by a random digit
+COUNTRIES = [
+    ("Kenya", ["Nairobi", "Mombasa", "Kisumu"], ["+254 7## ######", "+254(20)#######", "07########", "+254-7##-###-###"]),
+    ("Uganda", ["Kampala", "Entebbe"], ["+256 7## ######", "07## ######"]),
+    ("Nigeria", ["Lagos", "Abuja"], ["+234 80# ### ####", "080########"]),
+    ("South Africa", ["Johannesburg", "Cape Town"], ["+27 ## ### ####", "0## ### ####"]),
+    ("United Kingdom", ["London", "Manchester"], ["+44 20 #### ####", "+44 (0)161 ### ####", "07### ######"]),
+    ("United States", ["New York", "Chicago", "San Francisco"], ["+1 (###) ###-####", "+1 ###.###.####", "###-###-####"]),
+    ("Germany", ["Berlin", "Munich"], ["+49 30 ########", "+49 (0)89 #######"]),
+    ("France", ["Paris", "Lyon"], ["+33 1 ## ## ## ##", "01 ## ## ## ##"]),
+    ("India", ["Mumbai", "Bangalore"], ["+91 98### #####", "+91-22-########"]),
+    ("Japan", ["Tokyo", "Osaka"], ["+81 3-####-####", "03-####-####"]),
+    ("Australia", ["Sydney", "Melbourne"], ["+61 2 #### ####", "04## ### ###"]),
+    ("Brazil", ["Sao Paulo", "Rio de Janeiro"], ["+55 11 #####-####"]),
+    ("United Arab Emirates", ["Dubai", "Abu Dhabi"], ["+971 4 ### ####", "+971 50 ### ####"]),
+]
+PHONE_LABELS = ["Tel:", "Mobile:", "Phone:", "Cell:", "T:", "M:", ""]
+LAYOUTS = ("left", "centered", "two_column")
+
+
+def _digits(rng, pattern):
+    return "".join(str(rng.randint(0, 9)) if ch == "#" else ch for ch in pattern)
+
+
+def make_card(rng):
+    """
+    Generate one card: its fields and the lines printed on it, in layout order.
+    """
+    country, cities, formats = rng.choice(COUNTRIES)
+    city = rng.choice(cities)
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_KINDS)}"
+    domain = company.split()[0].lower() + rng.choice(["", "group", "co"]) + rng.choice([".com", ".co.ke", ".net", ".org"])
+    phones = [_digits(rng, rng.choice(formats)) for _ in range(rng.choice([1, 1, 2]))]
+    fields = {
+        "contact_person": f"{first} {last}",
+        "title": rng.choice(TITLES),
+        "organization_name": company,
+        "email": f"{first.lower()}.{last.lower()}@{domain}",
+        "phone_numbers": phones,
+        "website": f"www.{domain}",
+        "address": f"{rng.randint(1, 999)} {rng.choice(STREETS)}, {city}, {country}",
+        "city": city,
+        "country": country,
+        "layout": rng.choice(LAYOUTS),
+    }
+    lines = [fields["organization_name"], fields["contact_person"], fields["title"]]
+    lines += [f"{rng.choice(PHONE_LABELS)} {phone}".strip() for phone in phones]
+    lines += [fields["email"], fields["website"], fields["address"]]
+    if rng.random() < 0.3:
+        lines.append(f"P.O. Box {rng.randint(100, 99999)}")
+    if rng.random() < 0.2:
+        lines.append(f"twitter.com/{first.lower()}{last.lower()}")
+    return fields, lines
+
+
+def _font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only ships the fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def render_card(lines, layout, width=1050, height=600):
+    """
+    Render card lines as a PNG on a white card placed on a grey background.
+    Returns the encoded image bytes.
+    """
+    margin = 60
+    image = Image.new("RGB", (width + 2 * margin, height + 2 * margin), (120, 120, 120))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([margin, margin, margin + width, margin + height], fill=(255, 255, 255))
+    title_font, body_font, small_font = _font(44), _font(30), _font(22)
+
+    if layout == "two_column":
+        columns = [lines[:3], lines[3:]]
+        x_positions = [margin + 40, margin + int(width * 0.4)]
+    else:
+        columns = [lines]
+        x_positions = [None]
+    for column, x in zip(columns, x_positions):
+        y = margin + 40
+        for number, line in enumerate(column):
+            font = title_font if number == 0 and column is columns[0] else body_font
+            line_width = draw.textlength(line, font=font)
+            if (x or margin + 40) + line_width > margin + width - 30:
+                font = small_font
+                line_width = draw.textlength(line, font=font)
+            if x is not None:
+                left = x
+            elif layout == "centered":
+                left = margin + (width - line_width) / 2
+            else:
+                left = margin + 40
+            draw.text((left, y), line, fill=(20, 20, 20), font=font)
+            y += 56 if font is title_font else 42
+
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate_corpus(count, seed=7, images=True):
+    """
+    Return `count` cards as dictionaries with 'name', 'text', 'fields' and,
+    if `images` is true, the rendered 'image' bytes.
+    """
+    rng = random.Random(seed)
+    cards = []
+    for number in range(count):
+        fields, lines = make_card(rng)
+        card = {"name": f"card_{number:05d}.png", "text": "\n".join(lines), "fields": fields}
+        if images:
+            card["image"] = render_card(lines, fields["layout"])
+        cards.append(card)
+    return cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "synthetic"))
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    manifest = []
+    for card in generate_corpus(args.count, args.seed):
+        with open(os.path.join(args.out, card["name"]), "wb") as f:
+            f.write(card["image"])
+        manifest.append({"name": card["name"], "text": card["text"], "fields": card["fields"]})
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": args.seed, "cards": manifest}, f, indent=2)
+    print(f"Wrote {len(manifest)} cards to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Benchmark suite for the extraction pipeline, run on the synthetic corpus from
+corpus.py. Each suite runs in a fresh interpreter so its peak RSS and model
+load are measured in isolation.
+
+Suites:
+    fields     regex field engine (fields.extract_fields) on card text
+    structure  restructure_extracted_text_to_json per card, and restructure_many
+    ocr        extract_text_with_timings on card images
+    api        POST /extract_text end to end, at each --concurrency level
+
+Usage:
+    python benchmarks/run_benchmarks.py [--suites fields,structure,ocr,api] [--count 100]
+        [--seed 7] [--concurrency 1,4] [--url http://127.0.0.1:8000] [--output results.json]
+
+Results (cards/sec, latency and per-stage percentiles in milliseconds, peak
+RSS) are written as JSON; compare two runs with compare_results.py. The api
+suite drives main.app in-process with the result cache disabled unless --url
+points it at a running server.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import resource
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import generate_corpus  # noqa: E402
+
+SUITES = ("fields", "structure", "ocr", "api")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(values):
+    """
+    Summary of a list of durations in milliseconds.
+    """
+    if not values:
+        return {}
+    ordered = sorted(values)
+    summary = {f"p{p}": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 3) for p in PERCENTILES}
+    summary["mean"] = round(sum(ordered) / len(ordered), 3)
+    summary["max"] = round(ordered[-1], 3)
+    return summary
+
+
+def stage_percentiles(timings_list):
+    stages = {}
+    for timings in timings_list:
+        for name, milliseconds in timings.items():
+            stages.setdefault(name, []).append(milliseconds)
+    return {name: percentiles(values) for name, values in sorted(stages.items())}
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def timed_calls(fn, items):
+    """
+    Call `fn` on each item; return (results, per-call ms, total seconds).
+    """
+    results, latencies = [], []
+    started = time.perf_counter()
+    for item in items:
+        call_started = time.perf_counter()
+        results.append(fn(item))
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return results, latencies, time.perf_counter() - started
+
+
+def bench_fields(cards, args):
+    from fields import extract_fields
+    texts = [card["text"] for card in cards] * args.repeat
+    _, latencies, elapsed = timed_calls(extract_fields, texts)
+    return {"cards": len(texts), "cards_per_sec": round(len(texts) / elapsed, 1), "latency_ms": percentiles(latencies)}
+
+
+def bench_structure(cards, args):
+    started = time.perf_counter()
+    from extract import restructure_extracted_text_to_json, restructure_many, get_nlp
+    get_nlp()
+    load_seconds = time.perf_counter() - started
+    texts = [card["text"] for card in cards]
+
+    timings_list = []
+
+    def structure(text):
+        timings = {}
+        restructure_extracted_text_to_json(text, timings=timings)
+        timings_list.append(timings)
+
+    structure(texts[0])  # warm-up
+    timings_list.clear()
+    _, latencies, elapsed = timed_calls(structure, texts)
+    batch_started = time.perf_counter()
+    restructure_many(texts)
+    batch_elapsed = time.perf_counter() - batch_started
+    return {
+        "cards": len(texts),
+        "load_seconds": round(load_seconds, 3),
+        "cards_per_sec": round(len(texts) / elapsed, 1),
+        "batch_cards_per_sec": round(len(texts) / batch_elapsed, 1),
+        "latency_ms": percentiles(latencies),
+        "stages_ms": stage_percentiles(timings_list),
+    }
+
+
+def bench_ocr(cards, args):
+    started = time.perf_counter()
+    from extract import extract_text_with_timings
+    from ocr_pool import get_ocr_pool
+    get_ocr_pool().warm_up()
+    load_seconds = time.perf_counter() - started
+    images = [card["image"] for card in cards]
+
+    extract_text_with_timings(images[0])  # warm-up
+    results, latencies, elapsed = timed_calls(extract_text_with_timings, images)
+    return {
+        "cards": len(images),
+        "load_seconds": round(load_seconds, 3),
+        "cards_per_sec": round(len(images) / elapsed, 2),
+        "latency_ms": percentiles(latencies),
+        "stages_ms": stage_percentiles([timings for _, timings in results]),
+    }
+
+
+def bench_api(cards, args):
+    if args.url:
+        import httpx
+        client = httpx.Client(base_url=args.url, timeout=120)
+        load_seconds = 0.0
+    else:
+        # Fresh state per run: no cache hits, throwaway database and job queue
+        workdir = tempfile.mkdtemp()
+        os.environ["RESULT_CACHE_SIZE"] = "0"
+        os.environ["MODEL_WARMUP"] = "blocking"
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        os.environ.setdefault("JOB_QUEUE_PATH", os.path.join(workdir, "jobs.db"))
+        started = time.perf_counter()
+        from fastapi.testclient import TestClient
+        import main
+        client = TestClient(main.app)
+        client.__enter__()
+        load_seconds = time.perf_counter() - started
+
+    def post(card):
+        call_started = time.perf_counter()
+        response = client.post("/extract_text", files={"image": (card["name"], card["image"], "image/png")})
+        latency = (time.perf_counter() - call_started) * 1000
+        body = response.json() if response.status_code == 200 else {}
+        return response.status_code, latency, body.get("timings", {})
+
+    post(cards[0])  # warm-up
+    levels = {}
+    for concurrency in args.concurrency:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(post, cards))
+        elapsed = time.perf_counter() - started
+        ok = [result for result in results if result[0] == 200]
+        levels[str(concurrency)] = {
+            "cards": len(cards),
+            "errors": len(cards) - len(ok),
+            "cards_per_sec": round(len(ok) / elapsed, 2),
+            "latency_ms": percentiles([latency for _, latency, _ in ok]),
+            "stages_ms": stage_percentiles([timings for _, _, timings in ok]),
+        }
+    if not args.url:
+        client.__exit__(None, None, None)
+    return {"load_seconds": round(load_seconds, 3), "target": args.url or "in-process", "concurrency": levels}
+
+
+BENCHMARKS = {"fields": bench_fields, "structure": bench_structure, "ocr": bench_ocr, "api": bench_api}
+
+
+def run_suite(args):
+    """
+    Child-process entry point: run one suite and write its result as JSON.
+    """
+    cards = generate_corpus(args.count, args.seed, images=args.suite in ("ocr", "api"))
+    try:
+        result = BENCHMARKS[args.suite](cards, args)
+    except ImportError as e:
+        result = {"skipped": f"missing dependency: {e}"}
+    result["peak_rss_mb"] = peak_rss_mb()
+    with open(args.suite_output, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default=",".join(SUITES))
+    parser.add_argument("--count", type=int, default=100, help="cards in the corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=20, help="passes over the corpus for the fields suite")
+    parser.add_argument("--concurrency", default="1,4", help="comma-separated concurrent clients for the api suite")
+    parser.add_argument("--url", help="benchmark a running server instead of main.app in-process")
+    parser.add_argument("--output", help="JSON results file (default: print to stdout)")
+    parser.add_argument("--suite", choices=SUITES, help=argparse.SUPPRESS)
+    parser.add_argument("--suite-output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in str(args.concurrency).split(",")]
+
+    if args.suite:
+        return run_suite(args)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "corpus": {"count": args.count, "seed": args.seed},
+        },
+        "suites": {},
+    }
+    for suite in args.suites.split(","):
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+            suite_output = f.name
+        command = [sys.executable, os.path.abspath(__file__), "--suite", suite, "--suite-output", suite_output,
+                   "--count", str(args.count), "--seed", str(args.seed), "--repeat", str(args.repeat),
+                   "--concurrency", ",".join(map(str, args.concurrency))]
+        if args.url:
+            command += ["--url", args.url]
+        print(f"Running {suite} suite...", file=sys.stderr)
+        completed = subprocess.run(command, cwd=ROOT)
+        if completed.returncode == 0:
+            with open(suite_output, encoding="utf-8") as f:
+                results["suites"][suite] = json.load(f)
+        else:
+            results["suites"][suite] = {"error": f"exited with status {completed.returncode}"}
+        os.unlink(suite_output)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Local stand-in for the OpenAI chat completions API, for exercising the LLM
+client (timeouts, retries, concurrency limits) without network access or cost.
+
+Usage:
+    python benchmarks/stub_llm_server.py --port 8001 --latency 0.8 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub python extract_usin_llm.py
+"""
+import json
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+settings = {"latency": 0.5, "error_rate": 0.0}
+
+CANNED_DATA = {
+    "data": {
+        "email": "info@example.com",
+        "phone_numbers": ["+254720585960"],
+        "agent_name": "Jane Doe",
+        "company_name": "Example Ltd",
+        "web_presence": {"website": "www.example.com", "facebook": None, "instagram": None, "twitter": None},
+    }
+}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    await asyncio.sleep(settings["latency"])
+    if random.random() < settings["error_rate"]:
+        return JSONResponse(status_code=503, content={"error": {"message": "stub overloaded"}})
+    prompt = " ".join(message["content"] for message in body.get("messages", []))
+    return {
+        "choices": [{"message": {"role": "assistant", "content": json.dumps(CANNED_DATA)}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 80, "total_tokens": len(prompt) // 4 + 80},
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before each response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+    settings.update(latency=args.latency, error_rate=args.error_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,430 @@
+"""
+Offline bulk extraction of business card scans, without the HTTP API.
+
+Sources may be directories (searched recursively), zip archives, single
+image files or glob patterns ("scans/**/*.jpg"). Files are identified by
+their content, not their extension, so anything that is not an image is
+reported as skipped.
+
+Cards are OCRed and structured in batches by worker processes forked after
+the spaCy model and the gazetteer are loaded (see EXTRACTION_EXECUTOR=fork);
+each worker builds its OCR engine once and keeps it warm for the whole run.
+
+Results are written as each batch finishes, to JSONL or CSV (--output) and/or
+straight into the prospects table (--db). Every finished card is then
+appended to a checkpoint file, so a run that is interrupted resumes where it
+stopped when started again with the same arguments. A throughput and error
+summary is printed as JSON when the run ends.
+
+Usage:
+    python bulk_extract.py SOURCE [SOURCE ...] [--output cards.jsonl|cards.csv] [--db]
+        [--workers N] [--batch-size 8] [--checkpoint PATH] [--restart] [--retry-errors]
+        [--owner-id ID] [--lead-source TEXT] [--allow-duplicates]
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import signal
+import logging
+import zipfile
+import argparse
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from uploads import IMAGE_KINDS, MAX_UPLOAD_BYTES, SNIFF_BYTES, sniff_kind
+from ocr_pool import OCR_CPU_THREADS, get_ocr_pool
+from extract import extract_and_structure_many
+from warmup import preload_for_fork
+from database import SessionLocal, engine
+from models.base import Base
+from models.prospect_model import Prospect
+from dedupe_index import get_dedupe_index
+from crud.prospect_crud import CARD_FIELDS, bulk_create_prospects_from_cards
+
+logger = logging.getLogger("bulk_extract")
+
+OUTPUT_FORMATS = ("jsonl", "csv")
+# Separates an archive's path from a member's name in a card's source id
+ZIP_MEMBER_SEPARATOR = "::"
+# Batches queued per worker, so a worker never waits for the next one
+BATCHES_PER_WORKER = 2
+
+
+# -----------------------------------------------------------------------------
+# Sources
+# -----------------------------------------------------------------------------
+def _zip_cards(path):
+    with zipfile.ZipFile(path) as archive:
+        return [(f"{path}{ZIP_MEMBER_SEPARATOR}{member.filename}", path, member.filename)
+                for member in archive.infolist() if not member.is_dir()]
+
+
+def _file_cards(path):
+    if zipfile.is_zipfile(path):
+        return _zip_cards(path)
+    return [(path, path, None)]
+
+
+def list_cards(sources):
+    """
+    Expands the sources into (source id, path, zip member or None) tuples,
+    in a stable order so that resumed runs see the same cards. Paths are
+    made absolute; a file named twice is listed once.
+    """
+    cards = []
+    seen = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths = sorted(os.path.join(root, name) for root, _, names in os.walk(source) for name in names)
+        elif os.path.isfile(source):
+            paths = [source]
+        else:
+            paths = sorted(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+            if not paths:
+                raise FileNotFoundError(f"No files match {source}")
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in seen:
+                seen.add(path)
+                cards.extend(_file_cards(path))
+    return cards
+
+
+def _read_card(path, member, archives):
+    if member is None:
+        if os.path.getsize(path) > MAX_UPLOAD_BYTES:
+            raise ValueError(f"File too large (maximum is {MAX_UPLOAD_BYTES} bytes)")
+        with open(path, "rb") as f:
+            return f.read()
+    if path not in archives:
+        archives[path] = zipfile.ZipFile(path)
+    info = archives[path].getinfo(member)
+    if info.file_size > MAX_UPLOAD_BYTES:
+        raise ValueError(f"File too large (maximum is {MAX_UPLOAD_BYTES} bytes)")
+    return archives[path].read(info)
+
+
+# -----------------------------------------------------------------------------
+# Extraction (runs in the worker processes)
+# -----------------------------------------------------------------------------
+def _init_worker():
+    # Ctrl-C is handled by the parent, which lets running batches finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Build this worker's OCR engine before it takes its first batch
+    get_ocr_pool().warm_up()
+
+
+def extract_batch(cards):
+    """
+    Reads and extracts a batch of (source id, path, member) cards with one OCR
+    engine checkout and one batched spaCy pass. Returns one record per card,
+    in order, with a 'status' of 'ok', 'error' or 'skipped' (not an image).
+    """
+    records = [None] * len(cards)
+    images = []
+    archives = {}
+    try:
+        for position, (source, path, member) in enumerate(cards):
+            try:
+                data = _read_card(path, member, archives)
+            except Exception as e:
+                records[position] = {"source": source, "status": "error", "error": str(e)}
+                continue
+            if sniff_kind(data[:SNIFF_BYTES]) not in IMAGE_KINDS:
+                records[position] = {"source": source, "status": "skipped", "error": "Not an image"}
+                continue
+            images.append((position, data))
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+    results = extract_and_structure_many([data for _, data in images]) if images else []
+    for (position, _), result in zip(images, results):
+        source = cards[position][0]
+        if "error" in result:
+            records[position] = {"source": source, "status": "error", "error": result["error"],
+                                 "timings": result["timings"]}
+        else:
+            records[position] = {"source": source, "status": "ok", "extracted_text": result["extracted_text"],
+                                 "final_data": result["final_data"], "timings": result["timings"]}
+    return records
+
+
+def _batches(cards, size):
+    for start in range(0, len(cards), size):
+        yield cards[start:start + size]
+
+
+def run_batches(cards, workers, batch_size):
+    """
+    Yields the records of each batch as soon as it finishes, in completion
+    order. With `workers` of 0 everything runs in this process; otherwise the
+    models are preloaded here and shared with forked workers copy-on-write,
+    and at most BATCHES_PER_WORKER batches per worker are in flight.
+    """
+    batches = _batches(cards, batch_size)
+    if workers == 0:
+        get_ocr_pool().warm_up()
+        for batch in batches:
+            yield extract_batch(batch)
+        return
+
+    preload_for_fork()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"),
+                               initializer=_init_worker)
+    pending = set()
+    try:
+        for batch in batches:
+            pending.add(pool.submit(extract_batch, batch))
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # On an interrupt, drop the queued batches instead of finishing them
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+# -----------------------------------------------------------------------------
+# Outputs
+# -----------------------------------------------------------------------------
+class JsonlSink:
+    """One JSON object per card: source, status, error, extracted text and fields."""
+
+    def __init__(self, path, append):
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps({name: value for name, value in record.items() if name != "timings"}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class CsvSink:
+    """One row per card, with a column per structured card field."""
+
+    COLUMNS = ("source", "status", "error", "lead_serial_number") + CARD_FIELDS
+
+    def __init__(self, path, append):
+        new_file = not append or not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a" if append else "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.COLUMNS, extrasaction="ignore")
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, records):
+        for record in records:
+            self._writer.writerow({**record.get("final_data", {}), **record})
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class DatabaseSink:
+    """
+    Inserts the extracted cards of each batch into the prospects table in one
+    transaction, skipping cards that match existing prospects unless
+    duplicates are allowed. Sets each record's lead_serial_number, or its
+    status to 'duplicate'.
+    """
+
+    def __init__(self, allow_duplicates, fields):
+        Base.metadata.create_all(bind=engine)
+        for index in Prospect.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+        self._db = SessionLocal()
+        get_dedupe_index().load(self._db)
+        self.allow_duplicates = allow_duplicates
+        self.fields = fields
+
+    def write(self, records):
+        extracted = [record for record in records if record["status"] == "ok"]
+        if not extracted:
+            return
+        results = bulk_create_prospects_from_cards(self._db, [record["final_data"] for record in extracted],
+                                                   allow_duplicates=self.allow_duplicates, **self.fields)
+        for record, result in zip(extracted, results):
+            if result["status"] == "created":
+                record["lead_serial_number"] = result["lead_serial_number"]
+            else:
+                record["status"] = result["status"]
+                record["error"] = result["detail"]
+                if "duplicates" in result:
+                    record["duplicates"] = result["duplicates"]
+
+    def close(self):
+        self._db.close()
+
+
+class Checkpoint:
+    """
+    Append-only JSONL record of the cards already written, by source id. A
+    line torn by a crash is ignored, so that card is simply processed again.
+    """
+
+    def __init__(self, path, restart):
+        self.done = {}
+        if not restart and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.done[entry["source"]] = entry["status"]
+        self._file = open(path, "w" if restart else "a", encoding="utf-8")
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps({"source": record["source"], "status": record["status"]}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+# -----------------------------------------------------------------------------
+# Summary
+# -----------------------------------------------------------------------------
+class RunSummary:
+    """Counts, throughput, mean stage durations and the most common errors."""
+
+    def __init__(self, total, resumed):
+        self.total = total
+        self.resumed = resumed
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.stage_totals = Counter()
+        self.stage_counts = Counter()
+        self.started = time.perf_counter()
+
+    def add(self, records):
+        for record in records:
+            self.statuses[record["status"]] += 1
+            if record["status"] == "error":
+                self.errors[record["error"]] += 1
+            for name, milliseconds in record.get("timings", {}).items():
+                self.stage_totals[name] += milliseconds
+                self.stage_counts[name] += 1
+
+    @property
+    def processed(self):
+        return sum(self.statuses.values())
+
+    def progress(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.processed}/{self.total - self.resumed} cards, {self.statuses['error']} errors, "
+                f"{self.processed / elapsed:.2f} cards/sec" if elapsed else "")
+
+    def report(self, interrupted=False):
+        elapsed = time.perf_counter() - self.started
+        extracted = self.processed - self.statuses["error"] - self.statuses["skipped"]
+        return {
+            "cards": self.total,
+            "resumed": self.resumed,
+            "processed": self.processed,
+            "statuses": dict(self.statuses),
+            "interrupted": interrupted,
+            "elapsed_seconds": round(elapsed, 3),
+            "cards_per_sec": round(extracted / elapsed, 2) if elapsed else 0.0,
+            "stages_ms_mean": {name: round(self.stage_totals[name] / self.stage_counts[name], 3)
+                               for name in sorted(self.stage_totals)},
+            "top_errors": [{"error": error, "count": count} for error, count in self.errors.most_common(10)],
+        }
+
+
+# -----------------------------------------------------------------------------
+# Command line
+# -----------------------------------------------------------------------------
+def _default_workers():
+    # Each OCR engine already runs OCR_CPU_THREADS math threads
+    return max(1, (os.cpu_count() or 1) // OCR_CPU_THREADS)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="directories, zip archives, image files or glob patterns")
+    parser.add_argument("--output", help="write results to this JSONL or CSV file")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, help="output format (default: from --output's extension)")
+    parser.add_argument("--db", action="store_true", help="insert extracted cards into the prospects table")
+    parser.add_argument("--workers", type=int, default=_default_workers(),
+                        help="worker processes; 0 runs in this process (default: CPUs / OCR_CPU_THREADS)")
+    parser.add_argument("--batch-size", type=int, default=8, help="cards OCRed per engine checkout")
+    parser.add_argument("--checkpoint", help="progress file (default: OUTPUT.checkpoint, or bulk_extract.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and overwrite the output")
+    parser.add_argument("--retry-errors", action="store_true", help="process cards that failed in earlier runs again")
+    parser.add_argument("--owner-id", type=int, help="owner_id of the prospects created with --db")
+    parser.add_argument("--lead-source", help="lead_source of the prospects created with --db")
+    parser.add_argument("--allow-duplicates", action="store_true",
+                        help="with --db, also save cards that match existing prospects")
+    args = parser.parse_args(argv)
+
+    if not args.output and not args.db:
+        parser.error("give --output, --db or both")
+    if args.output and args.format is None:
+        args.format = os.path.splitext(args.output)[1].lstrip(".").lower()
+        if args.format not in OUTPUT_FORMATS:
+            parser.error("cannot tell the output format from the file name; pass --format")
+    if args.workers < 0 or args.batch_size < 1:
+        parser.error("--workers must be 0 or more and --batch-size at least 1")
+    if args.checkpoint is None:
+        args.checkpoint = f"{args.output}.checkpoint" if args.output else "bulk_extract.checkpoint"
+    return args
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(name)s %(message)s")
+    args = parse_args(argv)
+
+    cards = list_cards(args.sources)
+    checkpoint = Checkpoint(args.checkpoint, args.restart)
+    finished = {source for source, status in checkpoint.done.items()
+                if not (args.retry_errors and status == "error")}
+    todo = [card for card in cards if card[0] not in finished]
+    summary = RunSummary(len(cards), len(cards) - len(todo))
+    logger.info(f"{len(cards)} card(s) found, {summary.resumed} already done, {len(todo)} to process "
+                f"with {args.workers} worker(s)")
+
+    sinks = []
+    if args.db:
+        sinks.append(DatabaseSink(args.allow_duplicates, {"owner_id": args.owner_id, "lead_source": args.lead_source}))
+    if args.output:
+        sink_class = JsonlSink if args.format == "jsonl" else CsvSink
+        sinks.append(sink_class(args.output, append=not args.restart))
+
+    interrupted = False
+    try:
+        for records in run_batches(todo, args.workers, args.batch_size):
+            # The database sink runs first so file outputs carry the serial numbers
+            for sink in sinks:
+                sink.write(records)
+            checkpoint.write(records)
+            summary.add(records)
+            logger.info(summary.progress())
+    except KeyboardInterrupt:
+        interrupted = True
+        logger.info("Interrupted; run again with the same arguments to resume")
+    finally:
+        for sink in sinks:
+            sink.close()
+        checkpoint.close()
+
+    print(json.dumps(summary.report(interrupted), indent=2))
+    return 130 if interrupted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
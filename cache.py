@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Maximum entries kept in memory (0 disables the cache entirely)
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+# Seconds an entry stays valid (0 = never expires)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+# Optional SQLite file that keeps results across restarts
+RESULT_CACHE_PATH = os.getenv("RESULT_CACHE_PATH")
+# Maximum entries kept on disk
+RESULT_CACHE_DISK_SIZE = int(os.getenv("RESULT_CACHE_DISK_SIZE", "100000"))
+# Bump when the extraction logic changes so stale on-disk results are ignored
+CACHE_VERSION = "5"
+# Settings that change the result for the same input; their values are folded
+# into every namespace, so changing one does not serve results of the old one
+OUTPUT_SETTINGS = ("OCR_LAYOUT_FIELDS", "OCR_MIN_LINE_CONFIDENCE", "OCR_MAX_SIDE", "OCR_CROP_CARD",
+                   "OCR_SKIP_CLS_IF_UPRIGHT", "GAZETTEER_DATA_DIR", "HYBRID_CONFIDENCE_THRESHOLD")
+
+
+def settings_fingerprint(names=OUTPUT_SETTINGS):
+    """
+    Short hash of the configured values of the output-changing settings.
+    """
+    values = "\n".join(f"{name}={os.getenv(name, '')}" for name in names)
+    return hashlib.sha256(values.encode("utf-8")).hexdigest()[:12]
+
+
+def image_key(image_bytes):
+    """
+    Content hash of an uploaded image.
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def normalize_text(text):
+    """
+    Normalizes OCR text for cache lookups: strips each line and drops blank ones.
+    """
+    return "\n".join(line.strip() for line in text.splitlines() if line.strip())
+
+
+def text_key(text):
+    """
+    Content hash of normalized OCR text.
+    """
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    LRU cache with TTL for extraction results, optionally backed by SQLite.
+
+    Values are stored as JSON and decoded on every hit, so callers always get
+    a fresh copy that is identical to what was originally computed.
+    """
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, path=RESULT_CACHE_PATH,
+                 max_disk_entries=RESULT_CACHE_DISK_SIZE, fingerprint=None):
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint or settings_fingerprint()
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._writes = 0
+        self._db = None
+        if path and max_entries > 0:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL, created_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+            logger.info(f"Result cache persisted to {path}")
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def _namespace(self, namespace):
+        return f"v{CACHE_VERSION}:{self.fingerprint}:{namespace}"
+
+    def get(self, namespace, key):
+        """
+        Return the cached value or None on a miss.
+        """
+        if not self.enabled:
+            return None
+        full_key = (self._namespace(namespace), key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(full_key)
+            if entry is not None:
+                expires_at, payload = entry
+                if expires_at is None or expires_at > now:
+                    self._entries.move_to_end(full_key)
+                    self._hits += 1
+                    return json.loads(payload)
+                del self._entries[full_key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM result_cache WHERE namespace = ? AND key = ?", full_key
+                ).fetchone()
+                if row is not None and (row[1] is None or row[1] > now):
+                    self._store(full_key, row[1], row[0])
+                    self._hits += 1
+                    self._disk_hits += 1
+                    return json.loads(row[0])
+
+            self._misses += 1
+            return None
+
+    def set(self, namespace, key, value):
+        """
+        Cache a JSON-serializable value.
+        """
+        if not self.enabled:
+            return
+        full_key = (self._namespace(namespace), key)
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        payload = json.dumps(value)
+        with self._lock:
+            self._store(full_key, expires_at, payload)
+            self._writes += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO result_cache (namespace, key, value, expires_at, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (*full_key, payload, expires_at, now),
+                )
+                if self._writes % 100 == 0:
+                    self._prune_disk(now)
+                self._db.commit()
+
+    async def aget(self, namespace, key):
+        """
+        get() for coroutines: with a persistent cache the SQLite lookup runs
+        in a thread instead of blocking the event loop.
+        """
+        if self._db is None:
+            return self.get(namespace, key)
+        return await asyncio.to_thread(self.get, namespace, key)
+
+    async def aset(self, namespace, key, value):
+        """
+        set() for coroutines: with a persistent cache the SQLite write and
+        commit run in a thread instead of blocking the event loop.
+        """
+        if self._db is None:
+            return self.set(namespace, key, value)
+        await asyncio.to_thread(self.set, namespace, key, value)
+
+    def _store(self, full_key, expires_at, payload):
+        self._entries[full_key] = (expires_at, payload)
+        self._entries.move_to_end(full_key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def _prune_disk(self, now):
+        self._db.execute("DELETE FROM result_cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM result_cache WHERE rowid IN ("
+            "SELECT rowid FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM result_cache")
+                self._db.commit()
+
+    def stats(self):
+        """
+        Return hit/miss counters and current size.
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "persistent": self._db is not None,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Return the process-wide result cache, creating it on first use.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
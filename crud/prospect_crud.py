@@ -1,20 +1,131 @@
+import os
+from datetime import datetime
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
 from models.prospect_model import Prospect
 from schemas.prospect_schema import ProspectCreate, ProspectUpdate
+from dedupe_index import DuplicateIndex, get_dedupe_index
+from phones import normalize_phone_batch, parse_phone, to_e164
+from timings import timed
 
+# Rows written per transaction by the bulk operations
+BULK_CHUNK_SIZE = int(os.getenv("PROSPECT_BULK_CHUNK_SIZE", "500"))
+# Structured card fields (see restructure_extracted_text_to_json) stored as-is on a prospect
+CARD_FIELDS = ("organization_name", "contact_person", "primary_phone_number", "other_phone_number",
+               "email", "industry", "city", "country", "website")
+PHONE_FIELDS = ("primary_phone_number", "other_phone_number")
+
+def normalize_phones(mappings):
+    """
+    Rewrite the phone columns of prospect mappings in place to E.164 (using
+    each row's country for national numbers), normalizing the whole batch in
+    one pass. Numbers that cannot be placed are kept as given.
+    """
+    for name in PHONE_FIELDS:
+        rows = [mapping for mapping in mappings if mapping.get(name)]
+        values = normalize_phone_batch([(mapping[name], mapping.get("country")) for mapping in rows])
+        for mapping, value in zip(rows, values):
+            mapping[name] = value
+    return mappings
+
+def _not_e164(column):
+    # Matches stored numbers that may predate normalization: no leading '+',
+    # or separators E.164 never contains
+    return and_(column.isnot(None), or_(~column.like("+%"), *(column.like(f"%{ch}%") for ch in " -()./")))
+
+def _validated_e164(number, country):
+    phone = parse_phone(number, country) if number else None
+    return phone.e164 if phone and phone.valid else None
+
+@timed("db_backfill_phone_numbers")
+def backfill_phone_numbers(db: Session, chunk_size: int = BULK_CHUNK_SIZE):
+    """
+    One-off migration of phone numbers stored before they were normalized:
+    rewrites them to E.164 as new rows are, so that phone lookups, which are
+    equality matches, find them. Only rows not already in E.164 form are read,
+    a chunk per transaction; numbers that cannot be placed or do not fit their
+    country's numbering plan are left as they are. Safe to run repeatedly.
+    Returns the number of rows updated.
+    """
+    legacy = or_(*(_not_e164(getattr(Prospect, name)) for name in PHONE_FIELDS))
+    updated = 0
+    last_serial_number = None
+    while True:
+        query = db.query(Prospect.lead_serial_number, Prospect.primary_phone_number,
+                         Prospect.other_phone_number, Prospect.country).filter(legacy)
+        if last_serial_number is not None:
+            query = query.filter(Prospect.lead_serial_number > last_serial_number)
+        rows = query.order_by(Prospect.lead_serial_number).limit(chunk_size).all()
+        if not rows:
+            return updated
+        last_serial_number = rows[-1][0]
+        changed = []
+        for key, *numbers, country in rows:
+            # Only numbers that fit their country's plan are rewritten; anything
+            # else may be an OCR misread and is kept as it was entered
+            values = [_validated_e164(number, country) or number for number in numbers]
+            if values != numbers:
+                changed.append({"lead_serial_number": key, **dict(zip(PHONE_FIELDS, values))})
+        if changed:
+            db.bulk_update_mappings(Prospect, changed)
+            db.commit()
+            updated += len(changed)
+
+@timed("db_get_prospect")
 def get_prospect(db: Session, lead_serial_number: int):
     """
     Retrieve a single prospect by its lead serial number.
     """
     return db.query(Prospect).filter(Prospect.lead_serial_number == lead_serial_number).first()
 
+@timed("db_get_prospects")
 def get_prospects(db: Session, skip: int = 0, limit: int = 100):
     """
     Retrieve multiple prospects with optional pagination.
     """
     return db.query(Prospect).offset(skip).limit(limit).all()
 
+@timed("db_list_prospects")
+def list_prospects(db: Session, cursor: int = None, limit: int = 100, owner_id: int = None,
+                   is_won: bool = None, is_dropped: bool = None, country: str = None, city: str = None,
+                   date_from=None, date_to=None, phone: str = None):
+    """
+    Retrieve a page of prospects ordered by lead serial number, using keyset
+    pagination: `cursor` is the last serial number of the previous page.
+    Unlike OFFSET, the cost of a page does not grow with its depth.
+    `phone` matches either phone column in any format that normalizes to the
+    same E.164 number (national numbers use `country` for the calling code).
+    Returns (prospects, next_cursor); next_cursor is None on the last page.
+    """
+    query = db.query(Prospect)
+    if owner_id is not None:
+        query = query.filter(Prospect.owner_id == owner_id)
+    if is_won is not None:
+        query = query.filter(Prospect.is_won == is_won)
+    if is_dropped is not None:
+        query = query.filter(Prospect.is_dropped == is_dropped)
+    if country is not None:
+        query = query.filter(Prospect.country == country)
+    if city is not None:
+        query = query.filter(Prospect.city == city)
+    if phone is not None:
+        # The number as typed also matches rows stored before normalization
+        numbers = list({to_e164(phone, country) or phone.strip(), phone.strip()})
+        query = query.filter(or_(Prospect.primary_phone_number.in_(numbers), Prospect.other_phone_number.in_(numbers)))
+    if date_from is not None:
+        query = query.filter(Prospect.date >= date_from)
+    if date_to is not None:
+        query = query.filter(Prospect.date < date_to)
+    if cursor is not None:
+        query = query.filter(Prospect.lead_serial_number > cursor)
+
+    # Fetch one extra row to learn whether another page follows
+    rows = query.order_by(Prospect.lead_serial_number).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].lead_serial_number if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+@timed("db_create_prospect")
 def create_prospect(db: Session, prospect: ProspectCreate):
     # Check if a prospect with the given serial number already exists
     existing_prospect = db.query(Prospect).filter(Prospect.lead_serial_number == prospect.lead_serial_number).first()
@@ -23,13 +134,15 @@ def create_prospect(db: Session, prospect: ProspectCreate):
         raise HTTPException(status_code=400, detail="A prospect with this serial number already exists.")
     
     # If no existing prospect, proceed to create a new one
-    new_prospect = Prospect(**prospect.dict())
+    new_prospect = Prospect(**normalize_phones([prospect.dict()])[0])
     db.add(new_prospect)
     db.commit()
     db.refresh(new_prospect)
+    get_dedupe_index().upsert(new_prospect)
     return new_prospect
 
 
+@timed("db_update_prospect")
 def update_prospect(db: Session, lead_serial_number: int, updates: ProspectUpdate):
     """
     Update a prospect's details based on the lead serial number.
@@ -42,8 +155,10 @@ def update_prospect(db: Session, lead_serial_number: int, updates: ProspectUpdat
         setattr(db_prospect, var, value) if value is not None else None
     db.commit()
     db.refresh(db_prospect)
+    get_dedupe_index().upsert(db_prospect)
     return db_prospect
 
+@timed("db_delete_prospect")
 def delete_prospect(db: Session, lead_serial_number: int):
     """
     Delete a prospect using its lead serial number.
@@ -54,4 +169,218 @@ def delete_prospect(db: Session, lead_serial_number: int):
     
     db.delete(db_prospect)
     db.commit()
-    return True
\ No newline at end of file
+    get_dedupe_index().remove(lead_serial_number)
+    return True
+
+def prospect_from_card(card, **fields):
+    """
+    Map structured card data onto a new Prospect. `fields` supplies the values
+    a card cannot carry (owner_id, lead_source, ...) and, when not None,
+    overrides the extracted ones.
+    """
+    values = {"is_dropped": False, "is_won": False, "date": datetime.utcnow()}
+    values.update({name: card.get(name) for name in CARD_FIELDS})
+    values.update({name: value for name, value in fields.items() if value is not None})
+    return Prospect(**normalize_phones([values])[0])
+
+@timed("db_create_prospect_from_card")
+def create_prospect_from_card(db: Session, card, **fields):
+    """
+    Persist a prospect built from card data in a single transaction. Without a
+    lead_serial_number the database assigns the next one.
+    """
+    new_prospect = prospect_from_card(card, **fields)
+    if new_prospect.lead_serial_number is not None and get_prospect(db, new_prospect.lead_serial_number):
+        raise HTTPException(status_code=400, detail="A prospect with this serial number already exists.")
+    db.add(new_prospect)
+    db.commit()
+    db.refresh(new_prospect)
+    get_dedupe_index().upsert(new_prospect)
+    return new_prospect
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def _existing_serial_numbers(db: Session, serial_numbers):
+    """
+    Return which of the given lead serial numbers already exist, in one query.
+    """
+    rows = db.query(Prospect.lead_serial_number).filter(Prospect.lead_serial_number.in_(serial_numbers)).all()
+    return {row[0] for row in rows}
+
+def _result(index, lead_serial_number, status, detail=None):
+    return {"index": index, "lead_serial_number": lead_serial_number, "status": status, "detail": detail}
+
+def _insert_chunk(db: Session, rows):
+    """
+    Insert (index, mapping) rows in one transaction. If the chunk fails (for
+    example a concurrent insert of the same key), retry row by row so that
+    only the offending rows are reported as errors.
+    """
+    index = get_dedupe_index()
+    try:
+        db.bulk_insert_mappings(Prospect, [mapping for _, mapping in rows])
+        db.commit()
+        for _, mapping in rows:
+            index.upsert(mapping)
+        return [_result(position, mapping["lead_serial_number"], "created") for position, mapping in rows]
+    except Exception:
+        db.rollback()
+
+    results = []
+    for position, mapping in rows:
+        try:
+            db.bulk_insert_mappings(Prospect, [mapping])
+            db.commit()
+            index.upsert(mapping)
+            results.append(_result(position, mapping["lead_serial_number"], "created"))
+        except Exception as e:
+            db.rollback()
+            results.append(_result(position, mapping["lead_serial_number"], "error", str(e.__class__.__name__)))
+    return results
+
+@timed("db_bulk_create_prospects")
+def bulk_create_prospects(db: Session, prospects, chunk_size: int = BULK_CHUNK_SIZE):
+    """
+    Create many prospects using one existence query and one bulk insert per
+    chunk. Rows whose serial number already exists (or repeats within the
+    request) are skipped. Returns one result per input row, in input order.
+    """
+    results = [None] * len(prospects)
+    seen = set()
+    indexed = list(enumerate(prospects))
+    for chunk in _chunks(indexed, chunk_size):
+        existing = _existing_serial_numbers(db, [p.lead_serial_number for _, p in chunk])
+        to_insert = []
+        for index, prospect in chunk:
+            key = prospect.lead_serial_number
+            if key in existing:
+                results[index] = _result(index, key, "exists", "A prospect with this serial number already exists.")
+            elif key in seen:
+                results[index] = _result(index, key, "duplicate", "Serial number repeated in this request.")
+            else:
+                to_insert.append((index, prospect.dict()))
+            seen.add(key)
+        normalize_phones([mapping for _, mapping in to_insert])
+        if to_insert:
+            for result in _insert_chunk(db, to_insert):
+                results[result["index"]] = result
+    return results
+
+@timed("db_bulk_create_prospects_from_cards")
+def bulk_create_prospects_from_cards(db: Session, cards, allow_duplicates: bool = False, **fields):
+    """
+    Create prospects from structured card data in one transaction, with serial
+    numbers assigned by the database (one batched INSERT on flush). Unless
+    `allow_duplicates`, a card matching an existing prospect or an earlier
+    card of the same call is skipped. Returns one result per card, in input
+    order, with the matches of skipped cards under 'duplicates'.
+    """
+    results = [None] * len(cards)
+    index = get_dedupe_index()
+    if not allow_duplicates:
+        # Prospects saved meanwhile by other processes count as duplicates too
+        index.refresh(db)
+    # Cards accepted so far in this call, keyed by their position
+    accepted = DuplicateIndex()
+    new_prospects = []
+    for position, card in enumerate(cards):
+        prospect = prospect_from_card(card, **fields)
+        if not allow_duplicates:
+            duplicates = index.find_duplicates(card) + [
+                {**match, "lead_serial_number": None, "index": match["lead_serial_number"]}
+                for match in accepted.find_duplicates(card)
+            ]
+            if duplicates:
+                results[position] = {**_result(position, None, "duplicate", "Card matches existing prospects."),
+                                     "duplicates": duplicates}
+                continue
+            accepted.upsert({**card, "lead_serial_number": position})
+        new_prospects.append((position, prospect))
+    if not new_prospects:
+        return results
+
+    try:
+        db.add_all([prospect for _, prospect in new_prospects])
+        db.flush()
+        # Read back before commit expires the instances
+        mappings = [(position, {column.name: getattr(prospect, column.name) for column in Prospect.__table__.columns})
+                    for position, prospect in new_prospects]
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        for position, _ in new_prospects:
+            results[position] = _result(position, None, "error", str(e.__class__.__name__))
+        return results
+    for position, mapping in mappings:
+        index.upsert(mapping)
+        results[position] = _result(position, mapping["lead_serial_number"], "created")
+    return results
+
+@timed("db_bulk_upsert_prospects")
+def bulk_upsert_prospects(db: Session, prospects, chunk_size: int = BULK_CHUNK_SIZE):
+    """
+    Insert new prospects and overwrite existing ones, one existence query and
+    one transaction per chunk. When a serial number repeats, the last row wins.
+    Returns one result per input row, in input order.
+    """
+    results = [None] * len(prospects)
+    indexed = list(enumerate(prospects))
+    for chunk in _chunks(indexed, chunk_size):
+        existing = _existing_serial_numbers(db, [p.lead_serial_number for _, p in chunk])
+        latest = {}
+        for index, prospect in chunk:
+            key = prospect.lead_serial_number
+            if key in latest:
+                previous = latest[key][0]
+                results[previous] = _result(previous, key, "superseded", "A later row has the same serial number.")
+            latest[key] = (index, prospect.dict())
+
+        normalize_phones([mapping for _, mapping in latest.values()])
+        inserts = [(index, mapping) for key, (index, mapping) in latest.items() if key not in existing]
+        updates = [(index, mapping) for key, (index, mapping) in latest.items() if key in existing]
+        try:
+            if inserts:
+                db.bulk_insert_mappings(Prospect, [mapping for _, mapping in inserts])
+            if updates:
+                db.bulk_update_mappings(Prospect, [mapping for _, mapping in updates])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            for index, mapping in inserts + updates:
+                results[index] = _result(index, mapping["lead_serial_number"], "error", str(e.__class__.__name__))
+            continue
+        for index, mapping in inserts:
+            results[index] = _result(index, mapping["lead_serial_number"], "created")
+            get_dedupe_index().upsert(mapping)
+        for index, mapping in updates:
+            results[index] = _result(index, mapping["lead_serial_number"], "updated")
+            get_dedupe_index().upsert(mapping)
+    return results
+
+@timed("db_bulk_delete_prospects")
+def bulk_delete_prospects(db: Session, lead_serial_numbers, chunk_size: int = BULK_CHUNK_SIZE):
+    """
+    Delete many prospects with one DELETE statement per chunk.
+    Returns one result per input serial number, in input order.
+    """
+    results = []
+    seen = set()
+    for chunk in _chunks(list(enumerate(lead_serial_numbers)), chunk_size):
+        keys = [key for _, key in chunk]
+        existing = _existing_serial_numbers(db, keys)
+        db.query(Prospect).filter(Prospect.lead_serial_number.in_(existing)).delete(synchronize_session=False)
+        db.commit()
+        for key in existing:
+            get_dedupe_index().remove(key)
+        for index, key in chunk:
+            if key in seen:
+                results.append(_result(index, key, "duplicate", "Serial number repeated in this request."))
+            elif key in existing:
+                results.append(_result(index, key, "deleted"))
+            else:
+                results.append(_result(index, key, "not_found"))
+            seen.add(key)
+    return results
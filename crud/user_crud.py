@@ -1,10 +1,13 @@
 from sqlalchemy.orm import Session
+from fastapi import HTTPException
 from models.user_model import User  # Assuming you have this model
 from schemas.user_schema import UserCreate
+from timings import timed
 
 def get_user_by_email(db: Session, email_address: str):
     return db.query(User).filter(User.email_address == email_address).first()
 
+@timed("db_create_user")
 def create_user(db: Session, user_data: UserCreate):
     existing_user = get_user_by_email(db, user_data.email_address)
     if existing_user:
@@ -0,0 +1,104 @@
+import os
+import time
+import logging
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from models.base import Base
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./business_cards.db")
+# Connections kept open, and extra ones allowed under burst load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Recycle connections older than this many seconds (server-side idle timeouts)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection with a lightweight ping when it is checked out
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# Queries slower than this many milliseconds are logged
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite connections are used from FastAPI's worker threads
+    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False},
+                           pool_pre_ping=DB_POOL_PRE_PING)
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+
+class DatabaseStats:
+    """
+    Thread-safe counters for connection checkout waits and query timings.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.queries = 0
+        self.query_time_total = 0.0
+        self.slow_queries = 0
+
+    def record_checkout(self, waited):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += waited
+            self.checkout_wait_max = max(self.checkout_wait_max, waited)
+
+    def record_query(self, elapsed, slow):
+        with self._lock:
+            self.queries += 1
+            self.query_time_total += elapsed
+            if slow:
+                self.slow_queries += 1
+
+    def snapshot(self):
+        with self._lock:
+            pool = engine.pool
+            return {
+                "pool_status": pool.status(),
+                "checkouts": self.checkouts,
+                "checkout_wait_seconds_avg": round(self.checkout_wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+                "checkout_wait_seconds_max": round(self.checkout_wait_max, 6),
+                "queries": self.queries,
+                "query_seconds_avg": round(self.query_time_total / self.queries, 6) if self.queries else 0.0,
+                "slow_queries": self.slow_queries,
+            }
+
+
+db_stats = DatabaseStats()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    slow = elapsed * 1000 >= DB_SLOW_QUERY_MS
+    db_stats.record_query(elapsed, slow)
+    if slow:
+        logger.warning(f"Slow query ({elapsed * 1000:.1f}ms): {statement[:200]}")
+
+
+@event.listens_for(engine, "handle_error")
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started and context.statement is not None:
+        started.pop()
@@ -0,0 +1,247 @@
+import os
+import re
+import time
+import heapq
+import logging
+import threading
+from difflib import SequenceMatcher
+from phones import to_e164, phone_suffix
+
+logger = logging.getLogger(__name__)
+
+# Legal-form words ignored when comparing organization names
+ORG_STOPWORDS = {
+    "ltd", "limited", "inc", "incorporated", "llc", "plc", "co", "company", "corp", "corporation",
+    "gmbh", "sa", "sarl", "pvt", "pte", "kk", "ltda", "the", "and", "of",
+}
+NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+# Minimum similarity for an organization-only match
+ORG_SIMILARITY = 0.85
+# Candidates compared per organization block token, to bound lookup time;
+# the most recently created prospects of the block are compared
+MAX_BLOCK_CANDIDATES = 50
+# Seconds between refreshes that add prospects created by other processes
+# (other API workers, bulk_extract.py); 0 disables the background refresh
+DEDUPE_REFRESH_SECONDS = float(os.getenv("DEDUPE_REFRESH_SECONDS", "30"))
+# Every this many refreshes the index is rebuilt, which also picks up
+# prospects edited or deleted by other processes
+DEDUPE_FULL_RELOAD_EVERY = int(os.getenv("DEDUPE_FULL_RELOAD_EVERY", "20"))
+
+# Score of each kind of evidence; a candidate's score is the best it has
+SCORE_EMAIL = 1.0
+SCORE_PHONE = 0.9
+SCORE_PHONE_SUFFIX = 0.8
+SCORE_ORG = 0.5
+
+
+def normalize_email(email):
+    return email.strip().lower() if email else None
+
+
+def normalize_org(name):
+    """
+    Lower-cases an organization name, strips punctuation and legal-form words.
+    """
+    if not name:
+        return None
+    tokens = [token for token in NON_WORD_RE.sub(" ", name.lower()).split() if token not in ORG_STOPWORDS]
+    return " ".join(tokens) or None
+
+
+def _contact_keys(email, phones, organization_name, country):
+    keys = set()
+    email = normalize_email(email)
+    if email:
+        keys.add(("email", email))
+    for phone in phones:
+        e164 = to_e164(phone, country)
+        if e164:
+            keys.add(("phone", e164))
+        suffix = phone_suffix(phone)
+        if suffix:
+            keys.add(("suffix", suffix))
+    org = normalize_org(organization_name)
+    if org:
+        for token in org.split():
+            if len(token) >= 3:
+                keys.add(("org", token))
+    return keys, org
+
+
+class DuplicateIndex:
+    """
+    In-memory inverted index of prospects keyed on normalized email, E.164 and
+    trailing-digit phone keys, and organization-name tokens (used as blocks
+    for fuzzy name comparison). Kept current by the prospect CRUD functions,
+    so it is loaded from the database only once per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._records = {}
+        # Highest serial number indexed, where refresh() resumes
+        self._max_serial = 0
+        self._refresher = None
+        self.loaded = False
+
+    def load(self, db):
+        """
+        Populate the index from the prospects table with one query over the
+        contact columns.
+        """
+        from models.prospect_model import Prospect
+        rows = db.query(
+            Prospect.lead_serial_number, Prospect.email, Prospect.primary_phone_number,
+            Prospect.other_phone_number, Prospect.organization_name, Prospect.country,
+        ).all()
+        with self._lock:
+            self._postings.clear()
+            self._records.clear()
+            self._max_serial = 0
+            for key, email, primary, other, organization_name, country in rows:
+                self._add(key, email, [primary, other], organization_name, country)
+            self.loaded = True
+        logger.info(f"Duplicate index loaded with {len(rows)} prospect(s)")
+
+    def refresh(self, db):
+        """
+        Add the prospects created since the last load or refresh, by this or
+        any other process, with one query over the higher serial numbers.
+        Returns how many rows were read.
+        """
+        from models.prospect_model import Prospect
+        with self._lock:
+            since = self._max_serial
+        rows = db.query(
+            Prospect.lead_serial_number, Prospect.email, Prospect.primary_phone_number,
+            Prospect.other_phone_number, Prospect.organization_name, Prospect.country,
+        ).filter(Prospect.lead_serial_number > since).all()
+        with self._lock:
+            for key, email, primary, other, organization_name, country in rows:
+                self._remove(key)
+                self._add(key, email, [primary, other], organization_name, country)
+        if rows:
+            logger.info(f"Duplicate index refreshed with {len(rows)} new prospect(s)")
+        return len(rows)
+
+    def start_refresher(self, session_factory, interval=DEDUPE_REFRESH_SECONDS,
+                        full_reload_every=DEDUPE_FULL_RELOAD_EVERY):
+        """
+        Refresh the index every `interval` seconds in a daemon thread, with a
+        full reload every `full_reload_every` refreshes.
+        """
+        if interval <= 0 or self._refresher is not None:
+            return
+
+        def run():
+            refreshes = 0
+            while True:
+                time.sleep(interval)
+                refreshes += 1
+                db = session_factory()
+                try:
+                    if full_reload_every and refreshes % full_reload_every == 0:
+                        self.load(db)
+                    else:
+                        self.refresh(db)
+                except Exception as e:
+                    logger.error(f"Failed to refresh the duplicate index: {str(e)}")
+                finally:
+                    db.close()
+
+        self._refresher = threading.Thread(target=run, name="dedupe-refresh", daemon=True)
+        self._refresher.start()
+
+    def _add(self, lead_serial_number, email, phones, organization_name, country):
+        keys, org = _contact_keys(email, [phone for phone in phones if phone], organization_name, country)
+        if isinstance(lead_serial_number, int):
+            self._max_serial = max(self._max_serial, lead_serial_number)
+        self._records[lead_serial_number] = (keys, org)
+        for key in keys:
+            self._postings.setdefault(key, set()).add(lead_serial_number)
+
+    def _remove(self, lead_serial_number):
+        record = self._records.pop(lead_serial_number, None)
+        if record is None:
+            return
+        for key in record[0]:
+            postings = self._postings.get(key)
+            if postings is not None:
+                postings.discard(lead_serial_number)
+                if not postings:
+                    del self._postings[key]
+
+    def upsert(self, prospect):
+        """
+        Add or refresh a prospect (any object or mapping with Prospect fields).
+        """
+        get = prospect.get if isinstance(prospect, dict) else lambda name: getattr(prospect, name, None)
+        with self._lock:
+            self._remove(get("lead_serial_number"))
+            self._add(get("lead_serial_number"), get("email"),
+                      [get("primary_phone_number"), get("other_phone_number")],
+                      get("organization_name"), get("country"))
+
+    def remove(self, lead_serial_number):
+        with self._lock:
+            self._remove(lead_serial_number)
+
+    def find_duplicates(self, card, limit=5):
+        """
+        Match structured card data (as returned by
+        restructure_extracted_text_to_json) against the index.
+        Returns up to `limit` candidates, best first, each as a dictionary with
+        'lead_serial_number', 'score' and 'matched_on'.
+        """
+        phones = [card.get("primary_phone_number"), card.get("other_phone_number")]
+        keys, org = _contact_keys(card.get("email"), [phone for phone in phones if phone],
+                                  card.get("organization_name"), card.get("country"))
+        scores = {}
+        matched_on = {}
+        compared = set()
+
+        def hit(lead_serial_number, score, reason):
+            scores[lead_serial_number] = max(scores.get(lead_serial_number, 0.0), score)
+            matched_on.setdefault(lead_serial_number, set()).add(reason)
+
+        with self._lock:
+            for kind, value in keys:
+                postings = self._postings.get((kind, value), ())
+                if kind == "email":
+                    for key in postings:
+                        hit(key, SCORE_EMAIL, "email")
+                elif kind == "phone":
+                    for key in postings:
+                        hit(key, SCORE_PHONE, "phone")
+                elif kind == "suffix":
+                    for key in postings:
+                        hit(key, SCORE_PHONE_SUFFIX, "phone")
+                else:
+                    for key in heapq.nlargest(MAX_BLOCK_CANDIDATES, postings):
+                        if key in compared:
+                            continue
+                        compared.add(key)
+                        similarity = SequenceMatcher(None, org, self._records[key][1] or "").ratio()
+                        if similarity >= ORG_SIMILARITY:
+                            hit(key, SCORE_ORG * similarity, "organization")
+
+        ranked = sorted(scores, key=lambda key: (-scores[key], key))[:limit]
+        return [
+            {"lead_serial_number": key, "score": round(scores[key], 3), "matched_on": sorted(matched_on[key])}
+            for key in ranked
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {"loaded": self.loaded, "prospects": len(self._records), "keys": len(self._postings)}
+
+
+_index = DuplicateIndex()
+
+
+def get_dedupe_index():
+    """
+    Return the process-wide duplicate index.
+    """
+    return _index
@@ -1,10 +1,14 @@
 # dependencies.py
-from sqlalchemy.orm import Session
-from database import SessionLocal
+import time
+from database import SessionLocal, db_stats
 
 def get_db():
     db = SessionLocal()
     try:
+        # Check out the connection up front so pool waits are measured
+        started = time.perf_counter()
+        db.connection()
+        db_stats.record_checkout(time.perf_counter() - started)
         yield db
     finally:
         db.close()
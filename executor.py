@@ -0,0 +1,275 @@
+import os
+import time
+import asyncio
+import functools
+import logging
+import resource
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from ocr_pool import OCR_POOL_SIZE, get_ocr_pool
+
+logger = logging.getLogger(__name__)
+
+# "thread" shares the OCR pool and spaCy model of this process; "process"
+# gives each worker its own interpreter (and its own copy of the models);
+# "fork" loads the spaCy model and gazetteer in this process and forks the
+# workers from it, so they share those pages copy-on-write, and each worker
+# builds its own OCR engine (Paddle does not survive fork()).
+EXTRACTION_EXECUTOR = os.getenv("EXTRACTION_EXECUTOR", "thread")
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(OCR_POOL_SIZE)))
+# Jobs allowed to wait for a worker before new submissions are rejected.
+EXTRACTION_QUEUE_SIZE = int(os.getenv("EXTRACTION_QUEUE_SIZE", "16"))
+# Minimum seconds between memory samples taken by each worker process
+WORKER_MEMORY_SAMPLE_SECONDS = float(os.getenv("WORKER_MEMORY_SAMPLE_SECONDS", "10"))
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the extraction queue is full and a job is rejected."""
+
+
+def memory_mb():
+    """
+    Memory of the current process in MB. On Linux, `pss` charges shared pages
+    pro rata to the processes sharing them and `private` counts pages only
+    this process holds, which is what each extra worker really costs.
+    Elsewhere only the peak RSS is known.
+    """
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.endswith("kB\n")}
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return {"peak_rss": round(peak / (1024 * 1024 if os.uname().sysname == "Darwin" else 1024), 1)}
+    to_mb = lambda *names: round(sum(fields.get(name, 0) for name in names) / 1024, 1)  # noqa: E731
+    return {
+        "rss": to_mb("Rss"),
+        "pss": to_mb("Pss"),
+        "shared": to_mb("Shared_Clean", "Shared_Dirty"),
+        "private": to_mb("Private_Clean", "Private_Dirty"),
+    }
+
+
+# Per-process counters of a worker process, returned with every result
+_worker = {"tasks": 0, "failed": 0, "busy_seconds": 0.0, "memory_mb": None, "sampled_at": 0.0}
+
+
+def _worker_snapshot():
+    now = time.monotonic()
+    if _worker["memory_mb"] is None or now - _worker["sampled_at"] >= WORKER_MEMORY_SAMPLE_SECONDS:
+        _worker["memory_mb"] = memory_mb()
+        _worker["sampled_at"] = now
+    return {"pid": os.getpid(), "tasks": _worker["tasks"], "failed": _worker["failed"],
+            "busy_seconds": round(_worker["busy_seconds"], 3), "memory_mb": _worker["memory_mb"]}
+
+
+def _run_in_worker(fn, *args):
+    """
+    Runs `fn(*args)` in a worker process and returns (ok, result or
+    exception, worker snapshot) so the parent can track each worker.
+    """
+    started = time.perf_counter()
+    try:
+        result, ok = fn(*args), True
+    except Exception as e:
+        result, ok = e, False
+        _worker["failed"] += 1
+    _worker["tasks"] += 1
+    _worker["busy_seconds"] += time.perf_counter() - started
+    return ok, result, _worker_snapshot()
+
+
+def _init_worker_process():
+    # Build this worker's OCR engine before it takes its first job
+    get_ocr_pool().warm_up()
+
+
+def _ping():
+    # Holds a worker briefly so concurrent pings reach different workers
+    time.sleep(0.2)
+    return os.getpid()
+
+
+class BoundedExecutor:
+    """
+    Runs blocking extraction work off the event loop on a fixed number of
+    workers, with at most `max_queue` jobs waiting behind them.
+    """
+
+    def __init__(self, workers=EXTRACTION_WORKERS, max_queue=EXTRACTION_QUEUE_SIZE, kind=EXTRACTION_EXECUTOR):
+        if kind not in ("thread", "process", "fork"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._init_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._processes = {}
+        self.warm = False
+
+    def _get_executor(self):
+        with self._init_lock:
+            if self._executor is None:
+                if self.kind == "fork":
+                    # Imported here: warmup imports the extraction modules
+                    from warmup import preload_for_fork
+                    preload_for_fork()
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context("fork"),
+                                                         initializer=_init_worker_process)
+                elif self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker_process)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extract")
+            return self._executor
+
+    def warm_up(self):
+        """
+        Start the worker processes of a process or fork pool and wait until
+        they have built their OCR engines. Blocking; used by the model warm-up.
+        """
+        executor = self._get_executor()
+        futures = [executor.submit(_ping) for _ in range(self.workers)]
+        wait(futures)
+        self.warm = True
+        logger.info(f"Extraction workers ready: pids {sorted({future.result() for future in futures})}")
+
+    def _discard_broken(self, executor):
+        """
+        Drop a process pool that lost a worker (OOM kill, native crash):
+        a broken pool rejects every later job. The next job builds a new pool,
+        and a background warm-up brings it back to ready.
+        """
+        with self._init_lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.warm = False
+        with self._lock:
+            self._processes.clear()
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("An extraction worker died; restarting the worker pool")
+        threading.Thread(target=self._rewarm, name="executor-rewarm", daemon=True).start()
+
+    def _rewarm(self):
+        try:
+            self.warm_up()
+        except Exception:
+            logger.exception("Restarting the extraction workers failed")
+
+    def _finished(self, executor, future):
+        # Runs when the job itself ends, even if the awaiting task was
+        # cancelled first, so the admission bound always counts real load
+        ok = not future.cancelled() and future.exception() is None
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._discard_broken(executor)
+        worker = None
+        if ok and self.kind != "thread":
+            ok, _, worker = future.result()
+        with self._lock:
+            if worker is not None:
+                self._processes[worker["pid"]] = worker
+            self._pending -= 1
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+
+    async def run(self, fn, *args):
+        """
+        Run `fn(*args)` on a worker and return its result.
+        Raises ExecutorSaturated immediately if the queue is already full.
+        """
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated("Extraction queue is full")
+            self._pending += 1
+            self._submitted += 1
+
+        try:
+            # Creating a fork pool loads the models first; keep that off the event loop
+            executor = self._executor or await asyncio.get_running_loop().run_in_executor(None, self._get_executor)
+            if self.kind == "thread":
+                future = executor.submit(fn, *args)
+            else:
+                future = executor.submit(_run_in_worker, fn, *args)
+        except BaseException as e:
+            with self._lock:
+                self._pending -= 1
+                self._failed += 1
+            if isinstance(e, BrokenProcessPool):
+                self._discard_broken(executor)
+            raise
+        future.add_done_callback(functools.partial(self._finished, executor))
+
+        result = await asyncio.wrap_future(future)
+        if self.kind == "thread":
+            return result
+        ok, result, _ = result
+        if not ok:
+            raise result
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def worker_stats(self):
+        """
+        Per-worker-process counters, throughput and memory, as last reported
+        by each worker, plus the memory of this (supervisor) process.
+        """
+        with self._lock:
+            workers = [dict(worker) for _, worker in sorted(self._processes.items())]
+        for worker in workers:
+            busy = worker["busy_seconds"]
+            worker["tasks_per_busy_second"] = round(worker["tasks"] / busy, 3) if busy else None
+        return {"supervisor": {"pid": os.getpid(), "memory_mb": memory_mb()}, "workers": workers}
+
+    def stats(self):
+        """
+        Return queue depth, in-flight jobs and lifetime counters, and for
+        process pools the per-worker statistics.
+        """
+        with self._lock:
+            in_flight = min(self._pending, self.workers)
+            stats = {
+                "kind": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": in_flight,
+                "queue_depth": self._pending - in_flight,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+        if self.kind != "thread":
+            stats["processes"] = self.worker_stats()
+        return stats
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Return the process-wide extraction executor, creating it on first use.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor()
+    return _executor
@@ -1,10 +1,52 @@
-import re
-import spacy
-from paddleocr import PaddleOCR
-from geotext import GeoText
+import os
+import logging
+import threading
+import time
+from ocr_pool import get_ocr_pool
+from fields import extract_fields, extract_fields_by_line
+from gazetteer import get_gazetteer
+from phones import rank_phone_numbers, phone_value
+from layout import (
+    OCR_MIN_LINE_CONFIDENCE, ocr_result_to_lines, lines_to_text, line_to_dict, line_height,
+    is_name_candidate, looks_like_person, looks_like_org, looks_like_title,
+)
+from preprocess import preprocess_image
+from timings import stage
 
-# Load the spaCy model for Named Entity Recognition
-nlp = spacy.load("en_core_web_sm")
+logger = logging.getLogger(__name__)
+
+# spaCy model used for Named Entity Recognition. Only the entity recognizer
+# (and the shared token-to-vector layer) is used, so the remaining components
+# are excluded at load time.
+NLP_MODEL = "en_core_web_sm"
+NLP_EXCLUDED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer", "senter"]
+# Texts per nlp.pipe batch when structuring several cards
+NLP_BATCH_SIZE = 64
+# Structure OCR output line by line using box geometry and confidences
+# (restructure_lines) instead of scanning the joined text
+OCR_LAYOUT_FIELDS = os.getenv("OCR_LAYOUT_FIELDS", "1") == "1"
+
+_nlp = None
+_nlp_lock = threading.Lock()
+
+def get_nlp():
+    """
+    Return the spaCy pipeline, loading it on first use so that importing this
+    module (e.g. for CRUD-only traffic or tests) does not pay for the model.
+    """
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                # Imported here as well: spaCy itself takes most of a second to import
+                import spacy
+                started = time.perf_counter()
+                _nlp = spacy.load(NLP_MODEL, exclude=NLP_EXCLUDED_PIPES)
+                logger.info(f"spaCy model {NLP_MODEL} loaded in {time.perf_counter() - started:.2f}s")
+    return _nlp
+
+def nlp_loaded():
+    return _nlp is not None
 
 # -----------------------------------------------------------------------------
 # 1. Function to extract email addresses
@@ -12,10 +54,9 @@ nlp = spacy.load("en_core_web_sm")
 def extract_email_ner(text):
     """
     Extracts email addresses using regex.
+    Returns unique matches in order of appearance.
     """
-    email_pattern = r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+'
-    email_matches = re.findall(email_pattern, text)
-    return list(set(email_matches))  # Return unique matches
+    return extract_fields(text, ("email",))["email"]
 
 # -----------------------------------------------------------------------------
 # 2. Function to extract phone numbers with refined patterns
@@ -26,23 +67,19 @@ def extract_phone_numbers_ner(text):
       - International numbers with + and area codes
       - Numbers starting with 'n' or '0' and followed by 10 digits
       - Multiple numbers separated by '/' (e.g., '0720953165/0733577492')
-    Also includes basic context-based filtering.
+    Also includes basic context-based filtering ("Tel", "Mobile", etc. on the
+    card, or a number starting with +, n or 0).
+    Returns unique matches in order of appearance.
     """
-    phone_pattern = (
-        r'(\+?\d{1,4}[-.\s]?\(?\d{1,3}\)?[-.\s]?\d{3,4}[-.\s]?\d{4,5}'
-        r'|\bn?\d{10}\b|\b0\d{9}\b(?:/\d{10})?)'
-    )
-    phone_matches = re.findall(phone_pattern, text)
+    return extract_fields(text, ("phone",))["phone"]
 
-    valid_phone_numbers = []
-    for match in phone_matches:
-        if len(match) >= 7:
-            # Check for "Tel", "Mobile", etc. or if number starts with +, n, 0
-            context_match = re.search(r'\b(Tel|Mobile|Phone|Contact|Cell)\b', text, re.IGNORECASE)
-            if context_match or match.startswith(('+', 'n', '0')):
-                valid_phone_numbers.append(match)
-
-    return list(set(valid_phone_numbers))  # Deduplicate results
+def normalize_phone_numbers(numbers, country=None):
+    """
+    Canonicalizes extracted phone numbers (see phones.rank_phone_numbers):
+    E.164 where they can be placed, one entry per distinct number, valid
+    numbers and mobiles first.
+    """
+    return [phone_value(phone) for phone in rank_phone_numbers(numbers, country)]
 
 # -----------------------------------------------------------------------------
 # 3. Function to extract website URLs
@@ -50,20 +87,21 @@ def extract_phone_numbers_ner(text):
 def extract_website_ner(text):
     """
     Extracts website URLs via regex pattern.
+    Returns unique matches in order of appearance.
     """
-    website_pattern = r'(https?://[^\s]+|www\.[^\s]+)'
-    website_matches = re.findall(website_pattern, text)
-    return list(set(website_matches))
+    return extract_fields(text, ("website",))["website"]
 
 # -----------------------------------------------------------------------------
 # 4. Function to extract agent and company names using NER with context filtering
 # -----------------------------------------------------------------------------
-def extract_entities_with_ner(text):
+def extract_entities_with_ner(text, doc=None):
     """
     Uses spaCy Named Entity Recognition (NER) to extract 'PERSON' and 'ORG' entities.
+    Reuses `doc` when the caller has already parsed the text.
     Returns a tuple (agent_name, company_name).
     """
-    doc = nlp(text)
+    if doc is None:
+        doc = get_nlp()(text)
     names = []
     organizations = []
     
@@ -88,83 +126,83 @@ def extract_social_media_ner(text):
     Extracts basic references to Facebook, Instagram, and Twitter from text via regex.
     Returns a dictionary with any matched snippet or None if not found.
     """
-    social_media = {
-        "facebook": None,
-        "instagram": None,
-        "twitter": None
-    }
-    
-    fb_pattern = r'(facebook\.com/[^\s]+|FB:[^\s]+|facebook.com|FB/|fb.com)'
-    ig_pattern = r'(instagram\.com/[^\s]+|IG:[^\s]+|instagram.com|IG/|ig.com)'
-    twitter_pattern = r'(twitter\.com/[^\s]+|Twitter:[^\s]+|twitter.com|Twitter/|t.co)'
-    
-    fb_match = re.findall(fb_pattern, text, re.IGNORECASE)
-    ig_match = re.findall(ig_pattern, text, re.IGNORECASE)
-    twitter_match = re.findall(twitter_pattern, text, re.IGNORECASE)
-    
-    social_media['facebook'] = fb_match[0] if fb_match else None
-    social_media['instagram'] = ig_match[0] if ig_match else None
-    social_media['twitter'] = twitter_match[0] if twitter_match else None
-
-    return social_media
+    matches = extract_fields(text, ("facebook", "instagram", "twitter"))
+    return {network: values[0] if values else None for network, values in matches.items()}
 
 # -----------------------------------------------------------------------------
 # 6. Enhanced function to extract addresses
 # -----------------------------------------------------------------------------
-def extract_address_ner(text):
+def extract_address_ner(text, doc=None):
     """
     Extract potential address formats that contain typical address keywords 
     like 'Street', 'Avenue', 'Building', etc. Also uses spaCy NER to catch
-    GPE/LOC/FAC as fallback for location phrases.
-    """
-    address_pattern = (
-        r'((?:\d{1,5}\s)?'
-        r'(?:[A-Za-z\s]+(?:Square|Building|Tower|Floor|Block|Avenue|St|Street|'
-        r'Rd|Road|Lane|Ln|Drive|Dr|Boulevard|Blvd|Place|Pl)[,.\s]*)+'
-        r'(?:,\s*\w+)*'
-        r',\s*\w+\s*\d{0,6}'
-        r'|\bP\.O\.\sBox\s\d+\b)'
-    )
-    address_matches = re.findall(address_pattern, text, re.IGNORECASE | re.MULTILINE)
+    GPE/LOC/FAC as fallback for location phrases, reusing `doc` if given.
+    """
+    address_matches = extract_fields(text, ("address",))["address"]
 
     # Use spaCy to capture additional location-based entities
-    doc = nlp(text)
+    if doc is None:
+        doc = get_nlp()(text)
     additional_addresses = [ent.text for ent in doc.ents if ent.label_ in {"GPE", "LOC", "FAC"}]
 
     # Combine regex and NER results
-    addresses = list(set(address_matches + additional_addresses))
+    addresses = list(dict.fromkeys(address_matches + additional_addresses))
 
-    # Filter out known country names if they appear as isolated addresses 
-    # (Modify this set to match your usage.)
-    final_address = [addr for addr in addresses if addr.lower() not in {"kenya", "uganda", "tanzania"}]
+    # Filter out country names that appear as isolated addresses
+    gazetteer = get_gazetteer()
+    final_address = [addr for addr in addresses if not gazetteer.is_country(addr)]
     
     return ", ".join(final_address) if final_address else None
 
 # -----------------------------------------------------------------------------
 # 7. OCR function to extract text from an image
 # -----------------------------------------------------------------------------
-def extract_text_from_image(image_bytes):
+def extract_lines_from_image(image_bytes, timings=None):
     """
-    Uses PaddleOCR to extract text from an image given as bytes.
+    Uses PaddleOCR to recognize the text lines of an image given as bytes.
+    The image is decoded, rotated, cropped and downscaled first, then a warm
+    engine is borrowed from the process-wide pool for the call. Stage
+    durations in milliseconds are added to `timings` if a dict is given.
+    Returns a list of OCRLine (text, confidence, bounding box) in reading order.
     """
-    ocr = PaddleOCR()
-    result = ocr.ocr(image_bytes, cls=True)
-    extracted_text = ""
-    for idx in range(len(result)):
-        for line in result[idx]:
-            text, _ = line[-1]
-            extracted_text += text + "\n"
-    
-    return extracted_text.strip()
+    image, skip_cls = preprocess_image(image_bytes, timings)
+    with get_ocr_pool().acquire() as ocr:
+        with stage(timings, "ocr"):
+            result = ocr.ocr(image, cls=not skip_cls)
+    return ocr_result_to_lines(result)
+
+def extract_text_from_image(image_bytes, timings=None):
+    """
+    Like extract_lines_from_image, but returns the recognized lines joined
+    into newline-separated text.
+    """
+    return lines_to_text(extract_lines_from_image(image_bytes, timings))
+
+def extract_lines_with_timings(image_bytes):
+    """
+    Like extract_lines_from_image, but returns (lines, timings) so the
+    timings survive a trip through a process pool.
+    """
+    timings = {}
+    return extract_lines_from_image(image_bytes, timings), timings
+
+def extract_text_with_timings(image_bytes):
+    """
+    Like extract_text_from_image, but returns (extracted_text, timings) so the
+    stage durations survive being run in a worker process.
+    """
+    timings = {}
+    return extract_text_from_image(image_bytes, timings), timings
 
 # -----------------------------------------------------------------------------
 # 8. Final function to restructure extracted text into the requested JSON format
-#    using GeoText to detect city and country.
+#    using the gazetteer to detect city and country.
 # -----------------------------------------------------------------------------
-def restructure_extracted_text_to_json(extracted_text):
+def restructure_extracted_text_to_json(extracted_text, doc=None, timings=None):
     """
     Restructure extracted text into a JSON/dictionary with specific fields:
       - organization_name
+      - contact_person
       - primary_phone_number
       - other_phone_number
       - email
@@ -172,20 +210,34 @@ def restructure_extracted_text_to_json(extracted_text):
       - city
       - country
       - website
+    The text is parsed by spaCy once and the resulting `doc` is shared by
+    every NER-based extractor; pass `doc` to reuse an existing parse.
+    Each extractor's duration is added to `timings` if a dict is given.
     """
-    # 1. Extract data using the helper functions
-    emails = extract_email_ner(extracted_text)
-    phone_numbers = extract_phone_numbers_ner(extracted_text)
-    websites = extract_website_ner(extracted_text)
-    agent_name, company_name = extract_entities_with_ner(extracted_text)
-    address = extract_address_ner(extracted_text)
+    if doc is None:
+        with stage(timings, "spacy_parse"):
+            doc = get_nlp()(extracted_text)
+
+    # 1. Extract data using the helper functions; the regex fields come from
+    #    a single pass of the precompiled field engine
+    with stage(timings, "regex_fields"):
+        fields = extract_fields(extracted_text, ("email", "phone", "website"))
+    emails = fields["email"]
+    phone_numbers = fields["phone"]
+    websites = fields["website"]
+    with stage(timings, "ner_entities"):
+        agent_name, company_name = extract_entities_with_ner(extracted_text, doc)
+    with stage(timings, "ner_address"):
+        address = extract_address_ner(extracted_text, doc)
 
-    # 2. Detect city/country using GeoText
-    places = GeoText(extracted_text)
-    # The library returns sets, but let's just pick the first city/country if available.
-    # If there are multiple, you can decide how to handle them (e.g., store them in a list).
-    city = list(places.cities)[0] if places.cities else None
-    country = list(places.countries)[0] if places.countries else None
+    # 2. Detect city/country line by line with the gazetteer; several
+    #    candidates are ranked by the countries named and dialled on the card
+    with stage(timings, "gazetteer"):
+        city, country = get_gazetteer().resolve(extracted_text.splitlines(), phone_numbers)
+    # Canonical E.164 numbers, mobiles first, with the card's country as the
+    # calling code of national numbers
+    with stage(timings, "phones"):
+        phone_numbers = normalize_phone_numbers(phone_numbers, country)
 
     # 3. Naive placeholder for industry
     industry = None
@@ -193,6 +245,7 @@ def restructure_extracted_text_to_json(extracted_text):
     # 4. Build and return the final dictionary
     return {
         "organization_name": company_name,
+        "contact_person": agent_name,
         "primary_phone_number": phone_numbers[0] if phone_numbers else None,
         "other_phone_number": phone_numbers[1] if len(phone_numbers) > 1 else None,
         "email": emails[0] if emails else None,
@@ -202,6 +255,309 @@ def restructure_extracted_text_to_json(extracted_text):
         "website": websites[0] if websites else None
     }
 
+# -----------------------------------------------------------------------------
+# 8b. Layout-aware restructuring of OCR lines (boxes and confidences)
+# -----------------------------------------------------------------------------
+def _prepare_lines(lines, timings=None):
+    """
+    Drops low-confidence lines, matches the regex fields line by line and
+    picks the lines that may hold names (no field match, mostly letters).
+    Returns (texts, heights, fields, candidate line indexes).
+    """
+    lines = [line for line in lines if line.confidence >= OCR_MIN_LINE_CONFIDENCE]
+    texts = [line.text for line in lines]
+    with stage(timings, "regex_fields"):
+        fields, matched = extract_fields_by_line(texts, ("email", "phone", "website", "address"))
+    candidates = [index for index, text in enumerate(texts) if index not in matched and is_name_candidate(text)]
+    return texts, [line_height(line) for line in lines], fields, candidates
+
+def _structure_lines(texts, heights, fields, candidates, docs, timings=None):
+    """
+    Builds the structured dictionary from prepared lines and the spaCy docs
+    of the candidate lines (in the same order as `candidates`).
+    """
+    agent_name = company_name = None
+    used = set()
+    for index, doc in zip(candidates, docs):
+        for ent in doc.ents:
+            if ent.label_ == "PERSON" and agent_name is None:
+                agent_name = ent.text
+                used.add(index)
+            elif ent.label_ == "ORG" and company_name is None:
+                company_name = ent.text
+                used.add(index)
+            elif ent.label_ in ("GPE", "LOC"):
+                # A place line is neither a person nor the company
+                used.add(index)
+
+    # Fall back on line shape and size where NER found nothing
+    gazetteer = get_gazetteer()
+    remaining = [index for index in candidates if index not in used and not gazetteer.is_place_line(texts[index])]
+    if agent_name is None:
+        person = next((index for index in remaining if looks_like_person(texts[index])), None)
+        if person is not None:
+            agent_name = texts[person]
+            remaining.remove(person)
+    if company_name is None:
+        organizations = [index for index in remaining if looks_like_org(texts[index])]
+        if not organizations:
+            # Company names are usually printed largest; job titles are not names
+            organizations = [index for index in remaining if not looks_like_title(texts[index])]
+        if organizations:
+            company_name = texts[max(organizations, key=lambda index: (heights[index], -index))]
+
+    with stage(timings, "gazetteer"):
+        city, country = get_gazetteer().resolve(texts, fields["phone"])
+    with stage(timings, "phones"):
+        phone_numbers = normalize_phone_numbers(fields["phone"], country)
+
+    return {
+        "organization_name": company_name,
+        "contact_person": agent_name,
+        "primary_phone_number": phone_numbers[0] if phone_numbers else None,
+        "other_phone_number": phone_numbers[1] if len(phone_numbers) > 1 else None,
+        "email": fields["email"][0] if fields["email"] else None,
+        "industry": None,
+        "city": city,
+        "country": country,
+        "website": fields["website"][0] if fields["website"] else None
+    }
+
+def restructure_lines(lines, timings=None):
+    """
+    Layout-aware counterpart of restructure_extracted_text_to_json for OCR
+    lines, returning the same dictionary:
+      - lines recognized below OCR_MIN_LINE_CONFIDENCE are ignored
+      - regex fields are matched line by line, so no match spans two lines
+      - NER runs only on the short, mostly alphabetic lines left over
+      - without a PERSON entity, a line shaped like a personal name is used;
+        without an ORG entity, an organization-like line or else the tallest
+        remaining line
+    """
+    texts, heights, fields, candidates = _prepare_lines(lines, timings)
+    with stage(timings, "ner_lines"):
+        docs = list(get_nlp().pipe([texts[index] for index in candidates], batch_size=NLP_BATCH_SIZE))
+    return _structure_lines(texts, heights, fields, candidates, docs, timings)
+
+def contact_fields_from_lines(lines):
+    """
+    The regex-only part of the structured output (email, phone numbers and
+    website) for OCR lines. It needs no NER, so streaming responses can send
+    it before structuring has finished.
+    """
+    if OCR_LAYOUT_FIELDS:
+        texts = [line.text for line in lines if line.confidence >= OCR_MIN_LINE_CONFIDENCE]
+        fields, _ = extract_fields_by_line(texts, ("email", "phone", "website"))
+    else:
+        texts = [line.text for line in lines]
+        fields = extract_fields(lines_to_text(lines), ("email", "phone", "website"))
+    _, country = get_gazetteer().resolve(texts, fields["phone"])
+    phone_numbers = normalize_phone_numbers(fields["phone"], country)
+    return {
+        "primary_phone_number": phone_numbers[0] if phone_numbers else None,
+        "other_phone_number": phone_numbers[1] if len(phone_numbers) > 1 else None,
+        "email": fields["email"][0] if fields["email"] else None,
+        "website": fields["website"][0] if fields["website"] else None
+    }
+
+# -----------------------------------------------------------------------------
+# 9. Full pipeline: image bytes -> (raw text, structured fields)
+# -----------------------------------------------------------------------------
+def structure_lines(lines, timings=None):
+    """
+    Restructures OCR lines with the layout-aware or the joined-text
+    extractors, depending on OCR_LAYOUT_FIELDS.
+    """
+    with stage(timings, "structure"):
+        if OCR_LAYOUT_FIELDS:
+            return restructure_lines(lines, timings)
+        return restructure_extracted_text_to_json(lines_to_text(lines), timings=timings)
+
+def structure_lines_with_timings(lines):
+    """
+    Like structure_lines, but returns (structured_data, timings).
+    """
+    timings = {}
+    return structure_lines(lines, timings), timings
+
+def extract_and_structure(image_bytes):
+    """
+    Runs OCR and restructuring in one blocking call so that API handlers can
+    dispatch the whole pipeline to a worker with a single submission.
+    Returns a tuple (extracted_text, structured_data, timings, ocr_lines),
+    where ocr_lines holds each line's text, confidence and box as dictionaries.
+    """
+    timings = {}
+    lines = extract_lines_from_image(image_bytes, timings)
+    structured_data = structure_lines(lines, timings)
+    return lines_to_text(lines), structured_data, timings, [line_to_dict(line) for line in lines]
+
+# -----------------------------------------------------------------------------
+# 10. Batch pipeline for many cards at once
+# -----------------------------------------------------------------------------
+def extract_lines_from_images(images):
+    """
+    OCRs several images, one `ocr()` call each, sharing a single engine
+    checkout across the chunk instead of a pool round trip per card.
+    Returns a list of (lines, timings, error) tuples in input order; an image
+    that fails yields (None, timings, message) without affecting the others.
+    """
+    results = []
+    with get_ocr_pool().acquire() as ocr:
+        for image_bytes in images:
+            timings = {}
+            try:
+                image, skip_cls = preprocess_image(image_bytes, timings)
+                with stage(timings, "ocr"):
+                    result = ocr.ocr(image, cls=not skip_cls)
+                results.append((ocr_result_to_lines(result), timings, None))
+            except Exception as e:
+                results.append((None, timings, str(e)))
+    return results
+
+def restructure_many(texts):
+    """
+    Restructures several texts, parsing them with a single batched
+    `nlp.pipe` call. Returns the structured dictionaries in input order.
+    """
+    docs = get_nlp().pipe(texts, batch_size=NLP_BATCH_SIZE)
+    return [restructure_extracted_text_to_json(text, doc) for text, doc in zip(texts, docs)]
+
+def restructure_lines_many(lines_list, timings_list):
+    """
+    Batch counterpart of restructure_lines: the candidate lines of every card
+    go through a single `nlp.pipe` call. Returns, in input order, each card's
+    structured dictionary or the exception its structuring raised, so one bad
+    card does not fail the others.
+    """
+    prepared = []
+    for lines, timings in zip(lines_list, timings_list):
+        try:
+            prepared.append(_prepare_lines(lines, timings))
+        except Exception as e:
+            prepared.append(e)
+    docs = iter(get_nlp().pipe(
+        (item[0][index] for item in prepared if not isinstance(item, Exception) for index in item[3]),
+        batch_size=NLP_BATCH_SIZE,
+    ))
+    results = []
+    for item, timings in zip(prepared, timings_list):
+        if isinstance(item, Exception):
+            results.append(item)
+            continue
+        texts, heights, fields, candidates = item
+        try:
+            with stage(timings, "structure"):
+                results.append(_structure_lines(texts, heights, fields, candidates,
+                                                [next(docs) for _ in candidates], timings))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def _restructure_texts_many(texts, timings_list):
+    """
+    Text-mode counterpart of restructure_lines_many, with one `nlp.pipe`
+    call; a card that fails yields its exception.
+    """
+    docs = iter(get_nlp().pipe(texts, batch_size=NLP_BATCH_SIZE))
+    results = []
+    for text, timings in zip(texts, timings_list):
+        try:
+            with stage(timings, "structure"):
+                results.append(restructure_extracted_text_to_json(text, next(docs), timings))
+        except Exception as e:
+            results.append(e)
+    return results
+
+def extract_and_structure_many(images):
+    """
+    Batch counterpart of extract_and_structure. Returns one dictionary per
+    image, in input order, holding either 'extracted_text', 'final_data' and
+    'ocr_lines' or an 'error' message, plus the per-stage 'timings'. A card
+    that fails OCR or structuring gets an 'error' without affecting the rest.
+    """
+    ocr_results = extract_lines_from_images(images)
+    succeeded = [(lines, timings) for lines, timings, error in ocr_results if error is None]
+    if OCR_LAYOUT_FIELDS:
+        structured = iter(restructure_lines_many([lines for lines, _ in succeeded],
+                                                 [timings for _, timings in succeeded]))
+    else:
+        structured = iter(_restructure_texts_many([lines_to_text(lines) for lines, _ in succeeded],
+                                                  [timings for _, timings in succeeded]))
+
+    results = []
+    for lines, timings, error in ocr_results:
+        if error is None:
+            structured_data = next(structured)
+            if not isinstance(structured_data, Exception):
+                results.append({
+                    "extracted_text": lines_to_text(lines),
+                    "final_data": structured_data,
+                    "ocr_lines": [line_to_dict(line) for line in lines],
+                    "timings": timings,
+                })
+                continue
+            error = str(structured_data) or structured_data.__class__.__name__
+        results.append({"error": error, "timings": timings})
+    return results
+
+# -----------------------------------------------------------------------------
+# 11. Rule-based extraction with per-field confidence (for hybrid LLM mode)
+# -----------------------------------------------------------------------------
+# Confidence given to a field that the rules resolved unambiguously
+CONFIDENT = 0.9
+
+def _has_digits(text, count):
+    return sum(ch.isdigit() for ch in text) >= count
+
+def score_extracted_text(extracted_text, doc=None):
+    """
+    Runs the regex and NER extractors and scores each field of the LLM output
+    schema between 0 and 1. A field with no match is still confident (as
+    null) when the text holds no trace of it, e.g. no '@' for the email.
+    Returns a dictionary mapping field name to a (value, confidence) tuple.
+    """
+    if doc is None:
+        doc = get_nlp()(extracted_text)
+    matches = extract_fields(extracted_text)
+    lowered = extracted_text.lower()
+
+    def single(values, has_hint):
+        if len(values) == 1:
+            return values[0], CONFIDENT
+        if values:
+            return values[0], 0.6
+        return None, 0.3 if has_hint else CONFIDENT
+
+    scores = {
+        "email": single(matches["email"], "@" in extracted_text),
+        "website": single(matches["website"], any(hint in lowered for hint in ("www", "http", ".com"))),
+    }
+
+    _, country = get_gazetteer().resolve(extracted_text.splitlines(), matches["phone"])
+    phones = normalize_phone_numbers(matches["phone"], country)
+    if phones:
+        scores["phone_numbers"] = (phones, CONFIDENT)
+    else:
+        scores["phone_numbers"] = ([], 0.3 if _has_digits(extracted_text, 7) else CONFIDENT)
+
+    # Bare domain mentions ("fb.com", "t.co") match loosely, so only a profile
+    # path counts as certain
+    for network in ("facebook", "instagram", "twitter"):
+        values = matches[network]
+        if any("/" in value or ":" in value for value in values):
+            scores[network] = (values[0], CONFIDENT)
+        elif values:
+            scores[network] = (values[0], 0.4)
+        else:
+            scores[network] = (None, CONFIDENT)
+
+    names = [ent.text for ent in doc.ents if ent.label_ == "PERSON"]
+    organizations = [ent.text for ent in doc.ents if ent.label_ == "ORG"]
+    scores["agent_name"] = (names[0], 0.8 if len(names) == 1 else 0.5) if names else (None, 0.0)
+    scores["company_name"] = (organizations[0], 0.75 if len(organizations) == 1 else 0.5) if organizations else (None, 0.0)
+    return scores
+
 # -----------------------------------------------------------------------------
 # Usage Example (for reference):
 # -----------------------------------------------------------------------------
@@ -2,11 +2,21 @@ import os
 import json
 import base64
 import logging
-import requests
+from typing import Optional
 from fastapi import FastAPI, UploadFile, HTTPException, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from extract import extract_text_from_image  # Import your OCR function
+from extract import extract_text_with_timings, score_extracted_text, normalize_phone_numbers  # Import your OCR function
+from fields import extract_fields
+from gazetteer import get_gazetteer
+from ocr_pool import get_ocr_pool
+from warmup import get_model_warmup, preload_for_fork, PRELOAD_MODELS
+from executor import get_executor, ExecutorSaturated
+from cache import get_result_cache, image_key, text_key
+from timings import stage, get_stage_histograms, server_timing_headers
+from uploads import read_upload, UploadSizeLimitMiddleware
+from llm_client import get_llm_client, close_llm_client, LLMError
+from streaming import check_stream_format, event_stream_response
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +25,14 @@ logger = logging.getLogger(__name__)
 # Load environment variable for OpenAI API key
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# "full" sends every card to GPT-4; "hybrid" resolves fields with the rule-based
+# extractors first and only asks GPT-4 about the low-confidence ones
+LLM_STRUCTURING_MODE = os.getenv("LLM_STRUCTURING_MODE", "full")
+HYBRID_CONFIDENCE_THRESHOLD = float(os.getenv("HYBRID_CONFIDENCE_THRESHOLD", "0.7"))
+WEB_FIELDS = ("website", "facebook", "instagram", "twitter")
+
+hybrid_stats = {"cards": 0, "llm_calls": 0, "fields_resolved_by_rules": 0, "fields_sent_to_llm": 0}
+
 app = FastAPI(
     title="Business Card Text Extraction API",
     docs_url="/api/business_card_text_extraction/docs",
@@ -30,14 +48,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Reject oversized bodies before they are received
+app.add_middleware(UploadSizeLimitMiddleware)
 
-def analyze_text_with_gpt4(extracted_text, api_key):
-    """Analyze text using GPT-4 to structure extracted information in JSON format."""
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
+# Share the NLP model with workers forked by a preloading server
+if PRELOAD_MODELS:
+    preload_for_fork()
+
+@app.on_event("startup")
+def startup_event():
+    # Load OCR and NLP models once so requests share warm engines (in the
+    # background by default; see MODEL_WARMUP)
+    get_model_warmup().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_executor().shutdown()
+    await close_llm_client()
 
+async def analyze_text_with_gpt4(extracted_text, api_key):
+    """Analyze text using GPT-4 to structure extracted information in JSON format."""
     prompt = (
         f"Extract structured information from the following text in JSON format:\n"
         f"Text: {extracted_text}\n\n"
@@ -59,57 +89,230 @@ def analyze_text_with_gpt4(extracted_text, api_key):
         "If a field is not present, use null for that field."
     )
 
+    return await _complete_json(prompt, api_key, max_tokens=500)
+
+async def _complete_json(prompt, api_key, max_tokens):
+    """Send a prompt to GPT-4 and parse the JSON object it answers with."""
     payload = {
         "model": "gpt-4",
         "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 500
+        "max_tokens": max_tokens
     }
 
-    response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
-    
-    if response.status_code == 200:
-        completion = response.json()['choices'][0]['message']['content']
-        try:
-            # Parse the JSON response from the completion text
-            return json.loads(completion)
-        except json.JSONDecodeError:
-            logger.error("Failed to parse JSON response from GPT-4")
-            raise HTTPException(status_code=500, detail="Failed to parse GPT-4 response")
-    else:
-        logger.error(f"OpenAI API request failed: {response.status_code} - {response.text}")
+    # Pooled async request with timeouts, retries and concurrency/rate limits
+    try:
+        response = await get_llm_client().chat_completion(payload, api_key)
+    except LLMError as e:
+        logger.error(f"OpenAI API request failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch structured data from GPT-4")
 
+    completion = response['choices'][0]['message']['content']
+    try:
+        # Parse the JSON response from the completion text
+        return json.loads(completion)
+    except json.JSONDecodeError:
+        logger.error("Failed to parse JSON response from GPT-4")
+        raise HTTPException(status_code=500, detail="Failed to parse GPT-4 response")
+
+def _relevant_lines(extracted_text, fields):
+    """Pick the OCR lines that could hold any of the given fields."""
+    def wanted(line):
+        digits = sum(ch.isdigit() for ch in line)
+        if "email" in fields and "@" in line:
+            return True
+        if "phone_numbers" in fields and digits >= 5:
+            return True
+        if any(field in fields for field in WEB_FIELDS) and any(ch in line for ch in "./:"):
+            return True
+        # Names and company names sit on plain text lines
+        if ("agent_name" in fields or "company_name" in fields) and "@" not in line and digits < 5:
+            return True
+        return False
+
+    return [line.strip() for line in extracted_text.splitlines() if line.strip() and wanted(line)]
+
+async def structure_with_hybrid(extracted_text, api_key):
+    """
+    Structure card text rule-first: fields the regex/NER extractors resolve
+    with confidence are kept, and only the remaining fields are sent to GPT-4
+    together with the OCR lines that could contain them.
+    Returns (data in the GPT-4 output schema, list of fields sent to GPT-4).
+    """
+    scores = await get_executor().run(score_extracted_text, extracted_text)
+    values = {field: value for field, (value, _) in scores.items()}
+    unresolved = [field for field, (_, confidence) in scores.items() if confidence < HYBRID_CONFIDENCE_THRESHOLD]
+
+    hybrid_stats["cards"] += 1
+    hybrid_stats["fields_resolved_by_rules"] += len(scores) - len(unresolved)
+    hybrid_stats["fields_sent_to_llm"] += len(unresolved)
+
+    lines = _relevant_lines(extracted_text, unresolved) if unresolved else []
+    if lines:
+        hybrid_stats["llm_calls"] += 1
+        prompt = (
+            "Business card OCR lines:\n" + "\n".join(lines) + "\n\n"
+            f"Return only a JSON object with the keys {', '.join(unresolved)}. "
+            "phone_numbers is a list of strings. Use null for any field that is not present."
+        )
+        answer = await _complete_json(prompt, api_key, max_tokens=150)
+        answer = answer.get("data", answer) if isinstance(answer, dict) else {}
+        for field in unresolved:
+            if field in answer:
+                values[field] = answer[field]
+
+    data = {
+        "email": values["email"],
+        "phone_numbers": values["phone_numbers"] or [],
+        "agent_name": values["agent_name"],
+        "company_name": values["company_name"],
+        "web_presence": {field: values[field] for field in WEB_FIELDS},
+    }
+    return {"data": data}, unresolved
+
 @app.get("/")
 async def read_root():
     """Root endpoint for basic API info."""
     return {"message": "Welcome to the Business Card Text Extraction API"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once the OCR and NLP models are loaded, 503 before."""
+    ready, detail = get_model_warmup().readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **detail})
+
+@app.get("/api/business_card_text_extraction/stats")
+async def read_stats():
+    """Runtime statistics for the OCR engine pool, extraction executor and result cache."""
+    return {
+        "ocr_pool": get_ocr_pool().stats(),
+        "executor": get_executor().stats(),
+        "cache": get_result_cache().stats(),
+        "llm": get_llm_client().stats(),
+        "hybrid": hybrid_stats,
+    }
+
+@app.get("/api/business_card_text_extraction/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(get_stage_histograms().render(), media_type="text/plain; version=0.0.4")
+
+async def _ocr_cached(image_data, timings):
+    """
+    Perform OCR off the event loop to extract raw text from the image,
+    reusing the text of a previously seen identical image.
+    """
+    cache = get_result_cache()
+    ocr_key = image_key(image_data)
+    extracted_text = await cache.aget("ocr", ocr_key)
+    if extracted_text is None:
+        extracted_text, ocr_timings = await get_executor().run(extract_text_with_timings, image_data)
+        timings.update(ocr_timings)
+        await cache.aset("ocr", ocr_key, extracted_text)
+    return extracted_text
+
+async def _structure_cached(extracted_text, mode, timings):
+    """
+    Use GPT-4 API to restructure extracted text into JSON format; the paid
+    call is skipped when the same card text was structured before.
+    Returns (final_data, extra response fields).
+    """
+    cache = get_result_cache()
+    llm_key = text_key(extracted_text)
+    extra = {}
+    if mode == "hybrid":
+        cached = await cache.aget("llm_hybrid", llm_key)
+        if cached is None:
+            with stage(timings, "llm"):
+                restructured_text, llm_fields = await structure_with_hybrid(extracted_text, openai_api_key)
+            cached = {"final_data": restructured_text, "llm_fields": llm_fields}
+            await cache.aset("llm_hybrid", llm_key, cached)
+        restructured_text = cached["final_data"]
+        extra["llm_fields"] = cached["llm_fields"]
+    else:
+        restructured_text = await cache.aget("llm", llm_key)
+        if restructured_text is None:
+            with stage(timings, "llm"):
+                restructured_text = await analyze_text_with_gpt4(extracted_text, openai_api_key)
+            await cache.aset("llm", llm_key, restructured_text)
+    return restructured_text, extra
+
+def _regex_fields(extracted_text):
+    """
+    The regex-matched fields of card text, in the GPT-4 output schema, with
+    phone numbers normalized as in the hybrid result. Blocking.
+    """
+    matches = extract_fields(extracted_text, ("email", "phone") + WEB_FIELDS)
+    _, country = get_gazetteer().resolve(extracted_text.splitlines(), matches["phone"])
+    return {"data": {
+        "email": matches["email"][0] if matches["email"] else None,
+        "phone_numbers": normalize_phone_numbers(matches["phone"], country),
+        "web_presence": {field: matches[field][0] if matches[field] else None for field in WEB_FIELDS},
+    }}
+
+async def _extract_events(image_data, mode, timings):
+    """
+    Streaming counterpart of extract_text: the OCR text ('ocr') and the regex
+    fields ('fields') are sent before the GPT-4 call, then the same body as
+    the non-streaming response ('result').
+    """
+    extracted_text = await _ocr_cached(image_data, timings)
+    yield "ocr", {"extracted_text": extracted_text, "timings": dict(timings)}
+    yield "fields", {"final_data": await get_executor().run(_regex_fields, extracted_text)}
+    restructured_text, extra = await _structure_cached(extracted_text, mode, timings)
+    get_stage_histograms().observe_timings(timings)
+    yield "result", {
+        "message": "Text extracted and restructured successfully.",
+        "extracted_text": extracted_text,
+        "final_data": restructured_text,
+        "structuring_mode": mode,
+        **extra,
+        "timings": timings
+    }
+
 @app.post("/api/business_card_text_extraction/extract_text")
-async def extract_text(image: UploadFile = File(...)):
+async def extract_text(image: UploadFile = File(...), mode: Optional[str] = None, stream: Optional[str] = None):
     """
     Extract text from an uploaded image file using OCR, then structure it to JSON format.
+    `mode` overrides LLM_STRUCTURING_MODE for this request ("full" or "hybrid").
+    With stream=ndjson or stream=sse the OCR text and regex fields are sent
+    before the GPT-4 answer.
     """
-    if image.content_type.split("/")[0] != "image":
-        logger.error("Invalid file type uploaded")
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image file.")
-    
-    try:
-        image_data = await image.read()
-        logger.info("Image uploaded and read successfully")
+    mode = mode or LLM_STRUCTURING_MODE
+    if mode not in ("full", "hybrid"):
+        raise HTTPException(status_code=400, detail="mode must be 'full' or 'hybrid'")
+    check_stream_format(stream)
 
-        # Perform OCR to extract raw text from the image
-        extracted_text = extract_text_from_image(image_data)
-        logger.info("Text extracted successfully from the image")
+    # Size-checked, magic-byte sniffed read; raises 413/415 before any OCR work
+    timings = {}
+    with stage(timings, "upload_read"):
+        _, image_data = await read_upload(image)
+    logger.info("Image uploaded and read successfully")
+    if stream:
+        return event_stream_response(_extract_events(image_data, mode, timings), stream)
 
-        # Use GPT-4 API to restructure extracted text into JSON format
-        restructured_text = analyze_text_with_gpt4(extracted_text, openai_api_key)
+    try:
+        extracted_text = await _ocr_cached(image_data, timings)
+        logger.info("Text extracted successfully from the image")
 
+        restructured_text, extra = await _structure_cached(extracted_text, mode, timings)
         logger.info("Text restructured using GPT-4 successfully")
-        return JSONResponse(status_code=200, content={
+        get_stage_histograms().observe_timings(timings)
+        return JSONResponse(status_code=200, headers=server_timing_headers(timings), content={
             "message": "Text extracted and restructured successfully.",
             "extracted_text": extracted_text,
-            "final_data": restructured_text
+            "final_data": restructured_text,
+            "structuring_mode": mode,
+            **extra,
+            "timings": timings
         })
+    except ExecutorSaturated:
+        logger.warning("Extraction queue full, rejecting request")
+        raise HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Failed to extract and structure text: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to process the image")
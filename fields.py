@@ -0,0 +1,136 @@
+import re
+from collections import namedtuple
+
+# -----------------------------------------------------------------------------
+# Precompiled field patterns. These are the exact patterns the extractors in
+# extract.py have always used (except that the phone pattern's last group takes
+# up to six digits, so '+254 712 345678' is not cut short); they are compiled
+# once at import time.
+# -----------------------------------------------------------------------------
+EMAIL_RE = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
+
+PHONE_RE = re.compile(
+    r'(\+?\d{1,4}[-.\s]?\(?\d{1,3}\)?[-.\s]?\d{3,4}[-.\s]?\d{4,6}'
+    r'|\bn?\d{10}\b|\b0\d{9}\b(?:/\d{10})?)'
+)
+PHONE_CONTEXT_RE = re.compile(r'\b(Tel|Mobile|Phone|Contact|Cell)\b', re.IGNORECASE)
+
+WEBSITE_RE = re.compile(r'(https?://[^\s]+|www\.[^\s]+)')
+
+SOCIAL_RES = {
+    "facebook": re.compile(r'(facebook\.com/[^\s]+|FB:[^\s]+|facebook.com|FB/|fb.com)', re.IGNORECASE),
+    "instagram": re.compile(r'(instagram\.com/[^\s]+|IG:[^\s]+|instagram.com|IG/|ig.com)', re.IGNORECASE),
+    "twitter": re.compile(r'(twitter\.com/[^\s]+|Twitter:[^\s]+|twitter.com|Twitter/|t.co)', re.IGNORECASE),
+}
+# Substrings (lower-cased) that every alternative of a social pattern contains;
+# when none occurs in the text the pattern cannot match and is not run.
+SOCIAL_HINTS = {
+    "facebook": ("facebook", "fb"),
+    "instagram": ("instagram", "ig"),
+    "twitter": ("twitter", "co"),
+}
+
+ADDRESS_RE = re.compile(
+    r'((?:\d{1,5}\s)?'
+    r'(?:[A-Za-z\s]+(?:Square|Building|Tower|Floor|Block|Avenue|St|Street|'
+    r'Rd|Road|Lane|Ln|Drive|Dr|Boulevard|Blvd|Place|Pl)[,.\s]*)+'
+    r'(?:,\s*\w+)*'
+    r',\s*\w+\s*\d{0,6}'
+    r'|\bP\.O\.\sBox\s\d+\b)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# An address match only ever consumes word characters, whitespace, commas and
+# periods, so it can never cross any other character. Such runs are scanned on
+# their own, and runs that contain neither a comma (required by the street form)
+# nor "P.O." are skipped without running the backtracking-heavy address pattern.
+ADDRESS_SEGMENT_RE = re.compile(r'[\w\s,.]+')
+
+DIGIT_RE = re.compile(r'\d')
+
+FIELD_TYPES = ("email", "phone", "website", "facebook", "instagram", "twitter", "address")
+
+# A typed match: `field` is one of FIELD_TYPES, `start`/`end` are character
+# offsets into the scanned text.
+FieldMatch = namedtuple("FieldMatch", ["field", "value", "start", "end"])
+
+
+def scan_fields(text, fields=FIELD_TYPES, phone_context=None):
+    """
+    Scans `text` for the requested field types and yields FieldMatch tuples,
+    grouped by field and in order of appearance within each field.
+
+    Each pattern runs at most once over the text, and patterns whose required
+    characters do not occur in it are skipped. Phone and address matches may
+    span line breaks, exactly as the original extractors allowed, so the text
+    is scanned as a whole rather than line by line. `phone_context` overrides
+    the search for phone context keywords when `text` is only part of a card.
+    """
+    lowered = None
+
+    if "email" in fields and "@" in text:
+        for m in EMAIL_RE.finditer(text):
+            yield FieldMatch("email", m.group(), m.start(), m.end())
+
+    if "phone" in fields and DIGIT_RE.search(text):
+        # The context keywords apply to the whole card, so look for them once
+        has_context = phone_context
+        for m in PHONE_RE.finditer(text):
+            number = m.group(1)
+            if len(number) < 7:
+                continue
+            if not number.startswith(('+', 'n', '0')):
+                if has_context is None:
+                    has_context = PHONE_CONTEXT_RE.search(text) is not None
+                if not has_context:
+                    continue
+            yield FieldMatch("phone", number, m.start(1), m.end(1))
+
+    if "website" in fields and ("www." in text or "http" in text):
+        for m in WEBSITE_RE.finditer(text):
+            yield FieldMatch("website", m.group(1), m.start(1), m.end(1))
+
+    for network, pattern in SOCIAL_RES.items():
+        if network not in fields:
+            continue
+        if lowered is None:
+            lowered = text.lower()
+        if not any(hint in lowered for hint in SOCIAL_HINTS[network]):
+            continue
+        for m in pattern.finditer(text):
+            yield FieldMatch(network, m.group(1), m.start(1), m.end(1))
+
+    if "address" in fields:
+        for segment in ADDRESS_SEGMENT_RE.finditer(text):
+            if "," not in segment.group() and "p.o." not in segment.group().lower():
+                continue
+            for m in ADDRESS_RE.finditer(text, segment.start(), segment.end()):
+                yield FieldMatch("address", m.group(1), m.start(1), m.end(1))
+
+
+def extract_fields(text, fields=FIELD_TYPES):
+    """
+    Runs scan_fields and groups the results into a dictionary mapping each
+    requested field type to its unique values in order of first appearance.
+    """
+    grouped = {field: [] for field in fields}
+    for match in scan_fields(text, fields):
+        grouped[match.field].append(match.value)
+    return {field: list(dict.fromkeys(values)) for field, values in grouped.items()}
+
+
+def extract_fields_by_line(lines, fields=FIELD_TYPES):
+    """
+    Like extract_fields, but scans each line of a card separately so that no
+    match can run across a line break. Phone context keywords still apply to
+    the whole card.
+    Returns (fields dictionary, set of indexes of lines that had a match).
+    """
+    phone_context = any(PHONE_CONTEXT_RE.search(line) for line in lines) if "phone" in fields else None
+    grouped = {field: [] for field in fields}
+    matched_lines = set()
+    for index, line in enumerate(lines):
+        for match in scan_fields(line, fields, phone_context):
+            grouped[match.field].append(match.value)
+            matched_lines.add(index)
+    return {field: list(dict.fromkeys(values)) for field, values in grouped.items()}, matched_lines
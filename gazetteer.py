@@ -0,0 +1,250 @@
+import io
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+
+def _default_data_dir():
+    # The GeoNames extracts bundled with the geotext package
+    try:
+        import geotext
+    except ImportError:
+        return None
+    return os.path.join(os.path.dirname(os.path.abspath(geotext.__file__)), "data")
+
+
+# Directory holding countryInfo.txt, cities15000.txt and citypatches.txt in
+# the GeoNames dump format
+GAZETTEER_DATA_DIR = os.getenv("GAZETTEER_DATA_DIR") or _default_data_dir()
+
+# Short forms printed on cards that GeoNames does not list as names
+COUNTRY_ALIASES = {
+    "usa": "US", "united states of america": "US", "america": "US",
+    "uk": "GB", "england": "GB", "scotland": "GB", "wales": "GB", "great britain": "GB",
+    "uae": "AE", "drc": "CD", "holland": "NL",
+}
+
+# Capitalized card words that are also the names of (small) cities, e.g. the
+# "Mobile:" label and Mobile, Alabama
+CARD_WORDS = {
+    "mobile", "phone", "tel", "cell", "fax", "email", "mail", "web", "office", "home", "main", "direct",
+    "street", "road", "avenue", "lane", "drive", "floor", "suite", "building", "house", "tower", "plaza",
+    "centre", "center", "park", "city", "square", "sales", "marketing", "manager", "director", "industry",
+    "best", "reading", "bath", "sale", "police", "university", "college", "president", "victoria", "union",
+}
+
+# Word tokens, allowing inner apostrophes ("N'Djamena")
+WORD_RE = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+# Marks a whitespace-separated token as an e-mail address, URL or domain
+NON_PLACE_TOKEN_RE = re.compile(r"@|://|www\.|\w\.\w{2,}", re.IGNORECASE)
+NON_DIGITS_RE = re.compile(r"\D")
+# Longest place name, in words, looked up
+MAX_NAME_WORDS = 4
+
+
+def normalize(name):
+    """
+    Lookup key for a place name: accents stripped, lower case, hyphens and
+    runs of spaces collapsed to one space.
+    """
+    if not name.isascii():
+        name = unicodedata.normalize("NFKD", name)
+        name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return " ".join(name.lower().replace("-", " ").split())
+
+
+class Gazetteer:
+    """
+    In-memory index of country and city names keyed by normalized name.
+
+    Each OCR line is tokenized once and its word n-grams are looked up
+    longest first, so a card costs a few dictionary probes per word rather
+    than a scan over every known place name.
+    """
+
+    def __init__(self, countries, country_names, cities, calling_codes):
+        # normalized name -> ISO code
+        self.countries = countries
+        # ISO code -> display name
+        self.country_names = country_names
+        # normalized name -> ((display name, ISO code, population), ...), most populous first
+        self.cities = cities
+        # calling code digits -> tuple of ISO codes
+        self.calling_codes = calling_codes
+        self._max_code_digits = max((len(code) for code in calling_codes), default=0)
+        # first word of any name -> most words in a name starting with it
+        self._first_words = {}
+        for key in list(countries) + list(cities):
+            words = key.split()
+            self._first_words[words[0]] = max(self._first_words.get(words[0], 0), len(words))
+
+    def is_country(self, name):
+        return normalize(name) in self.countries
+
+    def countries_for_phone(self, number):
+        """
+        ISO codes of the countries whose calling code prefixes an
+        international number ('+' or '00'); empty for national numbers.
+        """
+        stripped = number.lstrip()
+        digits = NON_DIGITS_RE.sub("", stripped)
+        if stripped.startswith("+"):
+            pass
+        elif digits.startswith("00"):
+            digits = digits[2:]
+        else:
+            return ()
+        for length in range(min(self._max_code_digits, len(digits)), 0, -1):
+            isos = self.calling_codes.get(digits[:length])
+            if isos:
+                return isos
+        return ()
+
+    def find(self, line):
+        """
+        Places named on one line, in order: a list of ('country', iso) and
+        ('city', candidates) tuples, plus whether the line holds nothing but
+        place names. The first word of a name must be capitalized.
+        """
+        words = [word for token in line.split() if not NON_PLACE_TOKEN_RE.search(token)
+                 for word in WORD_RE.findall(token)]
+        keys = [normalize(word) for word in words]
+        places = []
+        covered = 0
+        i = 0
+        while i < len(words):
+            longest = self._first_words.get(keys[i], 0) if words[i][0].isupper() else 0
+            for n in range(min(longest, MAX_NAME_WORDS, len(words) - i), 0, -1):
+                key = " ".join(keys[i:i + n])
+                if n == 1 and (len(key) < 2 or key in CARD_WORDS):
+                    continue
+                if key in self.countries:
+                    places.append(("country", self.countries[key]))
+                elif key in self.cities:
+                    places.append(("city", self.cities[key]))
+                else:
+                    continue
+                covered += n
+                i += n
+                break
+            else:
+                i += 1
+        return places, bool(words) and covered == len(words)
+
+    def is_place_line(self, line):
+        """Whether a line names nothing but places, e.g. 'Nairobi, Kenya'."""
+        return self.find(line)[1]
+
+    def resolve(self, lines, phone_numbers=()):
+        """
+        Picks one city and one country for a card, deterministically:
+          - a city named on the card is ranked by whether its country is
+            also named, whether a phone number carries that country's
+            calling code, its population, and then its position
+          - a named country is ranked by whether it is the chosen city's
+            country, whether the phone numbers point to it, and its position;
+            with no country named, the chosen city's country is used
+        Returns (city, country) display names, either of which may be None.
+        """
+        named_countries, city_mentions = [], []
+        for line in lines:
+            for kind, value in self.find(line)[0]:
+                (named_countries if kind == "country" else city_mentions).append(value)
+        phone_countries = {iso for number in phone_numbers for iso in self.countries_for_phone(number)}
+        mentioned = set(named_countries)
+
+        best_city = None
+        best_rank = None
+        for position, candidates in enumerate(city_mentions):
+            for name, iso, population in candidates:
+                rank = (iso in mentioned, iso in phone_countries, population, -position)
+                if best_rank is None or rank > best_rank:
+                    best_city, best_rank = (name, iso), rank
+
+        city_iso = best_city[1] if best_city else None
+        country_iso = None
+        if named_countries:
+            ranked = sorted(enumerate(named_countries),
+                            key=lambda item: (item[1] != city_iso, item[1] not in phone_countries, item[0]))
+            country_iso = ranked[0][1]
+        elif best_city:
+            country_iso = city_iso
+        return (best_city[0] if best_city else None), self.country_names.get(country_iso)
+
+
+def _read_rows(path):
+    with io.open(path, encoding="utf-8-sig") as f:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield line.rstrip("\n").split("\t")
+
+
+def load_gazetteer(data_dir=GAZETTEER_DATA_DIR):
+    """
+    Builds a Gazetteer from GeoNames extracts: countryInfo.txt for country
+    names and calling codes, cities15000.txt (and citypatches.txt) for
+    cities. Alternate names are left out to keep the index small.
+    """
+    if data_dir is None:
+        raise RuntimeError("No gazetteer data: install geotext or set GAZETTEER_DATA_DIR")
+    started = time.perf_counter()
+    countries, country_names, calling_codes = {}, {}, {}
+    for columns in _read_rows(os.path.join(data_dir, "countryInfo.txt")):
+        iso, name, phone = columns[0], columns[4], columns[12]
+        countries[normalize(name)] = iso
+        country_names[iso] = name
+        for code in phone.split(" and "):
+            code = NON_DIGITS_RE.sub("", code)
+            if code:
+                calling_codes.setdefault(code, []).append(iso)
+    for alias, iso in COUNTRY_ALIASES.items():
+        countries.setdefault(alias, iso)
+
+    cities = {}
+    for columns in _read_rows(os.path.join(data_dir, "cities15000.txt")):
+        name, ascii_name, iso = columns[1], columns[2], columns[8]
+        population = int(columns[14] or 0)
+        for key in {normalize(name), normalize(ascii_name)}:
+            if key not in countries:
+                cities.setdefault(key, []).append((name, iso, population))
+    patches = os.path.join(data_dir, "citypatches.txt")
+    if os.path.exists(patches):
+        for columns in _read_rows(patches):
+            key = normalize(columns[0])
+            if key not in cities and key not in countries:
+                cities[key] = [(columns[0].title(), columns[1].strip(), 0)]
+
+    gazetteer = Gazetteer(
+        countries,
+        country_names,
+        {key: tuple(sorted(entries, key=lambda entry: -entry[2])) for key, entries in cities.items()},
+        {code: tuple(isos) for code, isos in calling_codes.items()},
+    )
+    logger.info(f"Gazetteer loaded with {len(countries)} country and {len(cities)} city names "
+                f"in {time.perf_counter() - started:.2f}s")
+    return gazetteer
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """
+    Return the process-wide gazetteer, loading it on first use.
+    """
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = load_gazetteer()
+    return _gazetteer
+
+
+def gazetteer_loaded():
+    return _gazetteer is not None
@@ -0,0 +1,383 @@
+import os
+import json
+import time
+import uuid
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+from executor import ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the job queue, so queued jobs survive restarts
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.db")
+# Jobs processed concurrently per process; each hands its CPU work to the
+# extraction executor, so they share its warm OCR engines
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Attempts before a failing job is moved to the dead-letter state
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Base delay in seconds before a failed job is retried (doubles per attempt)
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2"))
+# Seconds after which a running job is presumed lost (e.g. the process died) and re-run;
+# a job still running renews its lease every third of this
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Seconds a finished job's result stays available for polling; dead jobs are kept
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+# Seconds an idle worker sleeps before checking for due retries
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+# Due jobs a worker tries to claim per poll when other processes win the race
+CLAIM_CANDIDATES = 5
+
+# Terminal states: 'succeeded', 'failed' (permanent error, not retried) and
+# 'dead' (retries exhausted)
+FINISHED_STATUSES = ("succeeded", "failed", "dead")
+JOB_COLUMNS = ("job_id", "kind", "status", "attempts", "max_attempts", "created_at", "available_at",
+               "started_at", "finished_at", "result", "error")
+
+
+class JobQueue:
+    """
+    Persistent job queue backed by SQLite, processed by JOB_WORKERS asyncio
+    workers in this process.
+
+    Handlers are coroutines registered per job kind and called as
+    `await handler(payload, params)`; their return value is stored as the job
+    result. A handler error with a 4xx `status_code` (e.g. HTTPException)
+    fails the job permanently; any other error is retried with exponential
+    backoff, and after `max_attempts` the job is dead-lettered.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS,
+                 backoff=JOB_RETRY_BACKOFF, lease=JOB_LEASE_SECONDS, ttl=JOB_RESULT_TTL):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.ttl = ttl
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._tasks = []
+        self._wakeup = None
+        self._waiters = {}
+        self._counters = {"submitted": 0, "succeeded": 0, "failed": 0, "retried": 0, "dead": 0, "recovered": 0}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._run_time_total = 0.0
+        self._started = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, payload BLOB, params TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL, created_at REAL NOT NULL, "
+            "available_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_available ON jobs (status, available_at)")
+        self._db.commit()
+
+    def register(self, kind, handler):
+        self._handlers[kind] = handler
+
+    # -- storage (blocking; called through asyncio.to_thread from the loop) --
+
+    def _insert(self, kind, payload, params):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, kind, status, payload, params, max_attempts, created_at, available_at) "
+                "VALUES (?, ?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, kind, payload, json.dumps(params), self.max_attempts, now, now),
+            )
+            self._db.commit()
+            self._counters["submitted"] += 1
+        return job_id
+
+    def _claim(self):
+        """
+        Atomically mark the oldest due job as running and return it, or None.
+        Running jobs whose lease has expired are claimed again, unless they have
+        used up their attempts (e.g. a job that crashes the process every time),
+        in which case they are dead-lettered. Several processes may share the
+        queue file, so each UPDATE repeats the due condition and a job counts as
+        claimed only if this process changed it.
+        """
+        now = time.time()
+        due = "((status = 'queued' AND available_at <= ?) OR (status = 'running' AND started_at < ?))"
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, kind, status, payload, params, attempts, max_attempts, created_at FROM jobs "
+                f"WHERE {due} ORDER BY available_at LIMIT ?",
+                (now, now - self.lease, CLAIM_CANDIDATES),
+            ).fetchall()
+            for job_id, kind, status, payload, params, attempts, max_attempts, created_at in rows:
+                if status == "running" and attempts >= max_attempts:
+                    error = f"Lease expired after {attempts} attempt(s)"
+                    dead = self._db.execute(
+                        "UPDATE jobs SET status = 'dead', finished_at = ?, error = ? "
+                        f"WHERE job_id = ? AND {due}",
+                        (now, json.dumps(error), job_id, now, now - self.lease),
+                    ).rowcount == 1
+                    self._db.commit()
+                    if dead:
+                        self._counters["dead"] += 1
+                        logger.error(f"Job {job_id} dead-lettered: {error}")
+                    continue
+                claimed = self._db.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, attempts = attempts + 1 "
+                    f"WHERE job_id = ? AND {due}",
+                    (now, job_id, now, now - self.lease),
+                ).rowcount == 1
+                self._db.commit()
+                if not claimed:
+                    # Another process claimed it between the SELECT and the UPDATE
+                    continue
+                if status == "running":
+                    self._counters["recovered"] += 1
+                    logger.warning(f"Job {job_id} lease expired, running it again")
+                waited = now - created_at
+                self._started += 1
+                self._queue_wait_total += waited
+                self._queue_wait_max = max(self._queue_wait_max, waited)
+                return {"job_id": job_id, "kind": kind, "payload": payload, "params": json.loads(params),
+                        "attempts": attempts + 1, "started_at": now}
+        return None
+
+    def _renew(self, job_id, attempts):
+        """
+        Extend a running job's lease. Matching the attempt number makes sure
+        only the claim that is still current renews it.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET started_at = ? WHERE job_id = ? AND status = 'running' AND attempts = ?",
+                (time.time(), job_id, attempts),
+            )
+            self._db.commit()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                # Dead jobs keep their payload so they can be retried by hand
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, "
+                "payload = CASE WHEN ? = 'dead' THEN payload END WHERE job_id = ?",
+                (status, now, json.dumps(result) if result is not None else None,
+                 json.dumps(error) if error is not None else None, status, job_id),
+            )
+            self._db.commit()
+            self._counters[status] += 1
+
+    def _retry(self, job_id, delay, error, count_attempt=True):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = 'queued', available_at = ?, error = ?, attempts = attempts - ? "
+                "WHERE job_id = ?",
+                (time.time() + delay, json.dumps(error), 0 if count_attempt else 1, job_id),
+            )
+            self._db.commit()
+            if count_attempt:
+                self._counters["retried"] += 1
+
+    def _requeue_dead(self, job_id):
+        now = time.time()
+        with self._lock:
+            updated = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, finished_at = NULL, error = NULL "
+                "WHERE job_id = ? AND status = 'dead' AND payload IS NOT NULL",
+                (now, job_id),
+            ).rowcount
+            self._db.commit()
+        return updated > 0
+
+    def _expire(self):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - self.ttl,),
+            )
+            self._db.commit()
+
+    def get(self, job_id):
+        """
+        Return a job's public record (without its payload), or None.
+        """
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._record(row) if row is not None else None
+
+    def list(self, status, limit=100):
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE status = ? ORDER BY created_at LIMIT ?",
+                (status, limit),
+            ).fetchall()
+        return [self._record(row) for row in rows]
+
+    @staticmethod
+    def _record(row):
+        job = dict(zip(JOB_COLUMNS, row))
+        for name in ("result", "error"):
+            if job[name] is not None:
+                job[name] = json.loads(job[name])
+        job["queue_seconds"] = round(job["started_at"] - job["created_at"], 3) if job["started_at"] else None
+        return job
+
+    # -- async API --
+
+    async def submit(self, kind, payload, params):
+        """
+        Persist a job and wake a worker. Returns the job ID.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = await asyncio.to_thread(self._insert, kind, payload, params)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job_id
+
+    async def retry_dead(self, job_id):
+        """
+        Move a dead-lettered job back to the queue. Returns False if the job is
+        not dead.
+        """
+        requeued = await asyncio.to_thread(self._requeue_dead, job_id)
+        if requeued and self._wakeup is not None:
+            self._wakeup.set()
+        return requeued
+
+    async def wait(self, job_id, timeout):
+        """
+        Wait up to `timeout` seconds for a job to finish and return its record.
+        """
+        job = await asyncio.to_thread(self.get, job_id)
+        if job is None or job["status"] in FINISHED_STATUSES or timeout <= 0:
+            return job
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, []).append(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(job_id, [])
+            if event in waiters:
+                waiters.remove(event)
+            if not waiters:
+                self._waiters.pop(job_id, None)
+        return await asyncio.to_thread(self.get, job_id)
+
+    def start(self):
+        """
+        Start the workers on the running event loop.
+        """
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.get_running_loop().create_task(self._worker(n)) for n in range(self.workers)]
+        logger.info(f"Job queue started with {self.workers} worker(s), persisted to {self.path}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, number):
+        idle_polls = 0
+        while True:
+            # Cleared before claiming so a submission made meanwhile is not missed
+            self._wakeup.clear()
+            job = await asyncio.to_thread(self._claim)
+            if job is None:
+                idle_polls += 1
+                if idle_polls % 60 == 0:
+                    await asyncio.to_thread(self._expire)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            idle_polls = 0
+            await self._process(job)
+
+    async def _keep_lease(self, job):
+        # Renews the lease well before it expires, so a job that runs longer
+        # than the lease is not claimed and run a second time meanwhile
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            await asyncio.to_thread(self._renew, job["job_id"], job["attempts"])
+
+    async def _run_handler(self, job):
+        lease = asyncio.get_running_loop().create_task(self._keep_lease(job))
+        try:
+            return await self._handlers[job["kind"]](job["payload"], job["params"])
+        finally:
+            lease.cancel()
+
+    async def _process(self, job):
+        job_id = job["job_id"]
+        try:
+            result = await self._run_handler(job)
+        except asyncio.CancelledError:
+            raise
+        except ExecutorSaturated:
+            # Back-pressure from the extraction executor, not a job failure
+            await asyncio.to_thread(self._retry, job_id, JOB_POLL_INTERVAL, "Server busy", False)
+            return
+        except Exception as e:
+            error = getattr(e, "detail", None) or str(e)
+            status_code = getattr(e, "status_code", None)
+            if status_code is not None and 400 <= status_code < 500:
+                logger.warning(f"Job {job_id} failed permanently: {error}")
+                await asyncio.to_thread(self._finish, job_id, "failed", error=error)
+            elif job["attempts"] >= self.max_attempts:
+                logger.error(f"Job {job_id} dead-lettered after {job['attempts']} attempt(s): {error}")
+                await asyncio.to_thread(self._finish, job_id, "dead", error=error)
+            else:
+                delay = self.backoff * 2 ** (job["attempts"] - 1) * random.uniform(0.8, 1.2)
+                logger.warning(f"Job {job_id} attempt {job['attempts']} failed, retrying in {delay:.1f}s: {error}")
+                await asyncio.to_thread(self._retry, job_id, delay, error)
+                return
+        else:
+            await asyncio.to_thread(self._finish, job_id, "succeeded", result=result)
+        with self._lock:
+            self._run_time_total += time.time() - job["started_at"]
+        for event in self._waiters.pop(job_id, []):
+            event.set()
+
+    def stats(self):
+        """
+        Return job counts by status, outcome counters and queue latency.
+        Blocking (it counts the jobs table); call it through a thread.
+        """
+        with self._lock:
+            by_status = dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            finished = self._counters["succeeded"] + self._counters["failed"] + self._counters["dead"]
+            return {
+                "workers": len(self._tasks),
+                "by_status": by_status,
+                **self._counters,
+                "queue_wait_seconds_avg": round(self._queue_wait_total / self._started, 3) if self._started else 0.0,
+                "queue_wait_seconds_max": round(self._queue_wait_max, 3),
+                "run_seconds_avg": round(self._run_time_total / finished, 3) if finished else 0.0,
+            }
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Return the process-wide job queue, creating it on first use.
+    """
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue()
+    return _queue
@@ -0,0 +1,89 @@
+import os
+import re
+from collections import namedtuple
+
+# Lines recognized with lower confidence are ignored by the layout-aware
+# field extractors (they still appear in the extracted text)
+OCR_MIN_LINE_CONFIDENCE = float(os.getenv("OCR_MIN_LINE_CONFIDENCE", "0.5"))
+
+# One recognized text line: `box` is its axis-aligned bounding box
+# (x0, y0, x1, y1) in pixels of the image passed to OCR.
+OCRLine = namedtuple("OCRLine", ["text", "confidence", "box"])
+
+LETTER_RE = re.compile(r"[A-Za-z]")
+DIGIT_RE = re.compile(r"\d")
+# Words that mark a line as a job title rather than a person's name
+TITLE_WORDS = {
+    "director", "manager", "officer", "executive", "head", "lead", "consultant", "engineer", "ceo", "cfo",
+    "cto", "coo", "president", "founder", "partner", "associate", "assistant", "sales", "marketing",
+    "operations", "development", "business", "account", "chief", "senior", "agent", "representative",
+}
+
+# Words that mark a line as an organization name
+ORG_WORDS = {
+    "ltd", "limited", "inc", "incorporated", "llc", "plc", "gmbh", "corp", "corporation", "company", "co",
+    "group", "holdings", "consulting", "partners", "bank", "agency", "associates", "enterprises",
+    "solutions", "services", "international", "industries", "sacco", "foundation", "university",
+}
+
+
+def ocr_result_to_lines(result):
+    """
+    Converts a PaddleOCR result into OCRLine tuples, keeping the engine's
+    top-to-bottom reading order. Pages without detections yield nothing.
+    """
+    lines = []
+    for page in result or []:
+        for points, (text, confidence) in page or []:
+            xs = [point[0] for point in points]
+            ys = [point[1] for point in points]
+            lines.append(OCRLine(text, round(float(confidence), 4),
+                                 (int(min(xs)), int(min(ys)), int(max(xs)), int(max(ys)))))
+    return lines
+
+
+def lines_to_text(lines):
+    """
+    Newline-joined text of the lines, as previously returned by the OCR stage.
+    """
+    return "\n".join(line.text for line in lines).strip()
+
+
+def line_height(line):
+    return line.box[3] - line.box[1]
+
+
+def line_to_dict(line):
+    return {"text": line.text, "confidence": line.confidence, "box": list(line.box)}
+
+
+def is_name_candidate(text):
+    """
+    Whether a line could hold a person or organization name: mostly letters,
+    at most two digits and not too long to be a name.
+    """
+    stripped = text.strip()
+    return 2 <= len(stripped) <= 60 and LETTER_RE.search(stripped) is not None and \
+        len(DIGIT_RE.findall(stripped)) <= 2
+
+
+def _words(text):
+    return [word.strip(".,&") for word in text.split() if word.strip(".,&")]
+
+
+def looks_like_org(text):
+    return any(word.lower() in ORG_WORDS for word in _words(text))
+
+
+def looks_like_title(text):
+    return any(word.lower() in TITLE_WORDS for word in _words(text))
+
+
+def looks_like_person(text):
+    """
+    Heuristic fallback when NER finds no PERSON: two to four capitalized
+    alphabetic words that are neither a job title nor an organization.
+    """
+    words = _words(text)
+    return 2 <= len(words) <= 4 and all(word.isalpha() and word[0].isupper() for word in words) and \
+        not looks_like_title(text) and not looks_like_org(text)
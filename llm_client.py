@@ -0,0 +1,208 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from email.utils import parsedate_to_datetime
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Base URL of the OpenAI-compatible API (point at a local stub for testing)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+# Seconds allowed to establish a connection / for the whole response
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
+# Retries after the first attempt on timeouts, 429 and 5xx responses
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+# Base delay for exponential backoff, in seconds
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "0.5"))
+# Longest Retry-After (seconds) honoured; a server asking for more fails the request
+LLM_MAX_RETRY_AFTER = float(os.getenv("LLM_MAX_RETRY_AFTER", "60"))
+# Requests allowed in flight at once across the process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Requests started per second across the process (0 = unlimited)
+LLM_RATE_LIMIT = float(os.getenv("LLM_RATE_LIMIT", "0"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Number of recent latencies kept for percentile reporting
+LATENCY_WINDOW = 1000
+
+
+class LLMError(Exception):
+    """Raised when the LLM API could not return a completion."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def retry_after_seconds(response):
+    """
+    Seconds the server asked us to wait in its Retry-After header (delay in
+    seconds or an HTTP date), or None if it did not say.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Spaces request starts so that at most `rate` begin per second.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class LLMClient:
+    """
+    Async client for the chat completions API with one pooled connection set,
+    timeouts, jittered exponential backoff and process-wide concurrency and
+    rate limits. Must be used from a single event loop.
+    """
+
+    def __init__(self, base_url=OPENAI_BASE_URL, timeout=LLM_TIMEOUT, connect_timeout=LLM_CONNECT_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff=LLM_BACKOFF, max_concurrency=LLM_MAX_CONCURRENCY,
+                 rate_limit=LLM_RATE_LIMIT, max_retry_after=LLM_MAX_RETRY_AFTER, transport=None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = RateLimiter(rate_limit)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._requests = 0
+        self._failures = 0
+        self._retries = 0
+        self._in_flight = 0
+        self._prompt_tokens = 0
+        self._completion_tokens = 0
+
+    async def chat_completion(self, payload, api_key):
+        """
+        POSTs a chat completion request and returns the decoded JSON response.
+        Raises LLMError once retries are exhausted or on a non-retryable error.
+        A Retry-After header on a retryable response sets the minimum delay.
+        """
+        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"}
+        self._requests += 1
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self._send(payload, headers)
+            except httpx.TransportError as e:
+                error = LLMError(f"LLM request failed: {e!r}")
+            else:
+                if response.status_code == 200:
+                    try:
+                        body = response.json()
+                    except ValueError:
+                        self._failures += 1
+                        raise LLMError(f"LLM API returned invalid JSON: {response.text[:200]}", response.status_code)
+                    usage = body.get("usage") or {}
+                    self._prompt_tokens += usage.get("prompt_tokens", 0)
+                    self._completion_tokens += usage.get("completion_tokens", 0)
+                    return body
+                error = LLMError(f"LLM API returned {response.status_code}: {response.text[:200]}", response.status_code)
+                if response.status_code not in RETRY_STATUSES:
+                    self._failures += 1
+                    raise error
+                retry_after = retry_after_seconds(response)
+
+            if attempt >= self.max_retries or (retry_after or 0) > self.max_retry_after:
+                self._failures += 1
+                raise error
+            attempt += 1
+            self._retries += 1
+            # Full jitter: sleep a random time up to the exponential cap, but
+            # never less than the server asked for
+            delay = max(random.uniform(0, self.backoff * (2 ** (attempt - 1))), retry_after or 0)
+            logger.warning(f"{error}; retrying in {delay:.2f}s (attempt {attempt}/{self.max_retries})")
+            await asyncio.sleep(delay)
+
+    async def _send(self, payload, headers):
+        async with self._semaphore:
+            await self._rate_limiter.wait()
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                return await self._client.post("/chat/completions", json=payload, headers=headers)
+            finally:
+                self._latencies.append(time.perf_counter() - started)
+                self._in_flight -= 1
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    def stats(self):
+        """
+        Return request counters, token usage and latency percentiles.
+        """
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+        return {
+            "requests": self._requests,
+            "failures": self._failures,
+            "retries": self._retries,
+            "in_flight": self._in_flight,
+            "prompt_tokens": self._prompt_tokens,
+            "completion_tokens": self._completion_tokens,
+            "latency_seconds_p50": percentile(0.5),
+            "latency_seconds_p95": percentile(0.95),
+            "latency_seconds_max": round(latencies[-1], 4) if latencies else 0.0,
+        }
+
+
+_client = None
+
+
+def get_llm_client():
+    """
+    Return the process-wide LLM client, creating it on first use. Call from
+    the event loop that will use it.
+    """
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
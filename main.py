@@ -1,14 +1,33 @@
 import os
 import json
+import asyncio
 import logging
-from fastapi import FastAPI, UploadFile, HTTPException, File
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+from fastapi import FastAPI, UploadFile, HTTPException, File, Form, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from extract import extract_text_from_image, restructure_extracted_text_to_json
-from database import Base, engine
+from extract import (
+    extract_and_structure, extract_and_structure_many, extract_lines_with_timings, structure_lines_with_timings,
+    contact_fields_from_lines,
+)
+from layout import lines_to_text, line_to_dict
+from ocr_pool import get_ocr_pool
+from warmup import get_model_warmup, preload_for_fork, PRELOAD_MODELS
+from executor import get_executor, ExecutorSaturated
+from cache import get_result_cache, image_key
+from dedupe_index import get_dedupe_index
+from jobs import get_job_queue
+from timings import stage, get_stage_histograms, server_timing_headers
+from streaming import check_stream_format, event_stream_response
+from uploads import (read_upload, iter_zip_images, UploadSizeLimitMiddleware, IMAGE_KINDS, MAX_UPLOAD_BYTES,
+                     MAX_BATCH_UPLOAD_BYTES)
+from database import Base, engine, SessionLocal, db_stats
+from crud.prospect_crud import create_prospect_from_card, backfill_phone_numbers
 from routers.prospect_router import router as prospect_router
 from routers.user_router import router as user_router
-from models.prospect_model import Base
+from models.prospect_model import Base, Prospect
 from models.user_model import Base
 
 # Configure logging
@@ -18,6 +37,9 @@ logger = logging.getLogger(__name__)
 # Load environment variable for OpenAI API key
 openai_api_key = os.getenv("OPENAI_API_KEY")
 
+# Maximum number of cards accepted by /extract_text/batch
+BATCH_MAX_CARDS = int(os.getenv("BATCH_MAX_CARDS", "500"))
+
 app = FastAPI()
 
 # Configure CORS (update for production to restrict origins)
@@ -28,11 +50,50 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Reject oversized bodies before they are received
+app.add_middleware(UploadSizeLimitMiddleware)
+
+# Share the NLP model with workers forked by a preloading server
+if PRELOAD_MODELS:
+    preload_for_fork()
 
 @app.on_event("startup")
 def startup_event():
     # Create tables automatically at startup
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add any missing indexes
+    for index in Prospect.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    # Rewrite phone numbers saved before they were normalized, so phone
+    # lookups (equality matches on E.164) find those rows too
+    db = SessionLocal()
+    try:
+        updated = backfill_phone_numbers(db)
+        if updated:
+            logger.info(f"Normalized the phone numbers of {updated} existing prospect(s)")
+    finally:
+        db.close()
+    # Build the duplicate-contact index once; CRUD keeps it current afterwards,
+    # and a background refresh adds prospects created by other processes
+    db = SessionLocal()
+    try:
+        get_dedupe_index().load(db)
+    finally:
+        db.close()
+    get_dedupe_index().start_refresher(SessionLocal)
+    # Load OCR and NLP models once so requests share warm engines (in the
+    # background by default; see MODEL_WARMUP)
+    get_model_warmup().start()
+
+@app.on_event("startup")
+async def start_job_queue():
+    # Workers pick up jobs left queued by a previous run as well as new ones
+    get_job_queue().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await get_job_queue().stop()
+    get_executor().shutdown()
 
 app.include_router(prospect_router)
 app.include_router(user_router)
@@ -42,33 +103,423 @@ async def read_root():
     """Root endpoint for basic API info."""
     return {"message": "Welcome to the Business Card Text Extraction API"}
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: 200 once the OCR and NLP models are loaded, 503 before."""
+    ready, detail = get_model_warmup().readiness()
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **detail})
+
+@app.get("/stats")
+async def read_stats():
+    """Runtime statistics for the OCR engine pool, extraction executor, result cache and database."""
+    return {
+        "ocr_pool": get_ocr_pool().stats(),
+        "executor": get_executor().stats(),
+        "cache": get_result_cache().stats(),
+        "dedupe_index": get_dedupe_index().stats(),
+        "database": db_stats.snapshot(),
+        "jobs": await run_in_threadpool(get_job_queue().stats),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def read_metrics():
+    """Per-stage latency histograms in the Prometheus text format."""
+    return PlainTextResponse(get_stage_histograms().render(), media_type="text/plain; version=0.0.4")
+
+async def _extract_cached(image_data, timings):
+    """
+    Run OCR and structuring for one image off the event loop, serving repeated
+    uploads of the same image from the result cache.
+    Returns (extracted_text, final_data, ocr_lines) and adds stage timings to
+    `timings`.
+    """
+    cache = get_result_cache()
+    with stage(timings, "cache_lookup"):
+        key = image_key(image_data)
+        cached = await cache.aget("extract", key)
+    if cached is not None:
+        logger.info("Serving extraction result from cache")
+        return cached["extracted_text"], cached["final_data"], cached["ocr_lines"]
+    extracted_text, final_data, stage_timings, ocr_lines = await get_executor().run(extract_and_structure, image_data)
+    timings.update(stage_timings)
+    await cache.aset("extract", key, {"extracted_text": extracted_text, "final_data": final_data, "ocr_lines": ocr_lines})
+    return extracted_text, final_data, ocr_lines
+
+def _extraction_result(extracted_text, final_data, ocr_lines, timings):
+    return {
+        "extracted_text": extracted_text,
+        "final_data": final_data,
+        "ocr_lines": ocr_lines,
+        "duplicates": get_dedupe_index().find_duplicates(final_data),
+        "timings": timings
+    }
+
+async def _extract_events(image_data, timings):
+    """
+    Streaming counterpart of _extract_cached: OCR and structuring run as two
+    executor jobs, so the recognized lines ('ocr') and the regex fields
+    ('fields') are sent while NER is still running. The last event
+    ('result') holds the same body as the non-streaming response.
+    """
+    cache = get_result_cache()
+    with stage(timings, "cache_lookup"):
+        key = image_key(image_data)
+        cached = await cache.aget("extract", key)
+    if cached is not None:
+        logger.info("Serving extraction result from cache")
+        extracted_text, final_data, ocr_lines = cached["extracted_text"], cached["final_data"], cached["ocr_lines"]
+        yield "ocr", {"extracted_text": extracted_text, "ocr_lines": ocr_lines}
+    else:
+        executor = get_executor()
+        lines, ocr_timings = await executor.run(extract_lines_with_timings, image_data)
+        timings.update(ocr_timings)
+        extracted_text, ocr_lines = lines_to_text(lines), [line_to_dict(line) for line in lines]
+        yield "ocr", {"extracted_text": extracted_text, "ocr_lines": ocr_lines, "timings": dict(timings)}
+        # Regex matching, and on first use the gazetteer load, stay off the event loop
+        yield "fields", {"final_data": await executor.run(contact_fields_from_lines, lines)}
+        final_data, structure_timings = await executor.run(structure_lines_with_timings, lines)
+        timings.update(structure_timings)
+        await cache.aset("extract", key, {"extracted_text": extracted_text, "final_data": final_data, "ocr_lines": ocr_lines})
+    get_stage_histograms().observe_timings(timings)
+    yield "result", {"message": "Text extracted successfully.",
+                     **_extraction_result(extracted_text, final_data, ocr_lines, timings)}
+
+def _job_accepted(job_id):
+    return JSONResponse(status_code=202, content={"message": "Job accepted.", "job_id": job_id,
+                                                  "status_url": f"/jobs/{job_id}"})
+
 @app.post("/extract_text")
-async def extract_text(image: UploadFile = File(...)):
+async def extract_text(image: UploadFile = File(...), mode: str = "sync", stream: Optional[str] = None):
     """
     Extract text from an uploaded image file using OCR and restructure it to JSON format.
+    With mode=async the image is queued and a job ID is returned immediately;
+    poll GET /jobs/{job_id} for the result. With stream=ndjson or stream=sse
+    the OCR lines, regex fields and final result are sent as they are ready.
     """
-    if image.content_type.split("/")[0] != "image":
-        logger.error("Invalid file type uploaded")
-        raise HTTPException(status_code=400, detail="Invalid file type. Please upload an image file.")
-    
-    try:
-        image_data = await image.read()
-        logger.info("Image uploaded and read successfully")
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
+    check_stream_format(stream)
+    if stream and mode == "async":
+        raise HTTPException(status_code=400, detail="stream is not available with mode=async")
+    # Size-checked, magic-byte sniffed read; raises 413/415 before any OCR work
+    timings = {}
+    with stage(timings, "upload_read"):
+        _, image_data = await read_upload(image)
+    logger.info("Image uploaded and read successfully")
 
-        # Perform OCR and restructure the extracted text
-        extracted_text = extract_text_from_image(image_data)
-        restructured_text = restructure_extracted_text_to_json(extracted_text)
+    if mode == "async":
+        job_id = await get_job_queue().submit("extract", image_data, {})
+        logger.info(f"Extraction job {job_id} queued")
+        return _job_accepted(job_id)
+    if stream:
+        return event_stream_response(_extract_events(image_data, timings), stream)
 
+    try:
+        extracted_text, restructured_text, ocr_lines = await _extract_cached(image_data, timings)
         logger.info("Text extracted and structured successfully")
-        return JSONResponse(status_code=200, content={
+        get_stage_histograms().observe_timings(timings)
+        return JSONResponse(status_code=200, headers=server_timing_headers(timings), content={
             "message": "Text extracted successfully.",
-            "extracted_text": extracted_text,
-            "final_data": restructured_text
+            **_extraction_result(extracted_text, restructured_text, ocr_lines, timings)
         })
+    except ExecutorSaturated:
+        logger.warning("Extraction queue full, rejecting request")
+        raise HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
     except Exception as e:
         logger.error(f"Failed to extract text: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to extract text from the image")
 
+async def _collect_batch_images(files):
+    """
+    Flatten uploaded images and zip archives into a list of (filename, bytes)
+    in upload order; archive members keep their order inside the archive.
+    """
+    images = []
+    # Image bytes collected so far, across every upload of the request
+    total_bytes = 0
+    for upload in files:
+        kind, data = await read_upload(upload, max_bytes=MAX_BATCH_UPLOAD_BYTES, allowed=IMAGE_KINDS + ("zip",))
+        if kind == "zip":
+            for filename, content in iter_zip_images(data, max_total_bytes=MAX_BATCH_UPLOAD_BYTES - total_bytes):
+                images.append((filename, content))
+                total_bytes += len(content)
+                if len(images) > BATCH_MAX_CARDS:
+                    break
+        else:
+            # A plain image in a batch is held to the single-image limit
+            if len(data) > MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413,
+                                    detail=f"File too large: {upload.filename}. Maximum is {MAX_UPLOAD_BYTES} bytes.")
+            images.append((upload.filename, data))
+            total_bytes += len(data)
+        if total_bytes > MAX_BATCH_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Batch expands beyond the batch size limit.")
+        if len(images) > BATCH_MAX_CARDS:
+            raise HTTPException(status_code=413, detail=f"A batch may contain at most {BATCH_MAX_CARDS} cards.")
+    return images
+
+def _batch_card(position, filename, result):
+    card = {"index": position, "filename": filename, **result}
+    if "final_data" in card:
+        card["duplicates"] = get_dedupe_index().find_duplicates(card["final_data"])
+    return card
+
+async def _record_batch_result(cache, key, result):
+    get_stage_histograms().observe_timings(result["timings"])
+    if "error" not in result:
+        await cache.aset("extract", key, {name: result[name] for name in ("extracted_text", "final_data", "ocr_lines")})
+
+async def _batch_events(cards, keys, by_key, pending):
+    """
+    Streaming counterpart of the batch endpoint. Cached cards are sent at
+    once and every other card as soon as its own extraction finishes, so
+    'card' events arrive in completion order and carry their 'index'. Only
+    one card per extraction worker is submitted at a time, leaving the
+    executor queue to other requests; a final 'summary' event closes the
+    stream.
+    """
+    positions = {}
+    for position, key in enumerate(keys):
+        positions.setdefault(key, []).append(position)
+    failed = 0
+    yield "batch", {"count": len(cards)}
+
+    for key in list(by_key):
+        for position in positions[key]:
+            yield "card", _batch_card(position, cards[position][0], by_key[key])
+
+    executor = get_executor()
+    semaphore = asyncio.Semaphore(executor.workers)
+
+    async def extract_card(key):
+        async with semaphore:
+            try:
+                extracted_text, final_data, timings, ocr_lines = await executor.run(extract_and_structure, pending[key])
+            except ExecutorSaturated:
+                return key, {"error": "Server busy, please retry shortly", "timings": {}}
+            except Exception as e:
+                return key, {"error": str(e), "timings": {}}
+        return key, {"extracted_text": extracted_text, "final_data": final_data, "ocr_lines": ocr_lines,
+                     "timings": timings}
+
+    cache = get_result_cache()
+    tasks = [asyncio.ensure_future(extract_card(key)) for key in pending]
+    try:
+        for task in asyncio.as_completed(tasks):
+            key, result = await task
+            await _record_batch_result(cache, key, result)
+            for position in positions[key]:
+                failed += "error" in result
+                yield "card", _batch_card(position, cards[position][0], result)
+    finally:
+        # The client may disconnect part-way; stop the cards not yet started
+        for task in tasks:
+            task.cancel()
+    logger.info(f"Batch streamed: {len(cards) - failed} succeeded, {failed} failed")
+    yield "summary", {"message": "Batch processed.", "count": len(cards), "failed": failed}
+
+@app.post("/extract_text/batch")
+async def extract_text_batch(images: List[UploadFile] = File(...), stream: Optional[str] = None):
+    """
+    Extract text from many business cards in one request. Accepts several image
+    files and/or zip archives of images. Results are returned in input order;
+    a card that fails carries an 'error' instead of failing the whole batch.
+    With stream=ndjson or stream=sse each card is sent as soon as it is done.
+    """
+    check_stream_format(stream)
+    cards = await _collect_batch_images(images)
+    if not cards:
+        raise HTTPException(status_code=400, detail="No images found in the upload.")
+    logger.info(f"Batch of {len(cards)} card(s) received")
+
+    # Serve cached cards directly and extract each distinct uncached image once
+    cache = get_result_cache()
+    keys = [image_key(data) for _, data in cards]
+    by_key = {}
+    pending = {}
+    for key, (_, data) in zip(keys, cards):
+        if key in by_key or key in pending:
+            continue
+        cached = await cache.aget("extract", key)
+        if cached is not None:
+            by_key[key] = {**cached, "timings": {}}
+        else:
+            pending[key] = data
+    if stream:
+        return event_stream_response(_batch_events(cards, keys, by_key, pending), stream)
+
+    # One chunk per worker so each chunk borrows a single OCR engine
+    executor = get_executor()
+    pending_keys = list(pending)
+    chunk_size = max(1, -(-len(pending_keys) // executor.workers))
+    chunks = [pending_keys[i:i + chunk_size] for i in range(0, len(pending_keys), chunk_size)]
+    try:
+        chunk_results = await asyncio.gather(
+            *(executor.run(extract_and_structure_many, [pending[key] for key in chunk]) for chunk in chunks)
+        )
+    except ExecutorSaturated:
+        logger.warning("Extraction queue full, rejecting batch")
+        raise HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Failed to extract batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to extract text from the images")
+
+    for chunk, chunk_result in zip(chunks, chunk_results):
+        for key, result in zip(chunk, chunk_result):
+            by_key[key] = result
+            await _record_batch_result(cache, key, result)
+
+    results = [_batch_card(position, filename, by_key[key])
+               for position, ((filename, _), key) in enumerate(zip(cards, keys))]
+    failed = sum(1 for r in results if "error" in r)
+    logger.info(f"Batch extracted: {len(results) - failed} succeeded, {failed} failed")
+    return JSONResponse(status_code=200, content={
+        "message": "Batch processed.",
+        "count": len(results),
+        "failed": failed,
+        "results": results
+    })
+
+def _refresh_dedupe_index():
+    """
+    Add prospects created by other processes since the last refresh, so a
+    save checks against all of them. Blocking; call it through the threadpool.
+    """
+    db = SessionLocal()
+    try:
+        get_dedupe_index().refresh(db)
+    finally:
+        db.close()
+
+def _save_card(final_data, fields):
+    """
+    Insert a prospect for structured card data in its own session and
+    transaction. Blocking; call it through the threadpool.
+    """
+    db = SessionLocal()
+    try:
+        prospect = create_prospect_from_card(db, final_data, **fields)
+        return jsonable_encoder({column.name: getattr(prospect, column.name) for column in prospect.__table__.columns})
+    finally:
+        db.close()
+
+async def _extract_and_save(image_data, fields, allow_duplicates, timings):
+    """
+    Extract one card and persist it as a prospect. Raises HTTPException(409)
+    without saving when duplicates are found and `allow_duplicates` is False.
+    """
+    extracted_text, final_data, ocr_lines = await _extract_cached(image_data, timings)
+    if not allow_duplicates:
+        await run_in_threadpool(_refresh_dedupe_index)
+    duplicates = get_dedupe_index().find_duplicates(final_data)
+    if duplicates and not allow_duplicates:
+        raise HTTPException(status_code=409, detail={"message": "Card matches existing prospects.",
+                                                     "duplicates": duplicates, "final_data": final_data})
+    with stage(timings, "db_save"):
+        prospect = await run_in_threadpool(_save_card, final_data, fields)
+    get_stage_histograms().observe_timings(timings)
+    return {
+        "extracted_text": extracted_text,
+        "final_data": final_data,
+        "ocr_lines": ocr_lines,
+        "prospect": prospect,
+        "duplicates": duplicates,
+        "timings": timings
+    }
+
+@app.post("/extract_and_save")
+async def extract_and_save(
+    image: UploadFile = File(...),
+    mode: str = "sync",
+    allow_duplicates: bool = Form(True),
+    lead_serial_number: Optional[int] = Form(None),
+    owner_id: Optional[int] = Form(None),
+    industry: Optional[str] = Form(None),
+    service_needed: Optional[str] = Form(None),
+    lead_source: Optional[str] = Form(None),
+    value_of_lead: Optional[str] = Form(None),
+    milestone_level: Optional[int] = Form(None),
+    points: Optional[int] = Form(None),
+):
+    """
+    Extract a business card and store it as a prospect in one request.
+    Form fields supply the prospect values a card cannot carry; without a
+    lead_serial_number the database assigns one. With mode=async the request
+    returns a job ID immediately (poll GET /jobs/{job_id}) and the prospect is
+    written when extraction finishes.
+    """
+    if mode not in ("sync", "async"):
+        raise HTTPException(status_code=400, detail="mode must be 'sync' or 'async'")
+    timings = {}
+    with stage(timings, "upload_read"):
+        _, image_data = await read_upload(image)
+    fields = {
+        "lead_serial_number": lead_serial_number, "owner_id": owner_id, "industry": industry,
+        "service_needed": service_needed, "lead_source": lead_source, "value_of_lead": value_of_lead,
+        "milestone_level": milestone_level, "points": points,
+    }
+
+    if mode == "async":
+        job_id = await get_job_queue().submit("extract_and_save", image_data,
+                                              {"fields": fields, "allow_duplicates": allow_duplicates})
+        logger.info(f"Extract-and-save job {job_id} queued")
+        return _job_accepted(job_id)
+
+    try:
+        result = await _extract_and_save(image_data, fields, allow_duplicates, timings)
+    except HTTPException:
+        raise
+    except ExecutorSaturated:
+        logger.warning("Extraction queue full, rejecting request")
+        raise HTTPException(status_code=503, detail="Server busy, please retry shortly", headers={"Retry-After": "1"})
+    except Exception as e:
+        logger.error(f"Failed to extract and save card: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to extract and save the card")
+    logger.info(f"Card saved as prospect {result['prospect']['lead_serial_number']}")
+    return JSONResponse(status_code=201, headers=server_timing_headers(timings),
+                        content={"message": "Prospect created.", **result})
+
+async def _extract_job(image_data, params):
+    timings = {}
+    extracted_text, final_data, ocr_lines = await _extract_cached(image_data, timings)
+    get_stage_histograms().observe_timings(timings)
+    return _extraction_result(extracted_text, final_data, ocr_lines, timings)
+
+async def _extract_and_save_job(image_data, params):
+    return await _extract_and_save(image_data, params["fields"], params["allow_duplicates"], {})
+
+get_job_queue().register("extract", _extract_job)
+get_job_queue().register("extract_and_save", _extract_and_save_job)
+
+@app.get("/jobs")
+async def list_jobs(status: str = "dead", limit: int = Query(100, ge=1, le=1000)):
+    """Jobs in one status, oldest first; defaults to the dead-letter list."""
+    return {"status": status, "jobs": await asyncio.to_thread(get_job_queue().list, status, limit)}
+
+@app.get("/jobs/{job_id}")
+async def read_job(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    """
+    Status of a job, with its result once it has succeeded. Pass `wait` to
+    long-poll: the response is held for up to that many seconds until the
+    job finishes.
+    """
+    job = await get_job_queue().wait(job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/jobs/{job_id}/retry")
+async def retry_job(job_id: str):
+    """Move a dead-lettered job back to the queue."""
+    if not await get_job_queue().retry_dead(job_id):
+        raise HTTPException(status_code=409, detail="Only dead jobs can be retried")
+    return _job_accepted(job_id)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
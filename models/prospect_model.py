@@ -1,10 +1,21 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
+from .base import Base  # Shared Base so create_all at startup creates this table
 
 class Prospect(Base):
     __tablename__ = 'prospects'
+    # Listings filter on one of these columns and page by lead_serial_number,
+    # so each index ends with the primary key to serve keyset pagination.
+    __table_args__ = (
+        Index("ix_prospects_owner_id", "owner_id", "lead_serial_number"),
+        Index("ix_prospects_owner_id_date", "owner_id", "date", "lead_serial_number"),
+        Index("ix_prospects_is_won", "is_won", "lead_serial_number"),
+        Index("ix_prospects_is_dropped", "is_dropped", "lead_serial_number"),
+        Index("ix_prospects_country_city", "country", "city", "lead_serial_number"),
+        Index("ix_prospects_date", "date", "lead_serial_number"),
+        # Phone numbers are stored in E.164, so a phone lookup is an equality match
+        Index("ix_prospects_primary_phone_number", "primary_phone_number", "lead_serial_number"),
+        Index("ix_prospects_other_phone_number", "other_phone_number", "lead_serial_number"),
+    )
     
     lead_serial_number = Column(Integer, primary_key=True)
     is_dropped = Column(Boolean)
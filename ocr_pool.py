@@ -0,0 +1,132 @@
+import os
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Number of warm PaddleOCR instances kept per process. One is enough for a
+# single uvicorn worker running OCR serially; raise it to the number of cores
+# the worker may use concurrently.
+OCR_POOL_SIZE = int(os.getenv("OCR_POOL_SIZE", "1"))
+# Seconds a request may wait for a free instance before giving up (0 = forever).
+OCR_POOL_TIMEOUT = float(os.getenv("OCR_POOL_TIMEOUT", "30"))
+# Text crops recognized per forward pass inside one image.
+OCR_REC_BATCH_NUM = int(os.getenv("OCR_REC_BATCH_NUM", "6"))
+# Inference threads per engine (PaddleOCR's default is 10); with several
+# extraction worker processes, about cores / workers avoids oversubscription.
+OCR_CPU_THREADS = int(os.getenv("OCR_CPU_THREADS", "10"))
+
+
+class OCRPoolTimeout(Exception):
+    """Raised when no OCR engine became available within the pool timeout."""
+
+
+def _default_factory():
+    # Imported here so that merely importing this module stays cheap.
+    from paddleocr import PaddleOCR
+    return PaddleOCR(rec_batch_num=OCR_REC_BATCH_NUM, cpu_threads=OCR_CPU_THREADS)
+
+
+class OCRPool:
+    """
+    Fixed-size pool of warm PaddleOCR engines.
+
+    A PaddleOCR instance is not safe to share between threads, so each caller
+    checks out an engine for the duration of one `ocr()` call and returns it
+    afterwards. Engines are built once (on `warm_up()` or first use) and then
+    reused for the lifetime of the process.
+    """
+
+    def __init__(self, size=OCR_POOL_SIZE, factory=_default_factory, timeout=OCR_POOL_TIMEOUT):
+        if size < 1:
+            raise ValueError("OCR pool size must be at least 1")
+        self.size = size
+        self.timeout = timeout or None
+        self._factory = factory
+        self._engines = queue.Queue(maxsize=size)
+        self._init_lock = threading.Lock()
+        self._warm = False
+        self._stats_lock = threading.Lock()
+        self._acquisitions = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def warm_up(self):
+        """
+        Load every engine in the pool. Safe to call more than once.
+        """
+        if self._warm:
+            return
+        with self._init_lock:
+            if self._warm:
+                return
+            started = time.perf_counter()
+            # Enqueue only once every engine is built: if the factory fails
+            # part-way, the next call starts over instead of overfilling the queue
+            engines = [self._factory() for _ in range(self.size)]
+            for engine in engines:
+                self._engines.put(engine)
+            self._warm = True
+            logger.info(f"OCR pool warmed with {self.size} engine(s) in {time.perf_counter() - started:.2f}s")
+
+    @contextmanager
+    def acquire(self):
+        """
+        Check out an engine for exclusive use, waiting if all are busy.
+        """
+        self.warm_up()
+        started = time.perf_counter()
+        try:
+            engine = self._engines.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise OCRPoolTimeout(f"No OCR engine available after {self.timeout}s")
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._acquisitions += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        if waited > 0.1:
+            logger.info(f"Waited {waited:.3f}s for an OCR engine")
+        try:
+            yield engine
+        finally:
+            self._engines.put(engine)
+
+    def stats(self):
+        """
+        Return a snapshot of pool usage, including time spent waiting for engines.
+        """
+        with self._stats_lock:
+            acquisitions = self._acquisitions
+            return {
+                "size": self.size,
+                "warm": self._warm,
+                "available": self._engines.qsize(),
+                "acquisitions": acquisitions,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_avg": round(self._wait_total / acquisitions, 6) if acquisitions else 0.0,
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_ocr_pool():
+    """
+    Return the process-wide OCR pool, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = OCRPool()
+    return _pool
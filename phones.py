@@ -0,0 +1,207 @@
+import re
+from collections import namedtuple
+
+# International calling codes for the countries our cards most often come from,
+# keyed by lower-case country name
+COUNTRY_CALLING_CODES = {
+    "kenya": "254",
+    "uganda": "256",
+    "tanzania": "255",
+    "rwanda": "250",
+    "ethiopia": "251",
+    "nigeria": "234",
+    "ghana": "233",
+    "south africa": "27",
+    "egypt": "20",
+    "morocco": "212",
+    "united states": "1",
+    "canada": "1",
+    "united kingdom": "44",
+    "ireland": "353",
+    "france": "33",
+    "germany": "49",
+    "spain": "34",
+    "italy": "39",
+    "poland": "48",
+    "india": "91",
+    "china": "86",
+    "japan": "81",
+    "south korea": "82",
+    "singapore": "65",
+    "vietnam": "84",
+    "australia": "61",
+    "brazil": "55",
+    "united arab emirates": "971",
+}
+
+# Valid lengths of the national significant number (after the calling code
+# and without the trunk prefix) and its leading digits for mobile lines.
+# mobile_prefixes is None where mobiles cannot be told apart (e.g. NANP).
+NumberingPlan = namedtuple("NumberingPlan", ["lengths", "mobile_prefixes"])
+
+NUMBERING_PLANS = {
+    "254": NumberingPlan((9,), ("7", "1")),
+    "256": NumberingPlan((9,), ("7",)),
+    "255": NumberingPlan((9,), ("6", "7")),
+    "250": NumberingPlan((9,), ("7",)),
+    "251": NumberingPlan((9,), ("7", "9")),
+    "234": NumberingPlan((8, 10), ("70", "80", "81", "90", "91")),
+    "233": NumberingPlan((9,), ("2", "5")),
+    "27": NumberingPlan((9,), ("6", "7", "8")),
+    "20": NumberingPlan((8, 9, 10), ("10", "11", "12", "15")),
+    "212": NumberingPlan((9,), ("6", "7")),
+    "1": NumberingPlan((10,), None),
+    "44": NumberingPlan((9, 10), ("7",)),
+    "353": NumberingPlan((7, 8, 9), ("8",)),
+    "33": NumberingPlan((9,), ("6", "7")),
+    "49": NumberingPlan(tuple(range(6, 12)), ("15", "16", "17")),
+    "34": NumberingPlan((9,), ("6", "7")),
+    "39": NumberingPlan(tuple(range(6, 12)), ("3",)),
+    "48": NumberingPlan((9,), ("5", "6", "7", "8")),
+    "91": NumberingPlan((10,), ("6", "7", "8", "9")),
+    "86": NumberingPlan((9, 10, 11), ("1",)),
+    "81": NumberingPlan((9, 10), ("70", "80", "90")),
+    "82": NumberingPlan((8, 9, 10), ("1",)),
+    "65": NumberingPlan((8,), ("8", "9")),
+    "84": NumberingPlan((9, 10), ("3", "5", "7", "8", "9")),
+    "61": NumberingPlan((9,), ("4",)),
+    "55": NumberingPlan((10, 11), None),
+    "971": NumberingPlan((8, 9), ("5",)),
+}
+# Countries whose national trunk '0' stays part of the international number
+TRUNK_PREFIX_KEPT = {"39"}
+MAX_CODE_DIGITS = max(len(code) for code in NUMBERING_PLANS)
+
+NON_DIGITS_RE = re.compile(r"\D")
+# Digits compared when matching numbers whose country is unknown
+SUFFIX_DIGITS = 9
+
+# A parsed number. `e164` is None when the number has no international prefix
+# and no country hint; `kind` is 'mobile', 'landline' or 'unknown'; `valid` is
+# whether the length fits the country's plan (None when there is no plan).
+PhoneNumber = namedtuple("PhoneNumber", ["raw", "e164", "kind", "valid"])
+
+
+def _split_code(digits):
+    """
+    Split international digits into (calling code, national number) using the
+    longest known calling code, or (None, digits) if none matches.
+    """
+    for length in range(min(MAX_CODE_DIGITS, len(digits) - 1), 0, -1):
+        if digits[:length] in NUMBERING_PLANS:
+            return digits[:length], digits[length:]
+    return None, digits
+
+
+def parse_phone(number, country=None):
+    """
+    Canonicalizes a phone number to E.164 and classifies it against the
+    numbering plan of its country. Numbers without an international prefix
+    ('+' or '00') take the calling code of `country` (a country name), and
+    the national trunk prefix is dropped in either case ('+44 (0)20 ...').
+    Returns a PhoneNumber, or None for text without digits.
+    """
+    if not number:
+        return None
+    digits = NON_DIGITS_RE.sub("", number)
+    if not digits:
+        return None
+    if number.lstrip().startswith("+") or digits.startswith("00"):
+        code, national = _split_code(digits[2:] if not number.lstrip().startswith("+") else digits)
+        if code is None:
+            return PhoneNumber(number, "+" + national, "unknown", None)
+    else:
+        code = COUNTRY_CALLING_CODES.get((country or "").strip().lower())
+        if code is None:
+            return PhoneNumber(number, None, "unknown", None)
+        national = digits
+    if code not in TRUNK_PREFIX_KEPT:
+        national = national.lstrip("0")
+
+    plan = NUMBERING_PLANS[code]
+    valid = len(national) in plan.lengths
+    if plan.mobile_prefixes is None or not valid:
+        kind = "unknown"
+    else:
+        kind = "mobile" if national.startswith(plan.mobile_prefixes) else "landline"
+    return PhoneNumber(number, "+" + code + national, kind, valid)
+
+
+def to_e164(number, country=None):
+    """
+    Converts a phone number to E.164 ('+' and digits only). Numbers without an
+    international prefix need `country` to supply the calling code.
+    Returns None when the number cannot be placed.
+    """
+    phone = parse_phone(number, country)
+    return phone.e164 if phone else None
+
+
+def phone_value(phone):
+    """
+    The string stored for a parsed number: E.164 when it could be placed and
+    its length fits the country's plan, otherwise the number as printed.
+    """
+    if phone.e164 is None or phone.valid is False:
+        return phone.raw.strip()
+    return phone.e164
+
+
+def split_numbers(text):
+    """
+    Splits matches such as '0720953165/0733577492' into separate numbers.
+    """
+    return [part for part in (part.strip() for part in text.split("/")) if part]
+
+
+def _rank(item):
+    position, phone = item
+    # Numbers that fit their plan first, then mobiles before landlines, then
+    # the order printed on the card
+    return (phone.valid is False, phone.kind != "mobile", position)
+
+
+def rank_phone_numbers(numbers, country=None):
+    """
+    Parses the phone numbers found on a card, drops repeats of the same
+    number written in different formats, and ranks the rest
+    deterministically: valid numbers before invalid ones, mobiles before
+    landlines, then order of appearance.
+    Returns a list of PhoneNumber.
+    """
+    parsed = {}
+    for number in numbers:
+        for part in split_numbers(number):
+            phone = parse_phone(part, country)
+            if phone is None:
+                continue
+            key = phone.e164 or NON_DIGITS_RE.sub("", part)
+            if key not in parsed:
+                parsed[key] = (len(parsed), phone)
+    return [phone for _, phone in sorted(parsed.values(), key=_rank)]
+
+
+def normalize_phone_batch(items):
+    """
+    Normalizes many (number, country) pairs, e.g. the phone columns of a bulk
+    import, parsing each distinct pair once. Returns the stored value for
+    each pair in input order (None for empty numbers).
+    """
+    values = {}
+    results = []
+    for number, country in items:
+        key = (number, country)
+        if key not in values:
+            phone = parse_phone(number, country) if number else None
+            values[key] = phone_value(phone) if phone else number
+        results.append(values[key])
+    return results
+
+
+def phone_suffix(number):
+    """
+    Returns the last SUFFIX_DIGITS digits of a number, which identify it
+    regardless of how (or whether) the country code was written.
+    """
+    digits = NON_DIGITS_RE.sub("", number or "")
+    return digits[-SUFFIX_DIGITS:] if len(digits) >= 7 else None
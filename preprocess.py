@@ -0,0 +1,126 @@
+import io
+import os
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+from timings import stage
+
+# Longest side, in pixels, of the image handed to OCR (0 keeps full resolution)
+OCR_MAX_SIDE = int(os.getenv("OCR_MAX_SIDE", "1600"))
+# Detect the card outline and warp it to a flat rectangle before OCR
+OCR_CROP_CARD = os.getenv("OCR_CROP_CARD", "1") == "1"
+# Skip PaddleOCR's angle classifier when EXIF already told us the orientation.
+# Off by default: EXIF describes the camera, not how the card lies in the shot.
+OCR_SKIP_CLS_IF_UPRIGHT = os.getenv("OCR_SKIP_CLS_IF_UPRIGHT", "0") == "1"
+
+# EXIF tag holding the camera orientation
+EXIF_ORIENTATION = 0x0112
+# Working size for outline detection; the quad is scaled back afterwards
+DETECT_SIDE = 500
+# A detected quad must cover this share of the photo to be taken as the card
+MIN_CARD_AREA = 0.2
+MAX_CARD_AREA = 0.98
+
+
+def decode_image(image_bytes, timings=None):
+    """
+    Decodes image bytes once into an RGB PIL image with EXIF rotation applied.
+    JPEGs are decoded at a reduced scale when they are far larger than needed.
+    Returns (image, upright) where `upright` is True when the orientation was
+    known from EXIF.
+    """
+    with stage(timings, "decode"):
+        image = Image.open(io.BytesIO(image_bytes))
+        if OCR_MAX_SIDE:
+            # Keep headroom so the card itself still has enough pixels after cropping
+            image.draft("RGB", (OCR_MAX_SIDE * 2, OCR_MAX_SIDE * 2))
+        image.load()
+    with stage(timings, "exif_rotate"):
+        orientation = image.getexif().get(EXIF_ORIENTATION)
+        upright = orientation is not None
+        if orientation not in (None, 1):
+            image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+    return image, upright
+
+
+def _order_corners(points):
+    """
+    Orders four corner points as top-left, top-right, bottom-right, bottom-left.
+    """
+    sums = points.sum(axis=1)
+    diffs = np.diff(points, axis=1).ravel()
+    return np.array([
+        points[np.argmin(sums)],
+        points[np.argmin(diffs)],
+        points[np.argmax(sums)],
+        points[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def find_card_quad(image):
+    """
+    Looks for the outline of the card in a BGR image and returns its four
+    corners in image coordinates, or None if no plausible card was found.
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, DETECT_SIDE / max(height, width))
+    small = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+    gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+    edges = cv2.dilate(cv2.Canny(gray, 50, 150), None, iterations=1)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+
+    contour = max(contours, key=cv2.contourArea)
+    area = cv2.contourArea(contour) / float(small.shape[0] * small.shape[1])
+    if not MIN_CARD_AREA <= area <= MAX_CARD_AREA:
+        return None
+    quad = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+    if len(quad) != 4:
+        return None
+    return _order_corners(quad.reshape(4, 2).astype(np.float32) / scale)
+
+
+def _fit(width, height, max_side):
+    """
+    Scales (width, height) down so that neither exceeds max_side.
+    """
+    if not max_side or max(width, height) <= max_side:
+        return int(width), int(height)
+    scale = max_side / float(max(width, height))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def preprocess_image(image_bytes, timings=None):
+    """
+    Prepares an uploaded image for OCR: decode once, apply EXIF rotation, crop
+    and flatten the card if its outline is found, and downscale so the longest
+    side is at most OCR_MAX_SIDE. Per-stage durations are added to `timings`.
+    Returns (bgr_array, skip_angle_cls).
+    """
+    image, upright = decode_image(image_bytes, timings)
+    bgr = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+
+    quad = None
+    if OCR_CROP_CARD:
+        with stage(timings, "crop_detect"):
+            quad = find_card_quad(bgr)
+
+    with stage(timings, "resize"):
+        if quad is not None:
+            # Warp straight to the target size: crop, deskew and downscale in one pass
+            top_left, top_right, bottom_right, bottom_left = quad
+            card_width = max(np.linalg.norm(top_right - top_left), np.linalg.norm(bottom_right - bottom_left))
+            card_height = max(np.linalg.norm(bottom_left - top_left), np.linalg.norm(bottom_right - top_right))
+            width, height = _fit(card_width, card_height, OCR_MAX_SIDE)
+            target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+            matrix = cv2.getPerspectiveTransform(quad, target)
+            bgr = cv2.warpPerspective(bgr, matrix, (width, height), flags=cv2.INTER_LINEAR)
+        else:
+            width, height = _fit(bgr.shape[1], bgr.shape[0], OCR_MAX_SIDE)
+            if (width, height) != (bgr.shape[1], bgr.shape[0]):
+                bgr = cv2.resize(bgr, (width, height), interpolation=cv2.INTER_AREA)
+
+    return bgr, upright and OCR_SKIP_CLS_IF_UPRIGHT
@@ -1,11 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from crud.prospect_crud import get_prospect, create_prospect, update_prospect, delete_prospect
-from schemas.prospect_schema import ProspectCreate, ProspectOut, ProspectUpdate
+from crud.prospect_crud import (
+    get_prospect, list_prospects, create_prospect, update_prospect, delete_prospect,
+    bulk_create_prospects, bulk_upsert_prospects, bulk_delete_prospects,
+)
+from schemas.prospect_schema import (
+    ProspectCreate, ProspectOut, ProspectUpdate, ProspectBulkDelete, ProspectBulkResponse, ProspectPage,
+)
 from dependencies import get_db
 
 router = APIRouter()
 
+def _bulk_response(results):
+    return {"summary": dict(Counter(result["status"] for result in results)), "results": results}
+
+# Bulk routes are registered before /prospects/{lead_serial_number} so that
+# "bulk" is not parsed as a serial number.
+@router.post("/prospects/bulk", response_model=ProspectBulkResponse)
+def bulk_create_prospects_endpoint(prospects: List[ProspectCreate], db: Session = Depends(get_db)):
+    return _bulk_response(bulk_create_prospects(db, prospects))
+
+@router.put("/prospects/bulk", response_model=ProspectBulkResponse)
+def bulk_upsert_prospects_endpoint(prospects: List[ProspectCreate], db: Session = Depends(get_db)):
+    return _bulk_response(bulk_upsert_prospects(db, prospects))
+
+@router.post("/prospects/bulk/delete", response_model=ProspectBulkResponse)
+def bulk_delete_prospects_endpoint(request: ProspectBulkDelete, db: Session = Depends(get_db)):
+    return _bulk_response(bulk_delete_prospects(db, request.lead_serial_numbers))
+
+@router.get("/prospects/", response_model=ProspectPage)
+def list_prospects_endpoint(
+    cursor: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=500),
+    owner_id: Optional[int] = None,
+    is_won: Optional[bool] = None,
+    is_dropped: Optional[bool] = None,
+    country: Optional[str] = None,
+    city: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    phone: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    items, next_cursor = list_prospects(
+        db, cursor=cursor, limit=limit, owner_id=owner_id, is_won=is_won, is_dropped=is_dropped,
+        country=country, city=city, date_from=date_from, date_to=date_to, phone=phone,
+    )
+    return {"items": items, "next_cursor": next_cursor}
+
 @router.post("/prospects/", response_model=ProspectOut)
 def create_prospect_endpoint(prospect: ProspectCreate, db: Session = Depends(get_db)):
     return create_prospect(db=db, prospect=prospect)
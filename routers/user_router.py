@@ -2,20 +2,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from schemas.user_schema import UserCreate
 from crud.user_crud import create_user
-from database import SessionLocal
+from dependencies import get_db
 
 router = APIRouter()
 
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-        
+# Sync route: FastAPI runs it in the threadpool so DB round trips don't block the event loop
 @router.post("/users/", response_model=UserCreate)
-async def create_user_route(user: UserCreate, db: Session = Depends(get_db)):
+def create_user_route(user: UserCreate, db: Session = Depends(get_db)):
     try:
         db_user = create_user(db=db, user_data=user)
         return db_user
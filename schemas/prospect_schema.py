@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class ProspectBase(BaseModel):
     lead_serial_number: int  # This is now the primary key
@@ -34,6 +34,40 @@ class ProspectUpdate(BaseModel):
     points: Optional[int] = None
 
 class ProspectOut(ProspectBase):
-    # Remove id and use lead_serial_number as the primary identifier
+    # Remove id and use lead_serial_number as the primary identifier.
+    # Prospects saved from a card (POST /extract_and_save, bulk_extract.py)
+    # hold only what the card showed, so any of these may be missing.
+    organization_name: Optional[str] = None
+    contact_person: Optional[str] = None
+    primary_phone_number: Optional[str] = None
+    email: Optional[str] = None
+    industry: Optional[str] = None
+    service_needed: Optional[str] = None
+    lead_source: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    value_of_lead: Optional[str] = None
+    milestone_level: Optional[int] = None
+    owner_id: Optional[int] = None
+    points: Optional[int] = None
+    website: Optional[str] = None
+
     class Config:
         orm_mode = True
+
+class ProspectBulkDelete(BaseModel):
+    lead_serial_numbers: List[int]
+
+class ProspectBulkResult(BaseModel):
+    index: int
+    lead_serial_number: int
+    status: str  # created, updated, exists, duplicate, superseded, deleted, not_found or error
+    detail: Optional[str] = None
+
+class ProspectBulkResponse(BaseModel):
+    summary: dict
+    results: List[ProspectBulkResult]
+
+class ProspectPage(BaseModel):
+    items: List[ProspectOut]
+    next_cursor: Optional[int] = None  # Pass as `cursor` to fetch the next page
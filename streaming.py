@@ -0,0 +1,59 @@
+import json
+import logging
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from executor import ExecutorSaturated
+
+logger = logging.getLogger(__name__)
+
+# ?stream= values accepted by the extraction endpoints
+STREAM_FORMATS = ("ndjson", "sse")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def check_stream_format(stream):
+    """
+    Validates a `stream` query parameter; None means a regular JSON response.
+    """
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {', '.join(STREAM_FORMATS)}")
+
+
+def encode_event(event, data, stream_format):
+    """
+    Encodes one event: an NDJSON line {"event": ..., **data}, or an SSE
+    message with the event name and the data as JSON.
+    """
+    data = jsonable_encoder(data)
+    if stream_format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+    return (json.dumps({"event": event, **data}) + "\n").encode()
+
+
+def _error_event(e):
+    if isinstance(e, ExecutorSaturated):
+        return {"status": 503, "detail": "Server busy, please retry shortly", "retry_after": 1}
+    if isinstance(e, HTTPException):
+        return {"status": e.status_code, "detail": e.detail}
+    return {"status": 500, "detail": "Failed to process the image"}
+
+
+def event_stream_response(events, stream_format):
+    """
+    Streams the (event, data) pairs of the async iterator `events` as they are
+    produced. The status line and headers go out before the first event, so a
+    failure part-way through is reported as a final 'error' event carrying
+    the status code the regular endpoint would have answered with.
+    """
+    async def body():
+        try:
+            async for event, data in events:
+                yield encode_event(event, data, stream_format)
+        except Exception as e:
+            logger.error(f"Streaming response failed: {str(e)}")
+            yield encode_event("error", _error_event(e), stream_format)
+
+    # Ask proxies not to buffer the stream, or clients see nothing until the end
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(body(), media_type=MEDIA_TYPES[stream_format], headers=headers)
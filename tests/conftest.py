@@ -0,0 +1,90 @@
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Throwaway database and job queue, no result cache and no background work:
+# set before the app modules read their configuration at import time
+_workdir = tempfile.mkdtemp(prefix="business-card-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ["JOB_QUEUE_PATH"] = os.path.join(_workdir, "jobs.db")
+os.environ["MODEL_WARMUP"] = "lazy"
+os.environ["RESULT_CACHE_SIZE"] = "0"
+os.environ["DEDUPE_REFRESH_SECONDS"] = "0"
+
+# Lines the fake OCR engine reads off every card
+CARD_LINES = ["ABC Corporation Ltd", "Tel: +254 712 345678", "Email: info@abccorp.com", "www.abccorp.com",
+              "Nairobi, Kenya"]
+
+
+class FakeOCR:
+    """
+    Stands in for a PaddleOCR engine: returns `lines` in PaddleOCR's result
+    format, one line under the other.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def ocr(self, image, cls=True):
+        return [[[[[0, i * 20], [200, i * 20], [200, i * 20 + 15], [0, i * 20 + 15]], (text, 0.95)]
+                 for i, text in enumerate(self.lines)]]
+
+
+def card_image(color=(255, 255, 255)):
+    """PNG bytes of a blank card; the fake engine supplies the text."""
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGB", (400, 200), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    import ocr_pool
+    engine = FakeOCR(list(CARD_LINES))
+    monkeypatch.setattr(ocr_pool, "_pool", ocr_pool.OCRPool(size=1, factory=lambda: engine))
+    return engine
+
+
+@pytest.fixture
+def fake_nlp(monkeypatch):
+    # A blank English pipeline with an entity ruler replaces the statistical model
+    import spacy
+    import extract
+    nlp = spacy.blank("en")
+    nlp.add_pipe("entity_ruler").add_patterns([
+        {"label": "ORG", "pattern": "ABC Corporation Ltd"},
+        {"label": "GPE", "pattern": "Nairobi"},
+        {"label": "GPE", "pattern": "Kenya"},
+    ])
+    monkeypatch.setattr(extract, "_nlp", nlp)
+    return nlp
+
+
+@pytest.fixture
+def db():
+    from database import SessionLocal, engine
+    from models.base import Base
+    from models.prospect_model import Prospect
+    from dedupe_index import get_dedupe_index
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    session.query(Prospect).delete()
+    session.commit()
+    get_dedupe_index().load(session)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(fake_ocr, fake_nlp, db):
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,38 @@
+import pytest
+
+import extract
+from conftest import card_image
+
+
+def fail_second_call(monkeypatch, name):
+    """Make the second call of extract.<name> raise, leaving the others alone."""
+    original = getattr(extract, name)
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(None)
+        if len(calls) == 2:
+            raise ValueError("structuring failed")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(extract, name, flaky)
+
+
+@pytest.mark.parametrize("layout_fields, structurer", [
+    (True, "_structure_lines"),
+    (False, "restructure_extracted_text_to_json"),
+])
+def test_batch_card_failure_does_not_fail_the_batch(client, monkeypatch, layout_fields, structurer):
+    monkeypatch.setattr(extract, "OCR_LAYOUT_FIELDS", layout_fields)
+    fail_second_call(monkeypatch, structurer)
+    files = [("images", (f"card{i}.png", card_image((i, i, i)), "image/png")) for i in range(3)]
+
+    response = client.post("/extract_text/batch", files=files)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["failed"] == 1
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][1]["error"] == "structuring failed"
+    for result in (body["results"][0], body["results"][2]):
+        assert result["final_data"]["organization_name"] == "ABC Corporation Ltd"
@@ -0,0 +1,35 @@
+import json
+
+import bulk_extract
+from conftest import card_image
+
+
+def test_bulk_rows_read_back_and_runs_resume(client, tmp_path, capsys):
+    cards = tmp_path / "cards"
+    cards.mkdir()
+    for i in range(2):
+        (cards / f"card{i}.png").write_bytes(card_image((i, i, i)))
+    (cards / "notes.txt").write_text("not a card")
+    output = tmp_path / "cards.jsonl"
+    argv = [str(cards), "--output", str(output), "--db", "--allow-duplicates", "--workers", "0",
+            "--lead-source", "Trade show"]
+
+    assert bulk_extract.main(argv) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(record["status"] for record in records) == ["ok", "ok", "skipped"]
+    serials = sorted(record["lead_serial_number"] for record in records if record["status"] == "ok")
+
+    # Rows created in bulk leave the fields not on the card empty and still validate
+    listing = client.get("/prospects/")
+    assert listing.status_code == 200
+    items = listing.json()["items"]
+    assert sorted(item["lead_serial_number"] for item in items) == serials
+    assert {item["lead_source"] for item in items} == {"Trade show"}
+    assert {item["contact_person"] for item in items} == {None}
+
+    # A second run finds every card in the checkpoint and writes nothing
+    capsys.readouterr()
+    assert bulk_extract.main(argv) == 0
+    assert json.loads(capsys.readouterr().out)["resumed"] == 3
+    assert len(output.read_text().splitlines()) == 3
+    assert len(client.get("/prospects/").json()["items"]) == 2
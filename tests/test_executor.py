@@ -0,0 +1,33 @@
+import os
+import time
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from executor import BoundedExecutor
+
+
+def test_pool_recovers_after_a_worker_dies(fake_ocr, fake_nlp):
+    executor = BoundedExecutor(workers=1, max_queue=4, kind="fork")
+    executor.warm_up()
+
+    async def run(fn, *args):
+        return await executor.run(fn, *args)
+
+    try:
+        # The worker exits as if OOM-killed mid-job
+        with pytest.raises(BrokenProcessPool):
+            asyncio.run(run(os._exit, 1))
+        assert not executor.warm
+
+        # A background warm-up rebuilds the pool and reports ready again
+        deadline = time.monotonic() + 30
+        while not executor.warm and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert executor.warm
+        assert asyncio.run(run(os.getpid)) != os.getpid()
+        stats = executor.stats()
+        assert (stats["completed"], stats["failed"]) == (1, 1)
+    finally:
+        executor.shutdown()
@@ -0,0 +1,109 @@
+import time
+import asyncio
+
+from jobs import JobQueue
+
+
+class RacingConnection:
+    """
+    Wraps a queue's SQLite connection and runs `before_update` just before its
+    next UPDATE, to interleave another process between SELECT and UPDATE.
+    """
+
+    def __init__(self, db, before_update):
+        self._db = db
+        self.before_update = before_update
+
+    def execute(self, sql, params=()):
+        if sql.startswith("UPDATE") and self.before_update is not None:
+            before_update, self.before_update = self.before_update, None
+            before_update()
+        return self._db.execute(sql, params)
+
+    def commit(self):
+        self._db.commit()
+
+
+def test_job_is_claimed_by_one_process_only(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    first, second = JobQueue(path=path), JobQueue(path=path)
+    job_id = first._insert("extract", b"image", {})
+
+    claims = []
+    first._db = RacingConnection(first._db, lambda: claims.append(second._claim()))
+    claims.append(first._claim())
+
+    assert [claim["job_id"] for claim in claims if claim is not None] == [job_id]
+    assert second.get(job_id)["attempts"] == 1
+
+
+def test_submitted_job_runs_and_reports_stats(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.db"), workers=1)
+
+    async def handler(payload, params):
+        return {"size": len(payload), **params}
+
+    queue.register("measure", handler)
+
+    async def run():
+        queue.start()
+        try:
+            job_id = await queue.submit("measure", b"abc", {"name": "card"})
+            return await queue.wait(job_id, timeout=5)
+        finally:
+            await queue.stop()
+
+    job = asyncio.run(run())
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"size": 3, "name": "card"}
+    stats = queue.stats()
+    assert stats["by_status"] == {"succeeded": 1}
+    assert stats["succeeded"] == 1
+
+
+def test_expired_lease_with_no_attempts_left_is_dead_lettered(tmp_path):
+    queue = JobQueue(path=str(tmp_path / "jobs.db"), max_attempts=2, lease=60)
+    job_id = queue._insert("extract", b"image", {})
+    # Claimed twice by processes that crashed while running it
+    queue._db.execute("UPDATE jobs SET status = 'running', attempts = 2, started_at = ? WHERE job_id = ?",
+                      (time.time() - 120, job_id))
+    queue._db.commit()
+
+    assert queue._claim() is None
+    job = queue.get(job_id)
+    assert job["status"] == "dead"
+    assert job["error"] == "Lease expired after 2 attempt(s)"
+    assert queue.stats()["dead"] == 1
+
+
+def test_running_job_renews_its_lease(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue, other = JobQueue(path=path, workers=1, lease=0.3), JobQueue(path=path, lease=0.3)
+    runs = []
+
+    async def handler(payload, params):
+        runs.append(None)
+        await asyncio.sleep(1)
+        return {}
+
+    queue.register("slow", handler)
+
+    async def run():
+        queue.start()
+        try:
+            job_id = await queue.submit("slow", b"", {})
+            while not runs:
+                await asyncio.sleep(0.01)
+            # Another process polling meanwhile never sees the lease expire
+            claims = []
+            while len(runs) == 1 and (await queue.wait(job_id, timeout=0))["status"] == "running":
+                claims.append(await asyncio.to_thread(other._claim))
+                await asyncio.sleep(0.05)
+            return claims, await queue.wait(job_id, timeout=5)
+        finally:
+            await queue.stop()
+
+    claims, job = asyncio.run(run())
+    assert claims and not any(claims)
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
@@ -0,0 +1,103 @@
+import time
+import asyncio
+
+import httpx
+import pytest
+
+import llm_client
+from llm_client import LLMClient, LLMError
+
+COMPLETION = {"choices": [{"message": {"role": "assistant", "content": "{}"}}],
+              "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+
+
+def make_client(handler, **options):
+    return LLMClient(base_url="http://llm.test/v1", transport=httpx.MockTransport(handler), **options)
+
+
+def complete(client, requests=1):
+    async def run():
+        try:
+            return await asyncio.gather(*(client.chat_completion({"messages": []}, "key") for _ in range(requests)))
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records the retry delays instead of sleeping them."""
+    delays = []
+    sleep = asyncio.sleep
+
+    async def record(delay):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(llm_client.asyncio, "sleep", record)
+    return delays
+
+
+def test_retries_timeouts_and_server_errors(sleeps):
+    responses = iter([httpx.ReadTimeout("slow"), 503, 200])
+
+    def handler(request):
+        outcome = next(responses)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome, json=COMPLETION if outcome == 200 else {})
+
+    client = make_client(handler, max_retries=3)
+    assert complete(client) == [COMPLETION]
+    stats = client.stats()
+    assert (stats["retries"], stats["failures"], stats["prompt_tokens"]) == (2, 0, 10)
+    assert len(sleeps) == 2
+
+
+def test_gives_up_after_max_retries(sleeps):
+    client = make_client(lambda request: httpx.Response(502, text="bad gateway"), max_retries=2)
+    with pytest.raises(LLMError) as raised:
+        complete(client)
+    assert raised.value.status_code == 502
+    assert client.stats()["failures"] == 1
+    assert len(sleeps) == 2
+
+
+def test_honours_retry_after(sleeps):
+    responses = iter([httpx.Response(429, headers={"Retry-After": "7"}), httpx.Response(200, json=COMPLETION)])
+    client = make_client(lambda request: next(responses), backoff=0.01)
+    assert complete(client) == [COMPLETION]
+    assert sleeps == [7.0]
+
+
+def test_retry_after_beyond_the_limit_fails(sleeps):
+    client = make_client(lambda request: httpx.Response(429, headers={"Retry-After": "600"}), max_retry_after=60)
+    with pytest.raises(LLMError):
+        complete(client)
+    assert sleeps == []
+
+
+def test_invalid_json_is_an_llm_error():
+    client = make_client(lambda request: httpx.Response(200, text="<html>proxy error</html>"))
+    with pytest.raises(LLMError, match="invalid JSON") as raised:
+        complete(client)
+    assert raised.value.status_code == 200
+
+
+def test_concurrency_and_rate_limits():
+    in_flight = []
+    peak = []
+
+    async def handler(request):
+        in_flight.append(None)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.05)
+        in_flight.pop()
+        return httpx.Response(200, json=COMPLETION)
+
+    client = make_client(handler, max_concurrency=2, rate_limit=50)
+    started = time.monotonic()
+    assert len(complete(client, requests=6)) == 6
+    assert max(peak) == 2
+    # Six starts spaced 1/50 s apart
+    assert time.monotonic() - started >= 5 / 50
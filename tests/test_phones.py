@@ -0,0 +1,35 @@
+from crud.prospect_crud import backfill_phone_numbers, list_prospects
+from models.prospect_model import Prospect
+from phones import normalize_phone_batch, to_e164
+
+
+def test_numbers_normalize_to_e164():
+    assert to_e164("0712 345678", "Kenya") == "+254712345678"
+    assert to_e164("+254 712-345-678") == "+254712345678"
+    # A national number without a country cannot be placed and is kept as printed
+    assert normalize_phone_batch([("0712 345678", "Kenya"), ("0712 345678", None)]) == \
+        ["+254712345678", "0712 345678"]
+    # Numbers too short for the country's plan are kept as printed
+    assert normalize_phone_batch([("12", "Kenya"), ("ext 4", "Kenya")]) == ["12", "ext 4"]
+
+
+def test_legacy_phone_numbers_are_backfilled_and_found(db):
+    # Rows written before numbers were normalized, bypassing the CRUD layer
+    db.bulk_insert_mappings(Prospect, [
+        {"lead_serial_number": 1, "primary_phone_number": "0712 345678", "country": "Kenya"},
+        {"lead_serial_number": 2, "primary_phone_number": "+254733577492", "other_phone_number": "12",
+         "country": "Kenya"},
+        {"lead_serial_number": 3, "primary_phone_number": "0712 34567", "country": "Kenya"},
+    ])
+    db.commit()
+    # The number as typed still finds a legacy row before the backfill
+    assert [p.lead_serial_number for p in list_prospects(db, phone="0712 345678")[0]] == [1]
+
+    assert backfill_phone_numbers(db) == 1
+    assert backfill_phone_numbers(db) == 0
+    assert db.get(Prospect, 1).primary_phone_number == "+254712345678"
+    # Numbers that do not fit the plan are never rewritten
+    assert db.get(Prospect, 2).other_phone_number == "12"
+    assert db.get(Prospect, 3).primary_phone_number == "0712 34567"
+    found, _ = list_prospects(db, phone="+254 712 345 678")
+    assert [p.lead_serial_number for p in found] == [1]
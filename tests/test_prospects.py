@@ -0,0 +1,37 @@
+from conftest import card_image
+from models.prospect_model import Prospect
+
+
+def test_prospect_saved_from_card_reads_back(client):
+    response = client.post("/extract_and_save", files={"image": ("card.png", card_image(), "image/png")})
+    assert response.status_code == 201
+    lead_serial_number = response.json()["prospect"]["lead_serial_number"]
+
+    read = client.get(f"/prospects/{lead_serial_number}")
+    assert read.status_code == 200
+    prospect = read.json()
+    assert prospect["organization_name"] == "ABC Corporation Ltd"
+    assert prospect["email"] == "info@abccorp.com"
+    # Printed as '+254 712 345678' on the card
+    assert prospect["primary_phone_number"] == "+254712345678"
+    # Not on the card, so left empty rather than failing validation
+    assert prospect["contact_person"] is None
+    assert prospect["service_needed"] is None
+
+    listing = client.get("/prospects/")
+    assert listing.status_code == 200
+    assert [item["lead_serial_number"] for item in listing.json()["items"]] == [lead_serial_number]
+
+
+def test_bulk_delete_reports_repeated_serial_numbers(client, db):
+    db.bulk_insert_mappings(Prospect, [{"lead_serial_number": key, "organization_name": f"Org {key}"}
+                                       for key in (1, 2)])
+    db.commit()
+
+    response = client.post("/prospects/bulk/delete", json={"lead_serial_numbers": [1, 1, 3, 2, 3]})
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == \
+        ["deleted", "duplicate", "not_found", "deleted", "duplicate"]
+    assert body["results"][1]["detail"] == "Serial number repeated in this request."
+    assert body["summary"] == {"deleted": 2, "duplicate": 2, "not_found": 1}
@@ -0,0 +1,111 @@
+import os
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the stage latency histogram buckets
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+# Return per-request stage durations in a Server-Timing response header
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+
+
+@contextmanager
+def stage(timings, name):
+    """
+    Times the enclosed block and stores the duration in milliseconds under
+    `name` in the `timings` dictionary. Passing None disables recording.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timings is not None:
+            timings[name] = round((time.perf_counter() - started) * 1000, 2)
+
+
+class StageHistograms:
+    """
+    Cumulative latency histograms, one per stage name, rendered in the
+    Prometheus text exposition format.
+
+    Stage timings are produced wherever the work runs (possibly a worker
+    process), so they are observed here from the per-request `timings`
+    dictionaries once they are back in the API process.
+    """
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, name, seconds):
+        with self._lock:
+            series = self._series.get(name)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self._series[name] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def observe_timings(self, timings):
+        """
+        Record every stage of a `timings` dictionary (durations in milliseconds).
+        """
+        for name, milliseconds in timings.items():
+            self.observe(name, milliseconds / 1000)
+
+    def render(self, metric="business_card_stage_duration_seconds"):
+        lines = [
+            f"# HELP {metric} Duration of each extraction pipeline stage.",
+            f"# TYPE {metric} histogram",
+        ]
+        with self._lock:
+            for name in sorted(self._series):
+                counts, total, count = self._series[name]
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+_histograms = StageHistograms()
+
+
+def get_stage_histograms():
+    """
+    Return the process-wide stage histograms.
+    """
+    return _histograms
+
+
+def timed(name):
+    """
+    Decorator recording each call's duration in the stage histograms under
+    `name`; for work such as CRUD calls that always runs in the API process.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _histograms.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def server_timing_headers(timings):
+    """
+    Response headers carrying `timings` as Server-Timing metrics when
+    SERVER_TIMING is enabled, otherwise an empty dictionary.
+    """
+    if not SERVER_TIMING or not timings:
+        return {}
+    return {"Server-Timing": ", ".join(f"{name};dur={milliseconds}" for name, milliseconds in timings.items())}
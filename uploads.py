@@ -0,0 +1,167 @@
+import os
+import io
+import logging
+import zlib
+import zipfile
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Largest single image accepted, in bytes
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# Largest request body accepted by the batch endpoints, in bytes
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# Allowance for multipart boundaries and headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Leading bytes that identify each accepted format
+MAGIC_NUMBERS = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+    (b"PK\x03\x04", "zip"),
+)
+IMAGE_KINDS = ("jpeg", "png", "gif", "bmp", "tiff", "webp")
+SNIFF_BYTES = 16
+
+
+def sniff_kind(head):
+    """
+    Identifies a file from its first bytes. Returns a kind such as 'jpeg' or
+    'zip', or None if the format is not recognized.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    for magic, kind in MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+async def read_upload(upload, max_bytes=MAX_UPLOAD_BYTES, allowed=IMAGE_KINDS):
+    """
+    Reads an UploadFile after checking its size and sniffing its real format.
+
+    The multipart body has already been spooled to a temporary file (on disk
+    beyond 1MB), so nothing is held in memory until the checks pass. The file
+    is then read with a single bounded read; the resulting bytes object is
+    shared, not copied, by hashing and by io.BytesIO in the image decoder.
+    Returns (kind, data). Raises HTTPException 413 or 415.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large: {upload.filename}. Maximum is {max_bytes} bytes.")
+
+    head = await upload.read(SNIFF_BYTES)
+    kind = sniff_kind(head)
+    if kind not in allowed:
+        logger.error(f"Rejected upload {upload.filename}: unrecognized content")
+        raise HTTPException(status_code=415, detail=f"Unsupported file type: {upload.filename}. Please upload an image file.")
+
+    await upload.seek(0)
+    data = await upload.read(max_bytes + 1)
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File too large: {upload.filename}. Maximum is {max_bytes} bytes.")
+    return kind, data
+
+
+def iter_zip_images(data, max_image_bytes=MAX_UPLOAD_BYTES, max_total_bytes=MAX_BATCH_UPLOAD_BYTES):
+    """
+    Yields (filename, bytes) for every image inside a zip archive, in archive
+    order. Members are sniffed rather than trusted by extension, and declared
+    sizes are checked before anything is decompressed; pass the part of the
+    request's budget still unused as `max_total_bytes`. A member whose data
+    does not match its header (size or CRC) rejects the archive with 400.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid zip archive.")
+    with archive:
+        members = [member for member in archive.infolist() if not member.is_dir()]
+        if sum(member.file_size for member in members) > max_total_bytes:
+            raise HTTPException(status_code=413, detail="Zip archive expands beyond the batch size limit.")
+        for member in members:
+            if member.file_size > max_image_bytes:
+                raise HTTPException(status_code=413, detail=f"File too large: {member.filename}.")
+            try:
+                with archive.open(member) as f:
+                    if sniff_kind(f.read(SNIFF_BYTES)) not in IMAGE_KINDS:
+                        continue
+                content = archive.read(member)
+            except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError):
+                raise HTTPException(status_code=400, detail=f"Invalid zip archive: cannot read {member.filename}.")
+            yield member.filename, content
+
+
+class UploadTooLarge(Exception):
+    """Raised from the wrapped `receive` once a body goes over its limit."""
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware that rejects request bodies over the limit with 413.
+    A declared Content-Length over the limit is rejected before any of the
+    body is received; otherwise (chunked or undeclared bodies) the bytes are
+    counted as they stream in and the request is cut off as soon as the limit
+    is passed, before the rest is spooled. Paths ending in '/batch' get the
+    batch limit.
+    """
+
+    def __init__(self, app, max_bytes=MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD,
+                 max_batch_bytes=MAX_BATCH_UPLOAD_BYTES + MULTIPART_OVERHEAD):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_batch_bytes = max_batch_bytes
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse(status_code=413, content={"detail": "Request body too large."})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self.max_batch_bytes if scope["path"].rstrip("/").endswith("/batch") else self.max_bytes
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    await self._reject(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal started
+            # Drop whatever error response the app makes of the cut-off body
+            if exceeded:
+                return
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except UploadTooLarge:
+            pass
+        except Exception:
+            if not exceeded:
+                raise
+        if exceeded and not started:
+            await self._reject(scope, receive, send)
@@ -0,0 +1,123 @@
+import os
+import gc
+import time
+import logging
+import threading
+from extract import get_nlp, nlp_loaded
+from ocr_pool import get_ocr_pool
+from gazetteer import get_gazetteer, gazetteer_loaded
+from executor import get_executor
+
+logger = logging.getLogger(__name__)
+
+# When models are loaded: "background" starts loading them in a thread at
+# startup so the server answers (and /healthz passes) at once while /readyz
+# reports 503 until they are warm; "blocking" loads them before the server
+# accepts requests; "lazy" loads each on first use.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "background")
+# Load the spaCy model and the gazetteer when the app module is imported, so a server that
+# imports the app before forking workers (gunicorn --preload) shares its
+# memory copy-on-write. OCR engines are still built in each worker after the
+# fork: Paddle starts native thread pools that do not survive fork().
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+
+
+class ModelWarmup:
+    """
+    Loads the NLP model, the gazetteer and the OCR engine pool, and tracks
+    how far loading has got for the readiness probe.
+    """
+
+    def __init__(self, mode=MODEL_WARMUP):
+        if mode not in ("background", "blocking", "lazy"):
+            raise ValueError(f"Unknown warm-up mode: {mode}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        # With extraction worker processes (process or fork) the OCR engines
+        # live in the workers, and must not be built in this process, which
+        # would waste them and fork the workers from a Paddle-initialized state
+        self._worker_processes = get_executor().kind != "thread"
+        ocr_loader = get_executor().warm_up if self._worker_processes else get_ocr_pool().warm_up
+        self._loaders = {"nlp": get_nlp, "gazetteer": get_gazetteer, "ocr": ocr_loader}
+        self._state = {name: {"status": "pending", "seconds": None, "error": None} for name in self._loaders}
+        self._thread = None
+
+    def load(self, name):
+        with self._lock:
+            self._state[name]["status"] = "loading"
+        started = time.perf_counter()
+        try:
+            self._loaders[name]()
+        except Exception as e:
+            logger.error(f"Failed to load {name} model: {str(e)}")
+            with self._lock:
+                self._state[name].update(status="failed", error=str(e))
+            return
+        with self._lock:
+            self._state[name].update(status="ready", seconds=round(time.perf_counter() - started, 3))
+
+    def load_all(self):
+        for name in self._loaders:
+            self.load(name)
+
+    def start(self):
+        """
+        Begin loading according to `mode`; called from the app's startup hook.
+        """
+        if self.mode == "blocking":
+            self.load_all()
+        elif self.mode == "background" and self._thread is None:
+            self._thread = threading.Thread(target=self.load_all, name="model-warmup", daemon=True)
+            self._thread.start()
+
+    def _loaded(self, name):
+        # Models may also have been loaded lazily by a request
+        if name == "nlp":
+            return nlp_loaded()
+        if name == "gazetteer":
+            return gazetteer_loaded()
+        if self._worker_processes:
+            return get_executor().warm
+        return get_ocr_pool().stats()["warm"]
+
+    def readiness(self):
+        """
+        Return (ready, detail). In lazy mode the server is ready straight
+        away; otherwise once every model is loaded.
+        """
+        with self._lock:
+            models = {name: dict(state) for name, state in self._state.items()}
+        for name, state in models.items():
+            if state["status"] != "failed" and self._loaded(name):
+                state["status"] = "ready"
+        ready = self.mode == "lazy" or all(state["status"] == "ready" for state in models.values())
+        return ready, {"mode": self.mode, "models": models}
+
+
+def preload_for_fork():
+    """
+    Load fork-safe models in the parent process and move every object created
+    so far out of the garbage collector's reach, so collections in the workers
+    do not write to (and un-share) those pages.
+    """
+    started = time.perf_counter()
+    get_nlp()
+    get_gazetteer()
+    gc.freeze()
+    logger.info(f"Preloaded models for forked workers in {time.perf_counter() - started:.2f}s")
+
+
+_warmup = None
+_warmup_lock = threading.Lock()
+
+
+def get_model_warmup():
+    """
+    Return the process-wide model warm-up tracker, creating it on first use.
+    """
+    global _warmup
+    if _warmup is None:
+        with _warmup_lock:
+            if _warmup is None:
+                _warmup = ModelWarmup()
+    return _warmup